@@ -0,0 +1,260 @@
+"""ASGI serving mode for the chatbot.
+
+/chat and /chat/stream run the shared chat pipeline on the event loop (LLM calls awaited with
+ainvoke/astream, retrieval, CrewAI and SQLite on the Pipeline_Steps thread pool), so waiting
+on the LLM no longer pins a server thread per conversation. Every other route is the Flask
+app's own view, called through a small WSGI bridge on the same pool, so routes, JSON payloads
+and the signed session cookie are identical in both modes.
+
+Run with `python Async_Server.py` (or `uvicorn Async_Server:app`); `python Chatbot.py` still
+starts the threaded Flask server.
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+from http.cookies import SimpleCookie
+
+import Chatbot
+from Pipeline_Steps import token_sink, run_blocking
+
+flask_app = Chatbot.app
+
+
+# ============ HTTP HELPERS ============
+async def read_body(receive):
+    """Collect the full request body"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def request_cookies(scope):
+    cookies = SimpleCookie()
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    return {key: morsel.value for key, morsel in cookies.items()}
+
+
+def get_or_create_session_id(scope):
+    """Read the session id from Flask's signed session cookie; returns (session_id, extra headers)"""
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+    value = request_cookies(scope).get(cookie_name)
+    if value:
+        try:
+            data = serializer.loads(value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+            if data.get("session_id"):
+                return data["session_id"], []
+        except Exception:
+            pass
+
+    session_id = str(uuid.uuid4())
+    cookie = f"{cookie_name}={serializer.dumps({'session_id': session_id})}; HttpOnly; Path=/"
+    return session_id, [(b"set-cookie", cookie.encode("latin-1"))]
+
+
+# ============ CHAT ROUTES ============
+async def parse_chat_request(receive, send):
+    """Return the message, or None after sending the same 400 the Flask route sends"""
+    try:
+        data = json.loads(await read_body(receive) or b"{}")
+    except ValueError:
+        data = {}
+    user_message = data.get("message", "") if isinstance(data, dict) else ""
+    if not user_message:
+        await send_json(send, 400, {"error": "No message provided"})
+        return None
+    return user_message
+
+
+async def chat(scope, receive, send):
+    """Async /chat: same request and response JSON as the Flask route"""
+    user_message = await parse_chat_request(receive, send)
+    if user_message is None:
+        return
+
+    session_id, headers = get_or_create_session_id(scope)
+    try:
+        Chatbot.touch_session(session_id)
+        with Chatbot.trace_request("POST /chat", session_id=session_id) as turn_trace:
+            result = await Chatbot.aprocess_user_message(user_message, session_id)
+        if turn_trace is not None:
+            headers = [*headers, (b"server-timing", turn_trace.server_timing().encode("latin-1"))]
+        await send_json(send, 200, result, headers)
+    except Exception as e:
+        print(f"Error in async /chat endpoint: {str(e)}")
+        await send_json(send, 500, {"error": "An error occurred while processing your request"}, headers)
+
+
+async def chat_stream(scope, receive, send):
+    """Async /chat/stream: the same server-sent events as the Flask route"""
+    user_message = await parse_chat_request(receive, send)
+    if user_message is None:
+        return
+
+    session_id, headers = get_or_create_session_id(scope)
+    Chatbot.touch_session(session_id)
+    request_start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    # Tokens may come from the loop or from executor threads; call_soon_threadsafe keeps them in order
+    def emit(event, payload):
+        loop.call_soon_threadsafe(events.put_nowait, (event, payload))
+
+    async def run_turn():
+        token_sink.set(lambda token: emit("token", {"token": token}))
+        try:
+            with Chatbot.trace_request("POST /chat/stream", session_id=session_id):
+                result = await Chatbot.aprocess_user_message(user_message, session_id)
+            emit("final", result)
+        except Exception as e:
+            print(f"Error in async /chat/stream endpoint: {str(e)}")
+            emit("error", {"error": "An error occurred while processing your request"})
+
+    turn = asyncio.create_task(run_turn())
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"), *headers],
+    })
+
+    async def send_event(event, payload):
+        body = Chatbot.format_sse(event, payload).encode("utf-8")
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    await send_event("thinking", {"status": "thinking"})
+    first_token_at = None
+    tokens = 0
+    while True:
+        event, payload = await events.get()
+        if event == "token":
+            tokens += 1
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+        await send_event(event, payload)
+        if event != "token":
+            break
+    await send({"type": "http.response.body", "body": b""})
+    await turn
+
+    done_at = time.perf_counter()
+    Chatbot.record_stream_latency((first_token_at or done_at) - request_start, done_at - request_start, tokens)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/chat"): chat,
+    ("POST", "/chat/stream"): chat_stream,
+}
+
+
+# ============ WSGI BRIDGE ============
+async def call_flask(scope, receive, send):
+    """Serve any other route with the Flask view, run on the pipeline thread pool"""
+    body = await read_body(receive)
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value.decode("latin-1")
+        elif key != "CONTENT_LENGTH":
+            header = f"HTTP_{key}"
+            value = value.decode("latin-1")
+            environ[header] = f"{environ[header]},{value}" if header in environ else value
+
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    def run():
+        chunks = flask_app(environ, start_response)
+        try:
+            return b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    payload = await run_blocking(run)
+    await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+    await send({"type": "http.response.body", "body": payload})
+
+
+# ============ ASGI APP ============
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                Chatbot.start_cleanup_thread()
+                Chatbot.start_vectorstore_watch_thread()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    handler = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await call_flask(scope, receive, send)  # Flask's request hooks record these routes' metrics
+        return
+
+    start = time.perf_counter()
+    response = {"status": 500}
+
+    async def send_recording(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_recording)
+    finally:
+        Chatbot.record_request(scope["path"], scope["method"], response["status"], time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print(f"🚀 Serving the chatbot in async (ASGI) mode; components load in {Chatbot.STARTUP_MODE} mode")
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
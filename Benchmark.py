@@ -0,0 +1,597 @@
+"""Offline end-to-end benchmark of the chat pipeline.
+
+Runs the real pipeline (intent fast path, CrewAI classifier, tools, retrieval, semantic
+cache, session store, SQLite saves) with the paid services replaced by deterministic local
+stand-ins, so throughput and latency can be measured without OpenAI calls:
+- FakeChatModel replaces ChatOpenAI. Its replies are derived from the prompt, so the lead
+  qualification and consultation flows advance exactly as with the real model.
+- FakeEmbeddings replaces OpenAIEmbeddings with hashed bag-of-words vectors of the
+  vectorstore's dimension.
+- FakeCrewLLM answers the CrewAI intent classifier.
+Each stand-in waits for a latency drawn from a configurable distribution, using a seeded
+generator.
+
+Scripted multi-turn conversations (FAQ, portfolio, full lead qualification, consultation)
+are driven through /chat (the Flask app, in process), process_user_message (threads) or
+aprocess_user_message (the event loop) at increasing concurrency. Each level reports turn
+latency p50/p95/p99, throughput, CPU time and RSS as JSON, and `compare` diffs two result
+files. Leads and consultations go to a temporary database, never to leads.db.
+
+Usage:
+    python Benchmark.py run --targets chat process async --concurrency 1 8 32 \\
+        --llm-latency lognormal:0.4:0.3 --embedding-latency fixed:0.03 --output results.json
+    python Benchmark.py compare baseline.json results.json
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+import shutil
+import platform
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+# ============ SCRIPTED CONVERSATIONS ============
+# Each turn is (message, text expected in the reply or None); the last turn checks that the flow completed
+SCENARIOS = {
+    "faq": [
+        ("hi", None),
+        ("Do you provide cybersecurity services?", None),
+        ("What services does Genetech Solutions offer?", None),  # Misses the fast path: CrewAI classifier
+        ("What is your company email?", "@"),
+    ],
+    "portfolio": [
+        ("show me your portfolio", "portfolio"),
+        ("Who are your clients?", "clients"),
+        ("Can I see some reviews?", "testimonials"),
+    ],
+    "lead_qualification": [
+        ("I want to build a mobile app for my restaurant", None),
+        ("A food delivery app with rider tracking and an admin dashboard", None),
+        ("We need it within 3 months", None),
+        ("It's for my company", None),
+        ("Tasty Bites LLC", None),
+        ("My name is Sara Khan and my email is sara.khan@example.com", "all the information I need"),
+    ],
+    "consultation": [
+        ("Can I get a quick consultation?", None),
+        ("My name is Ali Raza", None),
+        ("ali.raza@example.com", "reach out to you shortly"),
+    ],
+}
+
+FALLBACK_MARKERS = ("technical issue", "technical hiccup", "issue saving")  # Replies that mean a turn failed
+
+
+# ============ LATENCY DISTRIBUTIONS ============
+class Latency:
+    """Seconds to wait per call, drawn from a distribution spec:
+    0.3 | fixed:0.3 | uniform:LOW:HIGH | normal:MEAN:STD | lognormal:MEDIAN:SIGMA | exp:MEAN"""
+
+    def __init__(self, spec, seed=0):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        self.kind = kind
+        self.params = [float(value) for value in params.split(":")]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"bad latency spec {spec!r} ({self.__class__.__doc__.splitlines()[1].strip()})")
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "fixed":
+                value = self.params[0]
+            elif self.kind == "uniform":
+                value = self._rng.uniform(*self.params)
+            elif self.kind == "normal":
+                value = self._rng.gauss(*self.params)
+            elif self.kind == "lognormal":
+                value = self._rng.lognormvariate(math.log(self.params[0]), self.params[1])
+            else:
+                value = self._rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self):
+        return self.spec
+
+
+# ============ STAND-INS ============
+def prompt_text(messages):
+    return "\n".join(str(getattr(message, "content", message)) for message in messages)
+
+
+def last_match(pattern, text):
+    matches = re.findall(pattern, text)
+    return matches[-1] if matches else ""
+
+
+def scripted_reply(prompt):
+    """Deterministic answer for a pipeline prompt, in the format its tool parses"""
+    if "Respond with: STATUS|next_question|your_response" in prompt:
+        question = last_match(r"Current question: (\w+)", prompt)
+        message = last_match(r'Now analyze this response: "(.*)"', prompt)
+        if "consultation coordinator" in prompt:
+            if question == "name":
+                return "VALID|email|Thanks! What's your email address?"
+            if "@" in message:
+                return "VALID|completed|Perfect, we'll be in touch."
+            return "INVALID|email|Please share a valid email address."
+        if question == "project_description":
+            return "VALID|timeline|Sounds great! When do you need it completed?"
+        if question == "timeline":
+            return "VALID|project_type|Got it. Is this project for yourself or are you representing a company?"
+        if question == "project_type":
+            if any(word in message.lower() for word in ["company", "business", "organization", "firm"]):
+                return "VALID|company_name|Great, what's the company name?"
+            return "VALID|contact_info|Thanks! Please share your name and email."
+        if question == "company_name":
+            return "VALID|contact_info|Thanks! Please share your name and email."
+        if "@" in message:
+            return "VALID|completed|Perfect! I have all the information I need about your project."
+        return "VALID|contact_info|Thanks! I also need your email address."
+    if "Update the running summary" in prompt:
+        return "The visitor is discussing a project with Genetech Solutions."
+    return ("Genetech Solutions builds web, mobile and cloud software for startups and enterprises, "
+            "with dedicated teams for design, development, QA and support. Would you like to discuss your project?")
+
+
+def build_fake_chat_model(latency, token_interval=0.0):
+    """ChatOpenAI stand-in: scripted replies with usage metadata after a sampled latency (sync, async and streaming)"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    def usage(prompt, reply):
+        input_tokens, output_tokens = max(1, len(prompt) // 4), max(1, len(reply) // 4)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def words(reply):
+        return re.findall(r"\S+\s*", reply)
+
+    class FakeChatModel(BaseChatModel):
+        model_name: str = "fake-chat"
+
+        @property
+        def _llm_type(self):
+            return "fake-chat"
+
+        def _result(self, messages):
+            prompt = prompt_text(messages)
+            reply = scripted_reply(prompt)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply, usage_metadata=usage(prompt, reply)))])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(latency.sample())
+            return self._result(messages)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(latency.sample())
+            return self._result(messages)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = prompt_text(messages)
+            reply = scripted_reply(prompt)
+            time.sleep(latency.sample())
+            for word in words(reply):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+                if token_interval:
+                    time.sleep(token_interval)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage(prompt, reply)))
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = prompt_text(messages)
+            reply = scripted_reply(prompt)
+            await asyncio.sleep(latency.sample())
+            for word in words(reply):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+                if token_interval:
+                    await asyncio.sleep(token_interval)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage(prompt, reply)))
+
+    return FakeChatModel()
+
+
+def build_fake_embeddings(latency, dimension):
+    """OpenAIEmbeddings stand-in: normalized hashed bag-of-words vectors (same text, same vector)"""
+    from langchain_core.embeddings import Embeddings
+
+    class FakeEmbeddings(Embeddings):
+        model = "fake-embeddings"
+
+        def _vector(self, text):
+            vector = [0.0] * dimension
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % dimension
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            return [value / norm for value in vector]
+
+        def embed_documents(self, texts):
+            time.sleep(latency.sample())
+            return [self._vector(text) for text in texts]
+
+        def embed_query(self, text):
+            time.sleep(latency.sample())
+            return self._vector(text)
+
+    return FakeEmbeddings()
+
+
+def build_fake_crew_llm(latency):
+    """CrewAI LLM stand-in for the intent classifier agent (the direct router needs no other agent)"""
+    from crewai.llms.base_llm import BaseLLM
+
+    class FakeCrewLLM(BaseLLM):
+        def __init__(self):
+            super().__init__(model="fake-crew")
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None):
+            time.sleep(latency.sample())
+            message = last_match(r'USER MESSAGE: "(.*)"', prompt_text(
+                [item.get("content", "") if isinstance(item, dict) else item for item in messages]
+                if isinstance(messages, list) else [messages])).lower()
+            intent = "greeting_feedback" if any(word in message for word in ("thank", "helpful", "great")) else "company_info"
+            return f"Thought: I now know the final answer\nFinal Answer: {intent}"
+
+        def supports_function_calling(self):
+            return False
+
+        def supports_stop_words(self):
+            return True
+
+        def get_context_window_size(self):
+            return 128000
+
+    return FakeCrewLLM()
+
+
+# ============ SETUP ============
+def install_stand_ins(llm_latency, embedding_latency, token_interval, work_dir, semantic_cache=True):
+    """Import Chatbot and swap its LLM, embeddings, classifier crews and leads database for the stand-ins"""
+    import Chatbot
+    from Crew_Pool import CrewPool
+    from Embedding_Cache import CachedEmbeddings
+
+    Chatbot.startup.wait("database", "llm", "embeddings", "vectorstore", "agents")
+    if Chatbot.ROUTER_MODE != "direct":
+        raise SystemExit("The benchmark scripts the direct router only; unset ROUTER_MODE")
+
+    Chatbot.llm = build_fake_chat_model(llm_latency, token_interval)
+
+    dimension = Chatbot.rag_state.vectorstore.index.d if Chatbot.rag_state is not None else 1536
+    Chatbot.embeddings = CachedEmbeddings(build_fake_embeddings(embedding_latency, dimension),
+                                          os.path.join(work_dir, "embedding_cache.db"))
+    Chatbot.SEMANTIC_CACHE_ENABLED = semantic_cache
+
+    crew_llm = build_fake_crew_llm(llm_latency)
+
+    def build_fake_crew():
+        crew = Chatbot.build_crew()
+        for agent in crew.agents:
+            agent.llm = crew_llm
+        return crew
+
+    Chatbot.crew_pool = CrewPool(build_fake_crew, max_size=Chatbot.CREW_POOL_SIZE)
+
+    Chatbot.DATABASE_PATH = os.path.join(work_dir, "leads.db")
+    Chatbot.initialize_database()
+    return Chatbot
+
+
+# ============ MEASUREMENT ============
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted seconds, in milliseconds"""
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))] * 1000, 2)
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "turns": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else None,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+    }
+
+
+def cpu_seconds():
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    except ImportError:
+        return time.process_time()
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), or None where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def mib(value):
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+
+class LevelRecorder:
+    """Turn latencies and failures of one concurrency level, per scenario"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in SCENARIOS}
+        self.errors = []
+        self.flow_failures = {name: 0 for name in SCENARIOS}
+        self.conversations = 0
+        self._lock = threading.Lock()
+
+    def turn(self, scenario, seconds, reply, expected, error=None):
+        with self._lock:
+            if error is not None:
+                self.errors.append(error)
+                return False
+            self.latencies[scenario].append(seconds)
+            if any(marker in reply for marker in FALLBACK_MARKERS):
+                self.errors.append("fallback reply")
+            if expected is not None and expected.lower() not in reply.lower():
+                self.flow_failures[scenario] += 1
+            return True
+
+    def conversation_done(self):
+        with self._lock:
+            self.conversations += 1
+
+
+def conversation_plan(user_index, conversations_per_user):
+    names = list(SCENARIOS)
+    return [names[(user_index + offset) % len(names)] for offset in range(conversations_per_user)]
+
+
+# ============ DRIVERS ============
+def run_conversation_process(chatbot, scenario, recorder):
+    session_id = str(uuid.uuid4())
+    for message, expected in SCENARIOS[scenario]:
+        start = time.perf_counter()
+        try:
+            result = chatbot.process_user_message(message, session_id)
+        except Exception as e:
+            recorder.turn(scenario, 0, "", expected, error=type(e).__name__)
+            return
+        recorder.turn(scenario, time.perf_counter() - start, result.get("response", ""), expected)
+    recorder.conversation_done()
+
+
+def run_conversation_chat(chatbot, scenario, recorder):
+    client = chatbot.app.test_client()  # One cookie jar, so one session, per conversation
+    for message, expected in SCENARIOS[scenario]:
+        start = time.perf_counter()
+        try:
+            response = client.post("/chat", json={"message": message})
+            payload = response.get_json() or {}
+            if response.status_code != 200 or "response" not in payload:
+                raise RuntimeError(f"HTTP {response.status_code}")
+        except Exception as e:
+            recorder.turn(scenario, 0, "", expected, error=str(e) or type(e).__name__)
+            return
+        recorder.turn(scenario, time.perf_counter() - start, payload["response"], expected)
+    recorder.conversation_done()
+
+
+async def arun_conversation(chatbot, scenario, recorder):
+    session_id = str(uuid.uuid4())
+    for message, expected in SCENARIOS[scenario]:
+        start = time.perf_counter()
+        try:
+            result = await chatbot.aprocess_user_message(message, session_id)
+        except Exception as e:
+            recorder.turn(scenario, 0, "", expected, error=type(e).__name__)
+            return
+        recorder.turn(scenario, time.perf_counter() - start, result.get("response", ""), expected)
+    recorder.conversation_done()
+
+
+def drive_level(chatbot, target, concurrency, conversations_per_user, recorder):
+    """Run every virtual user's conversations, one after another per user, all users at once"""
+    if target == "async":
+        async def user(user_index):
+            for scenario in conversation_plan(user_index, conversations_per_user):
+                await arun_conversation(chatbot, scenario, recorder)
+
+        async def main():
+            await asyncio.gather(*[user(user_index) for user_index in range(concurrency)])
+
+        asyncio.run(main())
+        return
+
+    run_conversation = run_conversation_chat if target == "chat" else run_conversation_process
+
+    def user(user_index):
+        for scenario in conversation_plan(user_index, conversations_per_user):
+            run_conversation(chatbot, scenario, recorder)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark-user") as pool:
+        list(pool.map(user, range(concurrency)))
+
+
+def run_level(chatbot, target, concurrency, conversations_per_user, quiet=True):
+    """Benchmark one target at one concurrency level"""
+    chatbot.semantic_cache.invalidate()  # Every level starts cold, so levels are comparable
+    recorder = LevelRecorder()
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        drive_level(chatbot, target, concurrency, conversations_per_user, recorder)
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+
+    all_latencies = [seconds for latencies in recorder.latencies.values() for seconds in latencies]
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "conversations": recorder.conversations,
+        "errors": len(recorder.errors),
+        "error_kinds": sorted(set(recorder.errors)),
+        "flow_failures": sum(recorder.flow_failures.values()),
+        "seconds": round(wall, 3),
+        "throughput_turns_per_s": round(len(all_latencies) / wall, 2) if wall else 0.0,
+        "throughput_conversations_per_s": round(recorder.conversations / wall, 3) if wall else 0.0,
+        "latency": latency_summary(all_latencies),
+        "scenarios": {name: {**latency_summary(latencies), "flow_failures": recorder.flow_failures[name]}
+                      for name, latencies in recorder.latencies.items() if latencies},
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else 0.0,
+        "rss_mib": mib(rss_bytes()),
+        "peak_rss_mib": mib(peak_rss_bytes()),
+        "sessions": len(chatbot.session_store),
+    }
+
+
+def run_benchmark(targets, concurrency_levels, conversations_per_user=2, llm_latency="lognormal:0.4:0.3",
+                  embedding_latency="fixed:0.03", token_interval=0.0, seed=0, semantic_cache=True, warmup=True, quiet=True):
+    """Benchmark each target at each concurrency level; returns the machine-readable results"""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")  # Never used: every call goes to a stand-in
+    os.environ.setdefault("VECTORSTORE_WATCH_INTERVAL", "0")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+    work_dir = tempfile.mkdtemp(prefix="chatbot-benchmark-")
+    llm_latency, embedding_latency = Latency(llm_latency, seed), Latency(embedding_latency, seed + 1)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        chatbot = install_stand_ins(llm_latency, embedding_latency, token_interval, work_dir, semantic_cache)
+        if warmup:
+            # One untimed pass over every scenario builds the first crew and loads lazy imports
+            for scenario in SCENARIOS:
+                run_conversation_process(chatbot, scenario, LevelRecorder())
+
+    results = {
+        "config": {
+            "targets": targets,
+            "concurrency": concurrency_levels,
+            "conversations_per_user": conversations_per_user,
+            "scenarios": {name: len(turns) for name, turns in SCENARIOS.items()},
+            "llm_latency": repr(llm_latency),
+            "embedding_latency": repr(embedding_latency),
+            "token_interval": token_interval,
+            "seed": seed,
+            "semantic_cache": semantic_cache,
+            "warmup": warmup,
+            "retrieval_mode": chatbot.RETRIEVAL_MODE,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "runs": [],
+    }
+    for target in targets:
+        for concurrency in concurrency_levels:
+            level = run_level(chatbot, target, concurrency, conversations_per_user, quiet)
+            results["runs"].append(level)
+            latency = level["latency"]
+            print(f"{target:>7} c={concurrency:<4} {level['throughput_turns_per_s']:>8.1f} turns/s  "
+                  f"p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  p99 {latency['p99_ms']} ms  "
+                  f"cpu {level['cpu_percent']}%  rss {level['rss_mib']} MiB  "
+                  f"errors {level['errors']}  flow failures {level['flow_failures']}")
+    results["prompt_usage"] = chatbot.prompts.get_usage()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+# ============ COMPARISON ============
+def compare_results(baseline, candidate):
+    """Per target and concurrency: throughput and latency percentiles of candidate vs baseline"""
+    def index(results):
+        return {(run["target"], run["concurrency"]): run for run in results["runs"]}
+
+    def change(old, new):
+        if old is None or new is None:
+            return None
+        return round((new - old) / old * 100, 1) if old else None
+
+    def signed(percent):
+        return "n/a" if percent is None else f"{percent:+}%"
+
+    before, after = index(baseline), index(candidate)
+    rows = []
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        row = {"target": key[0], "concurrency": key[1],
+               "throughput_change_percent": change(old["throughput_turns_per_s"], new["throughput_turns_per_s"])}
+        for name in ("p50_ms", "p95_ms", "p99_ms"):
+            row[name] = [old["latency"][name], new["latency"][name]]
+            row[f"{name[:-3]}_change_percent"] = change(old["latency"][name], new["latency"][name])
+        row["cpu_seconds"] = [old["cpu_seconds"], new["cpu_seconds"]]
+        row["rss_mib"] = [old["rss_mib"], new["rss_mib"]]
+        rows.append(row)
+        print(f"{key[0]:>7} c={key[1]:<4} throughput {signed(row['throughput_change_percent'])}  "
+              f"p50 {signed(row['p50_change_percent'])}  p95 {signed(row['p95_change_percent'])}  "
+              f"p99 {signed(row['p99_change_percent'])}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end chat benchmark with fake LLM and embeddings")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Run scripted conversations at increasing concurrency")
+    run_parser.add_argument("--targets", nargs="+", choices=["chat", "process", "async"], default=["chat", "process", "async"],
+                            help="chat: POST /chat on the Flask app; process: process_user_message on threads; "
+                                 "async: aprocess_user_message on the event loop")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    run_parser.add_argument("--conversations-per-user", type=int, default=2)
+    run_parser.add_argument("--llm-latency", default="lognormal:0.4:0.3", help=Latency.__doc__.splitlines()[1].strip())
+    run_parser.add_argument("--embedding-latency", default="fixed:0.03")
+    run_parser.add_argument("--token-interval", type=float, default=0.0, help="Seconds between streamed tokens")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--no-semantic-cache", action="store_true")
+    run_parser.add_argument("--no-warmup", action="store_true", help="Also time the first crew build and lazy imports")
+    run_parser.add_argument("--verbose", action="store_true", help="Show the chatbot's own log lines")
+    run_parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+
+    compare_parser = subcommands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--output", default=None, help="Write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        output = run_benchmark(args.targets, args.concurrency, args.conversations_per_user, args.llm_latency,
+                               args.embedding_latency, args.token_interval, args.seed,
+                               semantic_cache=not args.no_semantic_cache, warmup=not args.no_warmup,
+                               quiet=not args.verbose)
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline_results = json.load(f)
+        with open(args.candidate, encoding="utf-8") as f:
+            candidate_results = json.load(f)
+        output = compare_results(baseline_results, candidate_results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
@@ -1,7 +1,6 @@
-from flask import Flask, request, jsonify, render_template, session, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, session, send_from_directory
 from flask_cors import CORS
 import os
-import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 import uuid
@@ -10,13 +9,29 @@ import threading
 import sqlite3
 import json
 import re
+import gc
+import queue
+import functools
+import contextlib
+import sys
+from collections import namedtuple
 load_dotenv()
-# CrewAI imports
-from crewai import Agent, Task, Crew, Process
-from crewai.tools import tool
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.prompts import PromptTemplate
+# CrewAI, langchain_openai and Knowledge_Base (faiss) are imported lazily by the startup loaders
+from Intent_Classifier import FastIntentClassifier, DEFAULT_THRESHOLD, DEFAULT_MARGIN
+from Tool_Templates import render_contact_info, render_portfolio, render_clients_reviews, get_template_stats
+from Semantic_Cache import SemanticAnswerCache, vectorstore_fingerprint
+from Embedding_Cache import CachedEmbeddings
+from Hybrid_Retriever import HybridRetriever
+from Context_Builder import build_context, count_tokens, DEFAULT_TOKEN_BUDGET
+from Prompt_Registry import PromptRegistry
+from Startup import StartupComponents, ComponentNotReady
+from Crew_Pool import CrewPool
+from Session_Store import SessionStore, DEFAULT_SHARDS, DEFAULT_LEASE_TTL
+from Session_Backends import create_backend
+from Conversation_Window import ConversationWindow, SummaryWorker
+from Pipeline_Steps import LLMCall, BlockingCall, token_sink, steps_of, run_steps, arun_steps
+from Metrics import MetricsRegistry, FAST_BUCKETS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from Tracing import TraceExporter, start_trace, span, annotate
 # Initialize Flask app
 
 app = Flask(__name__)
@@ -25,15 +40,91 @@ CORS(app)  # Enable CORS for all routes
 # Configure static folder for logo
 app.config['UPLOAD_FOLDER'] = 'static'
 
+# ============ METRICS ============
+# Recorded lock-free on the request path and served by /metrics; component stats are read at scrape time
+metrics = MetricsRegistry(prefix="chatbot_")
+http_requests_metric = metrics.counter("http_requests_total", "HTTP requests by route, method and status", ["route", "method", "status"])
+http_latency_metric = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route, until the response is fully sent", ["route", "method"])
+turns_metric = metrics.counter("turns_total", "Chat turns by classified intent", ["intent"])
+turn_latency_metric = metrics.histogram("turn_duration_seconds", "process_user_message latency by classified intent", ["intent"])
+llm_calls_metric = metrics.counter("llm_calls_total", "LLM calls by tool (registered prompt name)", ["tool"])
+llm_latency_metric = metrics.histogram("llm_call_duration_seconds", "LLM call latency by tool", ["tool"])
+llm_tokens_metric = metrics.counter("llm_tokens_total", "LLM tokens by tool and kind (prompt, cached_prompt, completion)", ["tool", "kind"])
+retrieval_latency_metric = metrics.histogram("retrieval_duration_seconds", "Knowledge base retrieval latency by stage (embed, search)", ["stage"])
+sqlite_write_metric = metrics.histogram("sqlite_write_duration_seconds", "leads.db write latency by table", ["table"], buckets=FAST_BUCKETS)
+session_save_metric = metrics.histogram("session_save_duration_seconds", "Session backend write latency", ["backend"], buckets=FAST_BUCKETS)
+
+def record_request(route, method, status, seconds):
+    """Count one HTTP request and observe its latency"""
+    http_requests_metric.labels(route, method, str(status)).inc()
+    http_latency_metric.labels(route, method).observe(seconds)
+
+def record_turn(intent, seconds):
+    """Count one chat turn under its intent and observe its latency"""
+    turns_metric.labels(intent).inc()
+    turn_latency_metric.labels(intent).observe(seconds)
+
+def record_llm_call(tool, seconds, input_tokens, cached_tokens, output_tokens):
+    """PromptRegistry on_call hook: count the call, its latency and its tokens"""
+    llm_calls_metric.labels(tool).inc()
+    if seconds is not None:
+        llm_latency_metric.labels(tool).observe(seconds)
+    if input_tokens is not None:
+        llm_tokens_metric.labels(tool, "prompt").inc(input_tokens)
+        llm_tokens_metric.labels(tool, "cached_prompt").inc(cached_tokens)
+        llm_tokens_metric.labels(tool, "completion").inc(output_tokens)
+
+# ============ TRACING ============
+# Chat turns are traced span by span (see Tracing); /admin/traces serves recent traces and
+# TRACE_EXPORT_PATH also appends each one to a JSONL file
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+trace_exporter = TraceExporter(capacity=int(os.environ.get('TRACE_BUFFER_SIZE', 200)),
+                               path=os.environ.get('TRACE_EXPORT_PATH') or None)
+
+def trace_request(name, **attributes):
+    """Trace one chat request; the block gets the Trace, or None when tracing is disabled"""
+    if not TRACING_ENABLED:
+        return contextlib.nullcontext()
+    return start_trace(name, trace_exporter, **attributes)
+
 # Session management
-session_crews = {}
-session_last_activity = {}
-session_conversations = {}  # Store conversation history for each session
-session_lead_data = {}  # Store lead qualification data for each session
-session_consultation_data = {}  # Store consultation data for each session
 SESSION_TIMEOUT = 1800  # 30 minutes in seconds
-
+SESSION_CLEANUP_INTERVAL = float(os.environ.get('SESSION_CLEANUP_INTERVAL', 1))  # Seconds between expiry passes
 MAX_CONVERSATION_LENGTH = 10  # Maximum number of messages to keep in context
+# Token budget for the conversation window (0 = message count only); older turns fold into a rolling summary
+CONVERSATION_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_TOKEN_BUDGET', 1000))
+CONVERSATION_SUMMARY_ENABLED = os.environ.get('CONVERSATION_SUMMARY_ENABLED', 'true').lower() == 'true'
+SESSION_MAX_LIVE = int(os.environ.get('SESSION_MAX_LIVE', 10000))  # Hard cap; least recently active evicted first (0 = no cap)
+
+# Conversation history, lead and consultation data and last activity for each session.
+# SESSION_BACKEND (sqlite:///path or redis://host:port/db) shares it across worker processes;
+# a backend lease, held for at most SESSION_LEASE_TTL seconds, runs one worker's turn of a session at a time
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'local')
+session_store = SessionStore(shards=int(os.environ.get('SESSION_STORE_SHARDS', DEFAULT_SHARDS)),
+                             backend=create_backend(SESSION_BACKEND), ttl=SESSION_TIMEOUT,
+                             max_sessions=SESSION_MAX_LIVE,
+                             window_factory=functools.partial(ConversationWindow, max_messages=MAX_CONVERSATION_LENGTH,
+                                                              max_tokens=CONVERSATION_TOKEN_BUDGET,
+                                                              keep_evicted=CONVERSATION_SUMMARY_ENABLED),
+                             on_save=lambda seconds: session_save_metric.labels(SESSION_BACKEND.split(":", 1)[0]).observe(seconds),
+                             lease_ttl=int(os.environ.get('SESSION_LEASE_TTL', DEFAULT_LEASE_TTL)))
+context_size_stats = {"turns": 0, "context_tokens": 0, "fixed_window_tokens": 0, "message_tokens": 0,
+                      "max_context_tokens": 0, "max_fixed_window_tokens": 0}
+context_size_lock = threading.Lock()
+
+# Local intent fast path (rules + nearest exemplar) in front of the LLM classifier
+INTENT_FASTPATH_ENABLED = os.environ.get('INTENT_FASTPATH_ENABLED', 'true').lower() == 'true'
+INTENT_FASTPATH_THRESHOLD = float(os.environ.get('INTENT_FASTPATH_THRESHOLD', DEFAULT_THRESHOLD))
+fast_intent_classifier = FastIntentClassifier(threshold=INTENT_FASTPATH_THRESHOLD, margin=DEFAULT_MARGIN)
+
+# Tool routing: 'direct' calls the tool named by the routing table, 'agent' uses query_router_agent
+ROUTER_MODE = os.environ.get('ROUTER_MODE', 'direct').lower()
+router_latency_stats = {}
+router_latency_lock = threading.Lock()
+
+# Startup: heavy components load on background threads ('parallel') or one after another ('serial')
+STARTUP_MODE = os.environ.get('STARTUP_MODE', 'parallel').lower()
+startup = StartupComponents()
 
 
 
@@ -47,8 +138,10 @@ MAX_CONVERSATION_LENGTH = 10  # Maximum number of messages to keep in context
 # ============ DATABASE SETUP ============
 DATABASE_PATH = 'leads.db'
 
-def get_db_connection():
+def get_db_connection(wait_ready=True):
     """Create a database connection to the SQLite database"""
+    if wait_ready:
+        startup.wait("database")
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row
     return conn
@@ -56,7 +149,7 @@ def get_db_connection():
 def initialize_database():
     """Initialize the database with the required tables"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(wait_ready=False)
         cursor = conn.cursor()
         
         # Create leads table with updated schema
@@ -96,8 +189,10 @@ def initialize_database():
         print(f"❌ Error initializing database: {e}")
         return False
 
-# Initialize database on startup
-initialize_database()
+def load_database():
+    """Startup loader for the leads database"""
+    if not initialize_database():
+        raise RuntimeError("database initialization failed")
 
 
 
@@ -112,11 +207,57 @@ initialize_database()
 
 
 # ============ LLM SETUP ============
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.1,
-    max_tokens=500
-)
+llm = None
+
+def load_llm():
+    """Startup loader for the shared ChatOpenAI client"""
+    global llm
+    from langchain_openai import ChatOpenAI
+    llm = ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0.1,
+        max_tokens=500,
+        stream_usage=True  # Streamed responses report token usage too (cached-token accounting)
+    )
+
+def get_llm():
+    """Return the LLM client, waiting for it if startup is still loading it"""
+    startup.wait("llm")
+    return llm
+
+# Tool prompts are compiled once at import; prompts.chain(name, llm) reuses their prompt | llm runnables
+prompts = PromptRegistry(on_call=record_llm_call)
+
+# ============ STREAMING ============
+# /chat/stream sets Pipeline_Steps.token_sink for its turn; LLMCall(..., stream=True) steps stream into it
+stream_latency_stats = {"count": 0, "total_ttft_seconds": 0.0, "max_ttft_seconds": 0.0, "total_seconds": 0.0, "tokens": 0}
+stream_latency_lock = threading.Lock()
+
+def format_sse(event: str, payload: dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def record_stream_latency(ttft: float, total: float, tokens: int):
+    """Record time-to-first-token and total time for one streamed response"""
+    with stream_latency_lock:
+        stream_latency_stats["count"] += 1
+        stream_latency_stats["total_ttft_seconds"] += ttft
+        stream_latency_stats["max_ttft_seconds"] = max(stream_latency_stats["max_ttft_seconds"], ttft)
+        stream_latency_stats["total_seconds"] += total
+        stream_latency_stats["tokens"] += tokens
+    print(f"⏱️  Stream: first token after {ttft * 1000:.1f} ms, done after {total * 1000:.1f} ms ({tokens} tokens)")
+
+def get_stream_latency_stats():
+    """Average and max time-to-first-token for streamed responses"""
+    with stream_latency_lock:
+        count = stream_latency_stats["count"]
+        return {
+            "count": count,
+            "avg_ttft_ms": round(stream_latency_stats["total_ttft_seconds"] / count * 1000, 2) if count else 0.0,
+            "max_ttft_ms": round(stream_latency_stats["max_ttft_seconds"] * 1000, 2),
+            "avg_total_ms": round(stream_latency_stats["total_seconds"] / count * 1000, 2) if count else 0.0,
+            "tokens": stream_latency_stats["tokens"]
+        }
 
 
 
@@ -126,24 +267,56 @@ llm = ChatOpenAI(
 
 # ============ CUSTOM RAG SETUP ============
 COMPANY_NAME = "Genetech Solutions"
-vectorstore = None
+VECTORSTORE_PATH = os.path.join("data", "vectorStores", "store")
+
+# The vectorstore and its retriever are swapped together as one immutable state, so an
+# in-flight search keeps using the index it started with while a reload swaps in a new one
+RagState = namedtuple('RagState', ['vectorstore', 'retriever', 'fingerprint', 'loaded_at'])
+rag_state = None
 rag_initialized = False
+rag_reload_lock = threading.Lock()
+rag_reload_status = {"state": "idle", "reloads": 0, "last_reload": None, "last_error": None}
+
+# Retrieval: 'hybrid' fuses BM25 and FAISS with reciprocal rank fusion, 'dense' is FAISS only
+RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'hybrid').lower()
+RAG_TOP_K = int(os.environ.get('RAG_TOP_K', 4 if RETRIEVAL_MODE == 'hybrid' else 10))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
+
+# Reload: poll the store files every N seconds (0 disables the watcher); warm new indexes with these probes
+VECTORSTORE_WATCH_INTERVAL = int(os.environ.get('VECTORSTORE_WATCH_INTERVAL', 30))
+# A replaced vectorstore's SQLite connections close this many seconds after the swap, once in-flight searches are done
+RAG_RETIRE_GRACE_SECONDS = int(os.environ.get('RAG_RETIRE_GRACE_SECONDS', 30))
+RAG_WARMUP_QUERIES = [
+    "What services do you offer?",
+    "Do you build mobile apps?",
+    "Do you provide cybersecurity services?",
+]
+
+def load_rag_state(vectorstore_path):
+    """Load the vectorstore (and BM25 retriever) from disk into a new RagState"""
+    # Fingerprint before loading so writes that land mid-load trigger another reload
+    fingerprint = vectorstore_fingerprint(vectorstore_path)
+    from Knowledge_Base import load_vectorstore
+    # Uses the lazy SQLite docstore when docstore.db exists, index.pkl otherwise
+    store = load_vectorstore(vectorstore_path, embeddings)
+    hybrid_retriever = None
+    if RETRIEVAL_MODE == 'hybrid':
+        hybrid_retriever = HybridRetriever(store)
+        print(f"✅ BM25 index built over {len(hybrid_retriever.bm25.doc_ids)} chunks for hybrid retrieval")
+    return RagState(store, hybrid_retriever, fingerprint, time.time())
 
 def initialize_custom_rag():
     """Initialize custom RAG system with vectorstore"""
-    global vectorstore, rag_initialized
+    global rag_state, rag_initialized
     
     try:
-        vectorstore_path = os.path.join("data", "vectorStores", "store")
+        vectorstore_path = VECTORSTORE_PATH
         
         if os.path.exists(vectorstore_path):
-            vectorstore = FAISS.load_local(
-                vectorstore_path, 
-                embeddings, 
-                allow_dangerous_deserialization=True
-            )
+            rag_state = load_rag_state(vectorstore_path)
             rag_initialized = True
-            print("✅ Custom RAG system initialized successfully")
+            from Knowledge_Base import read_index_meta
+            print(f"✅ Custom RAG system initialized successfully ({read_index_meta(vectorstore_path)['mode']} index)")
             return True
         else:
             print(f"⚠️  Vectorstore not found at {vectorstore_path}")
@@ -153,9 +326,117 @@ def initialize_custom_rag():
         print(f"❌ Error initializing RAG system: {e}")
         return False
 
-# Initialize embeddings and RAG system
-embeddings = OpenAIEmbeddings()
-rag_initialized = initialize_custom_rag()
+def close_rag_state(state):
+    """Close a replaced vectorstore's SQLite connections (a pickle docstore holds none)"""
+    close = getattr(state.vectorstore.docstore, "close", None)
+    if close is not None:
+        close()
+
+def warm_rag_state(state):
+    """Run probe queries so the new index pages in before it serves traffic"""
+    for query in RAG_WARMUP_QUERIES:
+        query_vector = embeddings.embed_query(query)
+        if state.retriever is not None:
+            state.retriever.similarity_search_by_vector(query, query_vector, k=RAG_TOP_K)
+        else:
+            state.vectorstore.similarity_search_by_vector(query_vector, k=RAG_TOP_K)
+
+def reload_vectorstore():
+    """Load and warm the vectorstore from disk, then atomically swap it in"""
+    global rag_state, rag_initialized
+    
+    if not rag_reload_lock.acquire(blocking=False):
+        print("⏳ Vectorstore reload already in progress")
+        return False
+    
+    new_state = None
+    try:
+        startup.wait("embeddings")
+        rag_reload_status["state"] = "loading"
+        start = time.perf_counter()
+        new_state = load_rag_state(VECTORSTORE_PATH)
+        rag_reload_status["state"] = "warming"
+        warm_rag_state(new_state)
+        
+        # Single reference assignment: requests already holding the old state finish on it
+        old_state = rag_state
+        rag_state = new_state
+        rag_initialized = True
+        semantic_cache.invalidate()
+        
+        # Free the old index once in-flight searches drop their references
+        if old_state is not None:
+            closer = threading.Timer(RAG_RETIRE_GRACE_SECONDS, close_rag_state, args=(old_state,))
+            closer.daemon = True
+            closer.start()
+        del old_state
+        gc.collect()
+        
+        rag_reload_status.update({
+            "state": "idle",
+            "reloads": rag_reload_status["reloads"] + 1,
+            "last_reload": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "last_error": None,
+            "last_reload_seconds": round(time.perf_counter() - start, 3)
+        })
+        print(f"🔄 Vectorstore reloaded: {new_state.vectorstore.index.ntotal} vectors in {time.perf_counter() - start:.2f}s")
+        return True
+        
+    except Exception as e:
+        if new_state is not None and new_state is not rag_state:
+            close_rag_state(new_state)
+        rag_reload_status.update({"state": "idle", "last_error": str(e)})
+        print(f"❌ Error reloading vectorstore, keeping the current one: {e}")
+        return False
+    finally:
+        rag_reload_lock.release()
+
+def start_vectorstore_watch_thread():
+    """Start a background thread that reloads the vectorstore when its files change"""
+    if VECTORSTORE_WATCH_INTERVAL <= 0:
+        return
+    
+    def watch():
+        pending_fingerprint = None
+        while True:
+            time.sleep(VECTORSTORE_WATCH_INTERVAL)
+            fingerprint = vectorstore_fingerprint(VECTORSTORE_PATH)
+            if not fingerprint or (rag_state is not None and fingerprint == rag_state.fingerprint):
+                pending_fingerprint = None
+                continue
+            if fingerprint != pending_fingerprint:
+                # Wait one more interval so a rebuild or ingest in progress can finish writing
+                pending_fingerprint = fingerprint
+                continue
+            pending_fingerprint = None
+            reload_vectorstore()
+    
+    thread = threading.Thread(target=watch, daemon=True)
+    thread.start()
+
+# Embeddings and RAG system are loaded by the startup components registered at the bottom
+# Query embeddings are cached in memory and in SQLite so repeated questions skip the API
+EMBEDDING_CACHE_PATH = os.path.join("data", "embedding_cache.db")
+embeddings = None
+
+def load_embeddings():
+    """Startup loader for the cached OpenAI embeddings"""
+    global embeddings
+    from langchain_openai import OpenAIEmbeddings
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(), EMBEDDING_CACHE_PATH)
+
+def load_rag():
+    """Startup loader for the vectorstore; a missing store leaves RAG disabled rather than failing"""
+    initialize_custom_rag()
+
+# Semantic answer cache for search_company_info (keyed by query embedding)
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+semantic_cache = SemanticAnswerCache(
+    VECTORSTORE_PATH,
+    threshold=float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.92)),
+    max_entries=int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', 1000)),
+    ttl_seconds=int(os.environ.get('SEMANTIC_CACHE_TTL', 3600))
+)
 
 
 
@@ -166,38 +447,74 @@ rag_initialized = initialize_custom_rag()
 
 # ============ CONVERSATION MANAGEMENT ============
 def add_message_to_conversation(session_id, role, message):
-    """Add a message to the conversation history"""
-    if session_id not in session_conversations:
-        session_conversations[session_id] = []
-    
-    # Add the new message
-    session_conversations[session_id].append({
-        "role": role,
-        "message": message,
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    })
-    
-    # Keep only the last MAX_CONVERSATION_LENGTH messages
-    if len(session_conversations[session_id]) > MAX_CONVERSATION_LENGTH:
-        session_conversations[session_id] = session_conversations[session_id][-MAX_CONVERSATION_LENGTH:]
+    """Add a message to the conversation history; messages pushed out of the window are summarized in the background"""
+    evicted = session_store.get_or_create(session_id).conversation.append(role, message)
+    if evicted and CONVERSATION_SUMMARY_ENABLED:
+        summary_worker.submit(session_id)
 
 def get_conversation_context(session_id):
-    """Get the conversation context for a session"""
-    if session_id not in session_conversations:
-        return ""
-    
-    # Format the conversation as a string
-    context_parts = []
-    for msg in session_conversations[session_id]:
-        role = "User" if msg["role"] == "user" else "Assistant"
-        context_parts.append(f"{role}: {msg['message']}")
-    
-    return "\n".join(context_parts)
+    """Get the conversation context for a session (kept rendered by the session's ConversationWindow)"""
+    state = session_store.get(session_id)
+    return state.conversation.context if state is not None else ""
+
+prompts.register(
+    "conversation_summary",
+    template="""Update the running summary of a conversation between a visitor and the Genetech Solutions assistant.
+Keep facts needed to continue the conversation: the visitor's project, requirements, timeline, company, name, email and open questions. At most 80 words, plain text.
+
+Current summary: {previous_summary}
+
+Messages to add:
+{messages}
+
+Updated summary:""",
+    input_variables=["previous_summary", "messages"]
+)
+
+def summarize_conversation(previous_summary, lines):
+    """Fold messages that left the context window into the rolling summary (runs on the summary worker)"""
+    summary_chain = prompts.chain("conversation_summary", get_llm())
+    result = summary_chain.invoke({"previous_summary": previous_summary or "(none)", "messages": "\n".join(lines)})
+    return result.content if hasattr(result, 'content') else str(result)
+
+summary_worker = SummaryWorker(session_store, summarize_conversation)
+
+def record_context_size(session_id, user_input):
+    """Record this turn's conversation context size against the fixed MAX_CONVERSATION_LENGTH window"""
+    window = session_store.get_or_create(session_id).conversation
+    context_tokens = window.tokens()
+    fixed_window_tokens = window.fixed_window_tokens()
+    with context_size_lock:
+        context_size_stats["turns"] += 1
+        context_size_stats["context_tokens"] += context_tokens
+        context_size_stats["fixed_window_tokens"] += fixed_window_tokens
+        context_size_stats["message_tokens"] += count_tokens(user_input)
+        context_size_stats["max_context_tokens"] = max(context_size_stats["max_context_tokens"], context_tokens)
+        context_size_stats["max_fixed_window_tokens"] = max(context_size_stats["max_fixed_window_tokens"], fixed_window_tokens)
+
+def get_context_size_stats():
+    """Average and max conversation context tokens per turn, and the saving over a fixed window"""
+    with context_size_lock:
+        turns = context_size_stats["turns"]
+        context_tokens = context_size_stats["context_tokens"]
+        fixed_window_tokens = context_size_stats["fixed_window_tokens"]
+        return {
+            "turns": turns,
+            "token_budget": CONVERSATION_TOKEN_BUDGET,
+            "avg_context_tokens": round(context_tokens / turns, 1) if turns else 0.0,
+            "avg_fixed_window_tokens": round(fixed_window_tokens / turns, 1) if turns else 0.0,
+            "avg_message_tokens": round(context_size_stats["message_tokens"] / turns, 1) if turns else 0.0,
+            "max_context_tokens": context_size_stats["max_context_tokens"],
+            "max_fixed_window_tokens": context_size_stats["max_fixed_window_tokens"],
+            "tokens_saved_percent": round((1 - context_tokens / fixed_window_tokens) * 100, 1) if fixed_window_tokens else 0.0,
+            "summaries": summary_worker.get_stats()
+        }
 
 def init_lead_data(session_id):
     """Initialize lead data structure for a session with updated qualification flow"""
-    if session_id not in session_lead_data:
-        session_lead_data[session_id] = {
+    state = session_store.get_or_create(session_id)
+    if state.lead_data is None:
+        state.lead_data = {
             "in_qualification": False,
             "current_question": "project_description",  # Track current question
             "attempts": 0,  # Track attempts for current question
@@ -213,8 +530,9 @@ def init_lead_data(session_id):
 
 def init_consultation_data(session_id):
     """Initialize consultation data structure for a session"""
-    if session_id not in session_consultation_data:
-        session_consultation_data[session_id] = {
+    state = session_store.get_or_create(session_id)
+    if state.consultation_data is None:
+        state.consultation_data = {
             "in_consultation": False,
             "current_question": "name",  # Track current question (name -> email -> complete)
             "attempts": 0,  # Track attempts for current question
@@ -226,23 +544,44 @@ def init_consultation_data(session_id):
 
 def update_lead_data(session_id, key, value):
     """Update lead data for a session"""
-    init_lead_data(session_id)
-    session_lead_data[session_id][key] = value
+    get_lead_data(session_id)[key] = value
 
 def update_consultation_data(session_id, key, value):
     """Update consultation data for a session"""
-    init_consultation_data(session_id)
-    session_consultation_data[session_id][key] = value
+    get_consultation_data(session_id)[key] = value
 
 def get_lead_data(session_id):
     """Get lead data for a session"""
     init_lead_data(session_id)
-    return session_lead_data[session_id]
+    return session_store.get_or_create(session_id).lead_data
 
 def get_consultation_data(session_id):
     """Get consultation data for a session"""
     init_consultation_data(session_id)
-    return session_consultation_data[session_id]
+    return session_store.get_or_create(session_id).consultation_data
+
+def deep_sizeof(obj):
+    """Approximate memory footprint of nested dicts, lists and strings"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key) + deep_sizeof(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+def get_session_memory_stats():
+    """Number of sessions and approximate bytes of per-session state"""
+    states = session_store.snapshot()
+    total = 0
+    for state in states:
+        total += state.conversation.memory_bytes()
+        total += deep_sizeof(state.lead_data or {})
+        total += deep_sizeof(state.consultation_data or {})
+    return {
+        "sessions": len(states),
+        "total_bytes": total,
+        "avg_bytes_per_session": round(total / len(states)) if states else 0
+    }
 
 def is_valid_email(email):
     """Validate email format"""
@@ -328,14 +667,25 @@ def build_project_description(session_id):
 
 
 # ============ TOOLS ============\
-
-
-@tool
-def clients_reviews(user_message: str) -> str:
-    """Use this tool for client and review-related queries. Returns relevant client or review links in 1-2 lines max."""
-    try:
-        clients_prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s professional AI assistant handling client and review queries.
+# Tools are plain functions so the direct router can call them before CrewAI is imported;
+# load_agents() wraps them with crewai's @tool for query_router_agent. Tool bodies yield their
+# LLM and blocking calls (see Pipeline_Steps) so the same code serves the Flask and ASGI apps.
+CHAT_TOOLS = {}
+
+def chat_tool(func):
+    """Register a tool; calling it runs its steps synchronously, .steps exposes the generator"""
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with span(f"tool.{func.__name__}"):
+            return run_steps(func(*args, **kwargs))
+    run.steps = func
+    CHAT_TOOLS[func.__name__] = run
+    return run
+
+
+prompts.register(
+    "clients_reviews",
+    template=f"""You are {COMPANY_NAME}'s professional AI assistant handling client and review queries.
         For client or review-related questions, provide ONLY the appropriate response with relevant link.
         
         STRICT RESPONSE RULES:
@@ -352,16 +702,25 @@ def clients_reviews(user_message: str) -> str:
           Line 1: "We have so many excellent reviews and love from all over the world, you can see more about reviews in detail in below link:"
           Line 2: "https://www.genetechsolutions.com/testimonials"
         
-        User message: {{user_message}}
-        
         Match keywords to provide the most relevant response. Look for words like: clients, customers, reviews, testimonials, feedback, ratings, opinions.
         
-        IMPORTANT: Keep response to exactly 2 lines maximum. Use the exact phrasing specified above.""",
-            input_variables=["user_message"]
-        )
+        IMPORTANT: Keep response to exactly 2 lines maximum. Use the exact phrasing specified above.
         
-        clients_chain = clients_prompt | llm
-        response = clients_chain.invoke({"user_message": user_message})
+        User message: {{user_message}}""",
+    input_variables=["user_message"]
+)
+
+@chat_tool
+def clients_reviews(user_message: str) -> str:
+    """Use this tool for client and review-related queries. Returns relevant client or review links in 1-2 lines max."""
+    # Render the approved text locally; the LLM only handles messages the keyword index can't place
+    templated_response = render_clients_reviews(user_message)
+    if templated_response:
+        return templated_response
+    
+    try:
+        clients_chain = prompts.chain("clients_reviews", get_llm())
+        response = yield LLMCall(clients_chain, {"user_message": user_message})
         
         if hasattr(response, 'content'):
             return response.content
@@ -378,12 +737,9 @@ def clients_reviews(user_message: str) -> str:
 
 
 
-@tool
-def company_portfolio(user_message: str) -> str:
-    """Use this tool for portfolio-related queries. Returns relevant portfolio links in 1-2 lines max."""
-    try:
-        portfolio_prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s professional AI assistant handling portfolio queries.
+prompts.register(
+    "company_portfolio",
+    template=f"""You are {COMPANY_NAME}'s professional AI assistant handling portfolio queries.
         For portfolio-related questions, provide ONLY the appropriate link with a brief introduction.
         
         STRICT RESPONSE RULES:
@@ -400,16 +756,25 @@ def company_portfolio(user_message: str) -> str:
         - E-commerce Solutions/online Shops : https://www.genetechsolutions.com/portfolio/online-shops
         - General Portfolio: https://www.genetechsolutions.com/portfolio
         
-        User message: {{user_message}}
-        
         Match keywords to provide the most relevant portfolio link. If unsure, default to general portfolio link.
         
-        IMPORTANT: Keep response to exactly 2 lines maximum. No exceptions.""",
-            input_variables=["user_message"]
-        )
+        IMPORTANT: Keep response to exactly 2 lines maximum. No exceptions.
         
-        portfolio_chain = portfolio_prompt | llm
-        response = portfolio_chain.invoke({"user_message": user_message})
+        User message: {{user_message}}""",
+    input_variables=["user_message"]
+)
+
+@chat_tool
+def company_portfolio(user_message: str) -> str:
+    """Use this tool for portfolio-related queries. Returns relevant portfolio links in 1-2 lines max."""
+    # Render the approved link locally; the LLM only handles messages the keyword index can't place
+    templated_response = render_portfolio(user_message)
+    if templated_response:
+        return templated_response
+    
+    try:
+        portfolio_chain = prompts.chain("company_portfolio", get_llm())
+        response = yield LLMCall(portfolio_chain, {"user_message": user_message})
         
         if hasattr(response, 'content'):
             return response.content
@@ -426,12 +791,9 @@ def company_portfolio(user_message: str) -> str:
 
 
 
-@tool
-def handle_greeting_feedbacks(user_message: str) -> str:
-    """Use this tool for greetings, feedbacks, thank you messages, and general conversational responses."""
-    try:
-        greeting_feedback_prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s friendly AI assistant handling greetings, feedback, and thank you messages.
+prompts.register(
+    "handle_greeting_feedbacks",
+    template=f"""You are {COMPANY_NAME}'s friendly AI assistant handling greetings, feedback, and thank you messages.
 
 Guidelines for responses:
 - Keep responses concise (1-2 sentences maximum)
@@ -442,8 +804,6 @@ Guidelines for responses:
 - For feedback: Thank them and show appreciation
 - For general conversation: Be friendly and gently guide toward business topics
 
-User message: "{{user_message}}"
-
 Examples of good responses:
 User: "hi" → "Hello! Welcome to {COMPANY_NAME}. How can I help you today?"
 User: "thank you" → "You're very welcome! Feel free to reach out anytime if you need help to Grow your Business."
@@ -451,12 +811,18 @@ User: "thanks a lot" → "My pleasure! I'm here whenever you need assistance."
 User: "good morning" → "Good morning! Great to have you here. What can I help you with today?"
 User: "that was helpful" → "So glad I could help! Let me know if you have any other questions."
 
+User message: "{{user_message}}"
+
 Generate a warm, concise, human-like response:""",
-            input_variables=["user_message"]
-        )
-        
-        greeting_chain = greeting_feedback_prompt | llm
-        response = greeting_chain.invoke({"user_message": user_message})
+    input_variables=["user_message"]
+)
+
+@chat_tool
+def handle_greeting_feedbacks(user_message: str) -> str:
+    """Use this tool for greetings, feedbacks, thank you messages, and general conversational responses."""
+    try:
+        greeting_chain = prompts.chain("handle_greeting_feedbacks", get_llm())
+        response = yield LLMCall(greeting_chain, {"user_message": user_message}, stream=True)
         
         if hasattr(response, 'content'):
             return response.content
@@ -472,12 +838,9 @@ Generate a warm, concise, human-like response:""",
 
     
 
-@tool
-def handle_irrelevant_queries(user_message: str) -> str:
-    """Use this tool for questions that are not related to Genetech Solutions business."""
-    try:
-        irrelevant_prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s professional AI assistant handling off-topic queries.
+prompts.register(
+    "handle_irrelevant_queries",
+    template=f"""You are {COMPANY_NAME}'s professional AI assistant handling off-topic queries.
         For queries NOT directly related to {COMPANY_NAME} or its services:
         - DO NOT use any tools
         - DO NOT give rigid "I cannot help" responses
@@ -490,18 +853,20 @@ def handle_irrelevant_queries(user_message: str) -> str:
         Response: "Rephrased Example:
 "While I focus on {COMPANY_NAME}'s services, many of our clients find life easier with reliable tech solutions. We’d love to show you how our development services can streamline your business—would you like to explore this ?"
         
-        User message: {{user_message}}
-        
         Always maintain a warm, consultative tone that keeps the conversation flowing toward our business solutions, even when redirecting off-topic queries.
         
-        IMPORTANT HARD RULES: Keep all responses concise and to the point. Avoid lengthy explanations - aim for 1 sentences maximum that deliver clear value and encourage action.""",
-
-
-            input_variables=["user_message"]
-        )
+        IMPORTANT HARD RULES: Keep all responses concise and to the point. Avoid lengthy explanations - aim for 1 sentences maximum that deliver clear value and encourage action.
         
-        irrelevant_chain = irrelevant_prompt | llm
-        response = irrelevant_chain.invoke({"user_message": user_message})
+        User message: {{user_message}}""",
+    input_variables=["user_message"]
+)
+
+@chat_tool
+def handle_irrelevant_queries(user_message: str) -> str:
+    """Use this tool for questions that are not related to Genetech Solutions business."""
+    try:
+        irrelevant_chain = prompts.chain("handle_irrelevant_queries", get_llm())
+        response = yield LLMCall(irrelevant_chain, {"user_message": user_message}, stream=True)
         
         if hasattr(response, 'content'):
             return response.content
@@ -514,7 +879,7 @@ def handle_irrelevant_queries(user_message: str) -> str:
 
 
 
-@tool
+@chat_tool
 def start_lead_qualification(user_message: str, session_id: str) -> str:
     """Start the intelligent lead qualification process."""
     init_lead_data(session_id)
@@ -530,30 +895,9 @@ def start_lead_qualification(user_message: str, session_id: str) -> str:
 
 
 
-@tool
-def continue_lead_qualification(user_message: str, session_id: str, conversation_context: str) -> str:
-    """Continue the intelligent lead qualification process with updated flow."""
-    try:
-        lead_data = get_lead_data(session_id)
-        current_question = lead_data.get("current_question", "project_description")
-        attempts = lead_data.get("attempts", 0)
-        
-        # Check if qualification is already completed
-        if lead_data.get("ready_for_save", False):
-            # Exit qualification mode
-            update_lead_data(session_id, "in_qualification", False)
-            return "QUALIFICATION_COMPLETED"
-        
-        # Create intelligent response based on current question and user input
-        qualification_prompt = PromptTemplate(
-            template="""You are Genetech Solutions' lead qualification specialist. Your job is to intelligently collect project information through natural, focused conversation.
-
-CURRENT CONTEXT:
-- Current Question Focus: {current_question}
-- User Response: "{user_message}"
-- Conversation History: {conversation_context}
-- Previous Attempts: {attempts}
-- Current Lead Data: Name="{current_name}", Email="{current_email}"
+prompts.register(
+    "continue_lead_qualification",
+    template="""You are Genetech Solutions' lead qualification specialist. Your job is to intelligently collect project information through natural, focused conversation.
 
 QUALIFICATION STAGES:
 1. "project_description" - What they want to build/achieve
@@ -642,15 +986,35 @@ VALID|contact_info|Thanks for the email! What's your name?
 If we already have both name and email from previous messages:
 VALID|completed|Perfect! I have all the information I need about your project.
 
+CURRENT CONTEXT:
+- Current Question Focus: {current_question}
+- Conversation History: {conversation_context}
+- Previous Attempts: {attempts}
+- Current Lead Data: Name="{current_name}", Email="{current_email}"
+
 Now analyze this response: "{user_message}"
 Current question: {current_question}
-Current stored data: Name="{current_name}", Email="{current_email}"
 Respond with: STATUS|next_question|your_response""",
-            input_variables=["current_question", "user_message", "conversation_context", "attempts", "current_name", "current_email"]
-        )
+    input_variables=["current_question", "user_message", "conversation_context", "attempts", "current_name", "current_email"]
+)
+
+@chat_tool
+def continue_lead_qualification(user_message: str, session_id: str, conversation_context: str) -> str:
+    """Continue the intelligent lead qualification process with updated flow."""
+    try:
+        lead_data = get_lead_data(session_id)
+        current_question = lead_data.get("current_question", "project_description")
+        attempts = lead_data.get("attempts", 0)
+        
+        # Check if qualification is already completed
+        if lead_data.get("ready_for_save", False):
+            # Exit qualification mode
+            update_lead_data(session_id, "in_qualification", False)
+            return "QUALIFICATION_COMPLETED"
         
-        qualification_chain = qualification_prompt | llm
-        result = qualification_chain.invoke({
+        # Create intelligent response based on current question and user input
+        qualification_chain = prompts.chain("continue_lead_qualification", get_llm())
+        result = yield LLMCall(qualification_chain, {
             "current_question": current_question,
             "user_message": user_message,
             "conversation_context": conversation_context,
@@ -746,7 +1110,7 @@ Respond with: STATUS|next_question|your_response""",
 
 
 
-@tool
+@chat_tool
 def start_consultation_request(user_message: str, session_id: str) -> str:
     """Start the consultation request process."""
     init_consultation_data(session_id)
@@ -756,29 +1120,9 @@ def start_consultation_request(user_message: str, session_id: str) -> str:
     
     return "I'd be happy to arrange a consultation for you! To get started, could you please tell me your name?"
 
-@tool
-def continue_consultation_request(user_message: str, session_id: str, conversation_context: str) -> str:
-    """Continue the consultation request process."""
-    try:
-        consultation_data = get_consultation_data(session_id)
-        current_question = consultation_data.get("current_question", "name")
-        attempts = consultation_data.get("attempts", 0)
-        
-        # Check if consultation is already completed
-        if consultation_data.get("ready_for_save", False):
-            # Exit consultation mode
-            update_consultation_data(session_id, "in_consultation", False)
-            return "CONSULTATION_COMPLETED"
-        
-        # Create intelligent response based on current question and user input
-        consultation_prompt = PromptTemplate(
-            template="""You are Genetech Solutions' consultation coordinator. Your job is to collect contact information for consultation requests through natural conversation.
-
-CURRENT CONTEXT:
-- Current Question Focus: {current_question}
-- User Response: "{user_message}"
-- Conversation History: {conversation_context}
-- Previous Attempts: {attempts}
+prompts.register(
+    "continue_consultation_request",
+    template="""You are Genetech Solutions' consultation coordinator. Your job is to collect contact information for consultation requests through natural conversation.
 
 CONSULTATION STAGES:
 1. "name" - Get the user's name
@@ -842,14 +1186,34 @@ VALID|email|Thanks John! What's your email address?
 User says invalid email "john.com":
 INVALID|email|I need a valid email address to arrange the consultation. Could you please provide your email?
 
+CURRENT CONTEXT:
+- Current Question Focus: {current_question}
+- Conversation History: {conversation_context}
+- Previous Attempts: {attempts}
+
 Now analyze this response: "{user_message}"
 Current question: {current_question}
 Respond with: STATUS|next_question|your_response""",
-            input_variables=["current_question", "user_message", "conversation_context", "attempts"]
-        )
+    input_variables=["current_question", "user_message", "conversation_context", "attempts"]
+)
+
+@chat_tool
+def continue_consultation_request(user_message: str, session_id: str, conversation_context: str) -> str:
+    """Continue the consultation request process."""
+    try:
+        consultation_data = get_consultation_data(session_id)
+        current_question = consultation_data.get("current_question", "name")
+        attempts = consultation_data.get("attempts", 0)
         
-        consultation_chain = consultation_prompt | llm
-        result = consultation_chain.invoke({
+        # Check if consultation is already completed
+        if consultation_data.get("ready_for_save", False):
+            # Exit consultation mode
+            update_consultation_data(session_id, "in_consultation", False)
+            return "CONSULTATION_COMPLETED"
+        
+        # Create intelligent response based on current question and user input
+        consultation_chain = prompts.chain("continue_consultation_request", get_llm())
+        result = yield LLMCall(consultation_chain, {
             "current_question": current_question,
             "user_message": user_message,
             "conversation_context": conversation_context,
@@ -921,85 +1285,20 @@ Respond with: STATUS|next_question|your_response""",
         print(f"❌ Error in continue_consultation_request: {str(e)}")
         return "I apologize for the technical issue. Could you please tell me your name so I can arrange a consultation for you?"
 
-@tool
+@chat_tool
 def looking_job_opportunity() -> str:
     """Use this tool when user expresses interest in job opportunities or careers at Genetech Solutions."""
     return "I am happy that you are interested to build your career in Genetech Solutions. Please visit https://www.genetechsolutions.com/jobs to find more interesting vacancies. Apply then our HR team will shortly contact you soon."
 
-@tool
+@chat_tool
 def company_contact_info() -> str:
     """Use this tool when user asks for Specific company contact information "Example  <user_message= Can i get your Contact information > (renamed from contact_info)."""
-    try:
-        contact_prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s professional AI assistant providing contact information.
-
-            When users ask for contact information Specific for company {COMPANY_NAME}, provide the following details in a clear, organized bullet point format:
-
-            Company Contact Information:
-
-            • Pakistan Office: +92 21 3455 8425
-
-            • USA Office: +1 734-519-1414
-
-            • General Email: info@genetech.co
-
-            • Direct Consultation with COO Shamim Rajani:
+    # Fixed content: render the approved contact details without an LLM call
+    return render_contact_info()
 
-              • Email: shamim@genetech.io
-
-              • LinkedIn: linkedin.com/in/shamimrajani
-
-            
-            Present this information in a warm, professional manner and encourage the user to reach out directly for their project needs.
-            
-            Format your response with:
-            1. A friendly opening acknowledging their request
-            2. The contact information in clear bullet points
-            3. A closing that invites them to get in touch
-            
-            Keep the tone professional but approachable, and make it clear that the team is ready to help with their project needs.""",
-            input_variables=[]
-        )
-        
-        contact_chain = contact_prompt | llm
-        response = contact_chain.invoke({})
-        
-        if hasattr(response, 'content'):
-            return response.content
-        else:
-            return str(response)
-            
-    except Exception as e:
-        # Fallback response if LLM fails
-        return f"""Here are the ways to contact {COMPANY_NAME}:
-
-• Pakistan Office: +92 21 3455 8425
-• USA Office: +1 734-519-1414
-• General Email: info@genetech.co
-• Direct Consultation with COO Shamim Rajani:
-  • Email: shamim@genetech.io
-  • LinkedIn: linkedin.com/in/shamimrajani
-
-Feel free to reach out through any of these channels - our team is ready to help with your project needs!"""
-
-@tool
-def search_company_info(question: str) -> str:
-    """Unified RAG tool to search company information using vectorstore."""
-    global vectorstore, rag_initialized
-    
-    if not rag_initialized or vectorstore is None:
-        return f"I apologize, but I'm currently unable to access our company database. Please contact our team directly for detailed information about our services at info@{COMPANY_NAME.lower().replace(' ', '')}.com"
-    
-    try:
-        docs = vectorstore.similarity_search(question, k=10)
-        
-        if not docs:
-            return f"Thanks for your interest in {COMPANY_NAME}! I don't have specific information about that topic in our database right now. I'd recommend reaching out to our team directly at info@{COMPANY_NAME.lower().replace(' ', '')}.com - they'll be able to give you detailed answers and discuss how we can help with your specific needs!"
-        
-        context = "\n\n".join([doc.page_content for doc in docs])
-        
-        prompt = PromptTemplate(
-            template=f"""You are {COMPANY_NAME}'s professional AI assistant. Respond to customer inquiries with warmth, expertise, and a gentle nudge toward action.
+prompts.register(
+    "search_company_info",
+    template=f"""You are {COMPANY_NAME}'s professional AI assistant. Respond to customer inquiries with warmth, expertise, and a gentle nudge toward action.
             Guidelines for your responses:
             - Keep answers concise and conversational (1 sentences max)
             - Use a warm, human-like tone that builds trust
@@ -1014,16 +1313,67 @@ def search_company_info(question: str) -> str:
             Customer Question:
             {{question}}
             Response:""",
-            input_variables=["context", "question"]
-        )
+    input_variables=["context", "question"]
+)
+
+@chat_tool
+def search_company_info(question: str) -> str:
+    """Unified RAG tool to search company information using vectorstore."""
+    if not startup.is_ready("vectorstore"):
+        try:
+            yield BlockingCall(startup.wait, ("vectorstore",))
+        except ComponentNotReady as e:
+            print(f"⚠️  Vectorstore not ready: {e}")
+    
+    # Hold one state for the whole call so a concurrent reload can't mix old and new indexes
+    state = rag_state
+    
+    if not rag_initialized or state is None:
+        return f"I apologize, but I'm currently unable to access our company database. Please contact our team directly for detailed information about our services at info@{COMPANY_NAME.lower().replace(' ', '')}.com"
+    
+    try:
+        # Embed once: the vector serves both the semantic cache and the similarity search
+        embed_start = time.perf_counter()
+        with span("embeddings.embed_query"):
+            question_vector = yield BlockingCall(embeddings.embed_query, (question,))
+        retrieval_latency_metric.labels("embed").observe(time.perf_counter() - embed_start)
+        
+        if SEMANTIC_CACHE_ENABLED:
+            cached_answer, similarity = semantic_cache.lookup(question_vector)
+            annotate(semantic_cache="hit" if cached_answer is not None else "miss")
+            if cached_answer is not None:
+                print(f"💡 Semantic cache hit for '{question}' (similarity {similarity:.3f})")
+                return cached_answer
+        
+        search_start = time.perf_counter()
+        with span("vectorstore.similarity_search", k=RAG_TOP_K, mode=RETRIEVAL_MODE if state.retriever is not None else "vector") as search_span:
+            if state.retriever is not None:
+                docs = yield BlockingCall(state.retriever.similarity_search_by_vector, (question, question_vector, RAG_TOP_K))
+            else:
+                docs = yield BlockingCall(state.vectorstore.similarity_search_by_vector, (question_vector, RAG_TOP_K))
+            if search_span is not None:
+                search_span.set(documents=len(docs))
+        retrieval_latency_metric.labels("search").observe(time.perf_counter() - search_start)
+        
+        if not docs:
+            return f"Thanks for your interest in {COMPANY_NAME}! I don't have specific information about that topic in our database right now. I'd recommend reaching out to our team directly at info@{COMPANY_NAME.lower().replace(' ', '')}.com - they'll be able to give you detailed answers and discuss how we can help with your specific needs!"
+        
+        # Deduplicate and extract the most relevant sentences within the token budget
+        context, context_stats = build_context(question, [doc.page_content for doc in docs], CONTEXT_TOKEN_BUDGET)
+        print(f"✂️  Context: {context_stats['context_tokens']} tokens from {context_stats['chunks_after_dedup']}/{context_stats['chunks_in']} chunks (saved {context_stats['tokens_saved']} tokens)")
         
-        rag_chain = prompt | llm
-        response = rag_chain.invoke({"context": context, "question": question})
+        rag_chain = prompts.chain("search_company_info", get_llm())
+        response = yield LLMCall(rag_chain, {"context": context, "question": question}, stream=True)
         
         if hasattr(response, 'content'):
-            return response.content
+            answer = response.content
         else:
-            return str(response)
+            answer = str(response)
+        
+        if SEMANTIC_CACHE_ENABLED:
+            semantic_cache.store(question_vector, answer, question)
+        
+        return answer
         
     except Exception as e:
         print(f"❌ Error in search_company_info: {str(e)}")
@@ -1031,60 +1381,98 @@ def search_company_info(question: str) -> str:
 
 # ============ AGENTS ============
 # ============ AGENTS ============
-intent_classifier_agent = Agent(
-    role='Intent Classification Specialist',
-    goal='Accurately classify user intent for proper query routing',
-    backstory="""You are an expert at understanding user intent and classifying queries. 
-    You analyze user messages and determine their primary purpose to ensure they get routed 
-    to the right tool for the best response.
+# Crews are stateless executors shared through a bounded pool; each pooled crew owns its agents
+CREW_POOL_SIZE = int(os.environ.get('CREW_POOL_SIZE', 8))
+CREW_POOL_TIMEOUT = float(os.environ.get('CREW_POOL_TIMEOUT', 30))
+crew_pool = None
+router_tools = None
+
+def build_agents():
+    """Create an intent classifier and query router agent pair for one pooled crew"""
+    from crewai import Agent
     
-    IMPORTANT: Always respond with ONLY the classification category name. No JSON, no extra text, no explanations.""",
-    llm=llm,
-    verbose=False,
-    allow_delegation=False,
-    max_iter=5
-)
+    intent_classifier_agent = Agent(
+        role='Intent Classification Specialist',
+        goal='Accurately classify user intent for proper query routing',
+        backstory="""You are an expert at understanding user intent and classifying queries. 
+        You analyze user messages and determine their primary purpose to ensure they get routed 
+        to the right tool for the best response.
+    
+        IMPORTANT: Always respond with ONLY the classification category name. No JSON, no extra text, no explanations.""",
+        llm=llm,
+        verbose=False,
+        allow_delegation=False,
+        max_iter=5
+    )
 
-query_router_agent = Agent(
-    role='Query Router and Conversation Manager',
-    goal='Route user queries and manage intelligent lead qualification and consultation request conversations',
-    backstory=f"""You are an intelligent query router and conversation manager for {COMPANY_NAME} website. 
+    query_router_agent = Agent(
+        role='Query Router and Conversation Manager',
+        goal='Route user queries and manage intelligent lead qualification and consultation request conversations',
+        backstory=f"""You are an intelligent query router and conversation manager for {COMPANY_NAME} website. 
     
-    Your responsibilities:
-    1. Route queries to appropriate tools based on classified intent
-    2. Manage the intelligent lead qualification process
-    3. Manage the consultation request process
-    4. Ensure smooth conversation flow from interest to contact information collection
+        Your responsibilities:
+        1. Route queries to appropriate tools based on classified intent
+        2. Manage the intelligent lead qualification process
+        3. Manage the consultation request process
+        4. Ensure smooth conversation flow from interest to contact information collection
     
-    ROUTING LOGIC:
-    - greeting_feedback → handle_greeting_feedbacks (for greetings, thanks, feedback)
-    - business_interest → start_lead_qualification (if not in qualification) OR continue_lead_qualification (if in qualification)
-    - consultation_request → start_consultation_request (if not in consultation) OR continue_consultation_request (if in consultation)
-    - company_info → search_company_info
-    - job_opportunity → looking_job_opportunity
-    - company_contact_info → company_contact_info (if user asks for specific contact information Specific For Genetech Solutions (Example "What is your Contact Information?", "What is your Company Email?" "What is your Company Phone Number") is any "your", "Company", "Genetech solutions" in Question Identify that user is asking contact information Specific to Genetech)
-    - portfolio_request → company_portfolio (for portfolio-related queries)
-    - clients_reviews → clients_reviews (for client list or review/testimonial queries)
-    - irrelevant → handle_irrelevant_queries
+        ROUTING LOGIC:
+        - greeting_feedback → handle_greeting_feedbacks (for greetings, thanks, feedback)
+        - business_interest → start_lead_qualification (if not in qualification) OR continue_lead_qualification (if in qualification)
+        - consultation_request → start_consultation_request (if not in consultation) OR continue_consultation_request (if in consultation)
+        - company_info → search_company_info
+        - job_opportunity → looking_job_opportunity
+        - company_contact_info → company_contact_info (if user asks for specific contact information Specific For Genetech Solutions (Example "What is your Contact Information?", "What is your Company Email?" "What is your Company Phone Number") is any "your", "Company", "Genetech solutions" in Question Identify that user is asking contact information Specific to Genetech)
+        - portfolio_request → company_portfolio (for portfolio-related queries)
+        - clients_reviews → clients_reviews (for client list or review/testimonial queries)
+        - irrelevant → handle_irrelevant_queries
     
-    UPDATED LEAD QUALIFICATION FLOW:
-    1. Project Description
-    2. Timeline
-    3. Project Type (Personal/Company)
-    4. Company Name (if Company project)
-    5. Contact Info (Name + Email)
+        UPDATED LEAD QUALIFICATION FLOW:
+        1. Project Description
+        2. Timeline
+        3. Project Type (Personal/Company)
+        4. Company Name (if Company project)
+        5. Contact Info (Name + Email)
     
-    CONSULTATION REQUEST FLOW:
-    1. Name
-    2. Email
+        CONSULTATION REQUEST FLOW:
+        1. Name
+        2. Email
     
-    CRITICAL: Always return EXACTLY what the tool outputs. No JSON formatting, no extra text, no "Final Answer" wrapper.""",
-    tools=[handle_greeting_feedbacks, start_lead_qualification, continue_lead_qualification, start_consultation_request, continue_consultation_request, looking_job_opportunity, company_contact_info, search_company_info, handle_irrelevant_queries, company_portfolio, clients_reviews],
-    llm=llm,
-    verbose=False,
-    allow_delegation=False,
-    max_iter=5
-)
+        CRITICAL: Always return EXACTLY what the tool outputs. No JSON formatting, no extra text, no "Final Answer" wrapper.""",
+        tools=router_tools,
+        llm=llm,
+        verbose=False,
+        allow_delegation=False,
+        max_iter=5
+    )
+    return intent_classifier_agent, query_router_agent
+
+def build_crew():
+    """Create one crew without memory for maximum performance; tasks are assigned per checkout"""
+    from crewai import Crew, Process
+    return Crew(
+        agents=list(build_agents()),
+        tasks=[],
+        process=Process.sequential,
+        memory=False,  # Disable all memory for maximum performance
+        verbose=False,  # Disable verbose to reduce JSON output
+        output_log_file=False,  # Disable output logging
+        step_callback=None  # Disable step callbacks
+    )
+
+def load_agents():
+    """Startup loader for the CrewAI tools and crew pool (importing crewai is the slowest part of startup)"""
+    global router_tools, crew_pool
+    from crewai.tools import tool
+    
+    router_tools = [tool(func) for func in [handle_greeting_feedbacks, start_lead_qualification, continue_lead_qualification, start_consultation_request, continue_consultation_request, looking_job_opportunity, company_contact_info, search_company_info, handle_irrelevant_queries, company_portfolio, clients_reviews]]
+    crew_pool = CrewPool(build_crew, max_size=CREW_POOL_SIZE)
+    crew_pool.prewarm(1)
+
+def checkout_crew():
+    """Borrow a crew from the shared pool for one kickoff (waits for the agents to load)"""
+    startup.wait("agents")
+    return crew_pool.checkout(timeout=CREW_POOL_TIMEOUT)
 
 # ============ HELPER FUNCTIONS ============
 def get_or_create_session_id():
@@ -1093,89 +1481,101 @@ def get_or_create_session_id():
         session['session_id'] = str(uuid.uuid4())
     return session['session_id']
 
-def get_or_create_crew(session_id):
-    """Get or create a crew for the session without memory for maximum performance"""
-    # Update last activity time
-    session_last_activity[session_id] = time.time()
-    
-    if session_id not in session_crews:
-        # Create crew with no memory for maximum performance
-        crew = Crew(
-            agents=[intent_classifier_agent, query_router_agent],
-            tasks=[],
-            process=Process.sequential,
-            memory=False,  # Disable all memory for maximum performance
-            verbose=False,  # Disable verbose to reduce JSON output
-            output_log_file=False,  # Disable output logging
-            step_callback=None  # Disable step callbacks
-        )
-        
-        session_crews[session_id] = crew
-        print(f"✅ Created new crew for session {session_id} with no memory (using custom context management)")
-    
-    return session_crews[session_id]
+def touch_session(session_id):
+    """Update the session's last activity time"""
+    session_store.touch(session_id)
 
 def cleanup_old_sessions():
-    """Clean up old sessions to free memory"""
-    current_time = time.time()
-    sessions_to_remove = []
-    
-    for session_id, last_activity in session_last_activity.items():
-        if current_time - last_activity > SESSION_TIMEOUT:
-            sessions_to_remove.append(session_id)
-    
-    for session_id in sessions_to_remove:
-        if session_id in session_crews:
-            del session_crews[session_id]
-        if session_id in session_last_activity:
-            del session_last_activity[session_id]
-        if session_id in session_conversations:
-            del session_conversations[session_id]
-        if session_id in session_lead_data:
-            del session_lead_data[session_id]
-        if session_id in session_consultation_data:
-            del session_consultation_data[session_id]
+    """Clean up old sessions to free memory (sessions mid-turn are left for the next pass)"""
+    for session_id in session_store.cleanup():
         print(f"🧹 Cleaned up session {session_id}")
 
 def start_cleanup_thread():
     """Start a background thread to clean up old sessions"""
     def cleanup():
         while True:
-            time.sleep(300)  # Check every 5 minutes
+            time.sleep(SESSION_CLEANUP_INTERVAL)  # Each pass only touches sessions that are due
             cleanup_old_sessions()
     
     thread = threading.Thread(target=cleanup, daemon=True)
     thread.start()
 
-def classify_query_intent(user_input: str, crew, conversation_context: str, session_id: str) -> str:
+def classify_query_intent(user_input: str, conversation_context: str, session_id: str, use_fast_path: bool = True) -> str:
     """Enhanced LLM-based intent classification that understands qualification and consultation context"""
+    return run_steps(classify_query_intent_steps(user_input, conversation_context, session_id, use_fast_path))
+
+def classify_query_intent_steps(user_input: str, conversation_context: str, session_id: str, use_fast_path: bool = True):
+    """Steps for classify_query_intent: session state and fast path inline, the CrewAI kickoff as a blocking call"""
     
     # Check if user is already in lead qualification
     lead_data = get_lead_data(session_id)
     if lead_data.get("in_qualification", False) and not lead_data.get("ready_for_save", False):
         # Always return business_interest if in qualification to continue the process
+        annotate(source="lead_qualification")
         return "business_interest"
     
     # Check if user is already in consultation request
     consultation_data = get_consultation_data(session_id)
     if consultation_data.get("in_consultation", False) and not consultation_data.get("ready_for_save", False):
         # Always return consultation_request if in consultation to continue the process
+        annotate(source="consultation")
         return "consultation_request"
     
-    # Create a prompt that includes conversation context
-    context_prompt = ""
-    if conversation_context:
-        context_prompt = f"""
-        CONVERSATION CONTEXT:
-        {conversation_context}
-        
-        """
+    # Try the local fast path first; only ambiguous messages go to the LLM
+    if use_fast_path and INTENT_FASTPATH_ENABLED:
+        fast_result = fast_intent_classifier.classify(user_input)
+        if fast_result:
+            intent, confidence, tier = fast_result
+            print(f"⚡ Message: '{user_input}' → Classified locally as: {intent} ({tier}, confidence {confidence})")
+            annotate(source=tier)
+            return intent
     
-    classification_task = Task(
-        description=f"""{context_prompt}
-        You are an expert intent classifier for Genetech Solutions FAQ bot. Your job is to analyze user messages and classify them accurately.
+    annotate(source="llm")
+    try:
+        result = yield BlockingCall(kickoff_intent_classification, (user_input, conversation_context))
+        intent = str(result).strip().lower()
         
-        USER MESSAGE: "{user_input}"
+        # Add logging
+        print(f"🔍 Message: '{user_input}' → Classified as: {intent}")
+
+        valid_intents = ['greeting_feedback', 'business_interest', 'consultation_request', 'company_info', 'job_opportunity', 'company_contact_info', 'portfolio_request', 'clients_reviews', 'irrelevant','clients_reviews']
+        if intent in valid_intents:
+            return intent
+        else:
+            return 'company_info'
+            
+    except Exception as e:
+        print(f"Intent classification error: {e}")
+        return 'company_info'
+
+def kickoff_intent_classification(user_input: str, conversation_context: str):
+    """Run the CrewAI classification task for a message on a pooled crew (blocking)"""
+    with checkout_crew() as crew:
+        crew.tasks = [create_intent_classification_task(user_input, conversation_context, crew.agents[0])]
+        return kickoff_with_usage(crew, "classify_query_intent")
+
+def kickoff_with_usage(crew, prompt_name):
+    """Run a pooled crew and record this kickoff's prompt tokens (cached and uncached) under prompt_name"""
+    # Agents' usage counters accumulate over their lifetime; the pooled crew is ours alone, so diff around the kickoff
+    before = crew.calculate_usage_metrics()
+    start = time.perf_counter()
+    with span("crew.kickoff", prompt=prompt_name):
+        result = crew.kickoff()
+    elapsed = time.perf_counter() - start
+    after = crew.calculate_usage_metrics()
+    if after.successful_requests > before.successful_requests:
+        prompts.record_usage(prompt_name, after.prompt_tokens - before.prompt_tokens,
+                             after.cached_prompt_tokens - before.cached_prompt_tokens,
+                             after.completion_tokens - before.completion_tokens, seconds=elapsed)
+    else:
+        prompts.record_usage(prompt_name, None, None, None, seconds=elapsed)
+    return result
+
+# Invariant instructions first and the per-call message and context last, so the start of the prompt is cacheable
+prompts.register(
+    "classify_query_intent",
+    template="""
+        You are an expert intent classifier for Genetech Solutions FAQ bot. Your job is to analyze user messages and classify them accurately.
         
         CLASSIFICATION CATEGORIES:
         1. "greeting_feedback" - Simple greetings ("hi", "hello", "hey"), thank you messages ("thanks", "thank you"), feedback responses ("that's helpful", "great"), or general conversational responses
@@ -1198,52 +1598,32 @@ def classify_query_intent(user_input: str, crew, conversation_context: str, sess
         CRITICAL: If the user is answering questions about their project needs, requirements, or business intentions, classify as "business_interest" even if their answer seems negative or unclear.
         
         Think through your reasoning, then respond with ONLY the category name: greeting_feedback, business_interest, consultation_request, company_info, job_opportunity, company_contact_info, portfolio_request, clients_reviews, or irrelevant
+        {context_section}
+        USER MESSAGE: "{user_input}"
         """,
-        expected_output="Single category name: greeting_feedback, business_interest, consultation_request, company_info, job_opportunity, company_contact_info, portfolio_request, clients_reviews, or irrelevant",
-        agent=intent_classifier_agent
-    )
-    
-    try:
-        # Set the task to the crew
-        crew.tasks = [classification_task]
-        
-        # Run the crew
-        result = crew.kickoff()
-        intent = str(result).strip().lower()
-        
-        # Add logging
-        print(f"🔍 Message: '{user_input}' → Classified as: {intent}")
-
-        valid_intents = ['greeting_feedback', 'business_interest', 'consultation_request', 'company_info', 'job_opportunity', 'company_contact_info', 'portfolio_request', 'clients_reviews', 'irrelevant','clients_reviews']
-        if intent in valid_intents:
-            return intent
-        else:
-            return 'company_info'
-            
-    except Exception as e:
-        print(f"Intent classification error: {e}")
-        return 'company_info'
+    input_variables=["context_section", "user_input"]
+)
 
-def create_query_routing_task(user_message: str, intent: str, session_id: str, conversation_context: str):
-    """Create task for routing user queries based on classified intent"""
-    
-    lead_data = get_lead_data(session_id)
-    consultation_data = get_consultation_data(session_id)
-    
-    return Task(
-        description=f"""
-        The user message "{user_message}" has been classified with intent: "{intent}"
-        Session ID: {session_id}
-        User in qualification: {lead_data["in_qualification"]}
-        User in consultation: {consultation_data["in_consultation"]}
-        Current question: {lead_data.get("current_question", "N/A")}
-        Consultation question: {consultation_data.get("current_question", "N/A")}
-        Attempts: {lead_data.get("attempts", 0)}
-        Ready for save: {lead_data["ready_for_save"]}
-        
+def create_intent_classification_task(user_input: str, conversation_context: str, agent):
+    """Create the intent classification task for the given classifier agent"""
+    # Include the conversation context when there is one
+    context_section = ""
+    if conversation_context:
+        context_section = f"""
         CONVERSATION CONTEXT:
         {conversation_context}
-        
+        """
+    
+    from crewai import Task
+    return Task(
+        description=prompts.prompt("classify_query_intent").format(context_section=context_section, user_input=user_input),
+        expected_output="Single category name: greeting_feedback, business_interest, consultation_request, company_info, job_opportunity, company_contact_info, portfolio_request, clients_reviews, or irrelevant",
+        agent=agent
+    )
+
+prompts.register(
+    "route_query",
+    template="""
         Route this query to the appropriate tool based on the intent and session state:
         
         FOR BUSINESS INTEREST:
@@ -1269,9 +1649,45 @@ def create_query_routing_task(user_message: str, intent: str, session_id: str, c
         - For clients/reviews requests, use clients_reviews tool with user_message parameter
         - Return EXACTLY what the chosen tool outputs
         - Do not modify or add to the tool output
+        
+        The user message "{user_message}" has been classified with intent: "{intent}"
+        Session ID: {session_id}
+        User in qualification: {in_qualification}
+        User in consultation: {in_consultation}
+        Current question: {current_question}
+        Consultation question: {consultation_question}
+        Attempts: {attempts}
+        Ready for save: {ready_for_save}
+        
+        CONVERSATION CONTEXT:
+        {conversation_context}
         """,
+    input_variables=["user_message", "intent", "session_id", "in_qualification", "in_consultation", "current_question",
+                     "consultation_question", "attempts", "ready_for_save", "conversation_context"]
+)
+
+def create_query_routing_task(user_message: str, intent: str, session_id: str, conversation_context: str, agent):
+    """Create task for routing user queries based on classified intent"""
+    
+    lead_data = get_lead_data(session_id)
+    consultation_data = get_consultation_data(session_id)
+    
+    from crewai import Task
+    return Task(
+        description=prompts.prompt("route_query").format(
+            user_message=user_message,
+            intent=intent,
+            session_id=session_id,
+            in_qualification=lead_data["in_qualification"],
+            in_consultation=consultation_data["in_consultation"],
+            current_question=lead_data.get("current_question", "N/A"),
+            consultation_question=consultation_data.get("current_question", "N/A"),
+            attempts=lead_data.get("attempts", 0),
+            ready_for_save=lead_data["ready_for_save"],
+            conversation_context=conversation_context
+        ),
         expected_output="Exact tool output based on intent classification and session state",
-        agent=query_router_agent
+        agent=agent
     )
 
 def save_lead_to_database(session_id: str):
@@ -1295,6 +1711,7 @@ def save_lead_to_database(session_id: str):
         # Get full conversation for context
         full_conversation = get_conversation_context(session_id)
         
+        write_start = time.perf_counter()
         # Insert the new lead with updated schema
         cursor.execute("""
             INSERT INTO leads (
@@ -1314,12 +1731,12 @@ def save_lead_to_database(session_id: str):
         ))
         
         conn.commit()
+        sqlite_write_metric.labels("leads").observe(time.perf_counter() - write_start)
         conn.close()
         
         # Clean up lead data after successful save
-        # Remove the session_lead_data for this session
-        if session_id in session_lead_data:
-            del session_lead_data[session_id]
+        # Reset the lead data for this session
+        session_store.get_or_create(session_id).lead_data = None
         init_lead_data(session_id)
         update_lead_data(session_id, "in_qualification", False)
         update_lead_data(session_id, "ready_for_save", False)
@@ -1355,6 +1772,7 @@ def save_consultation_to_database(session_id: str):
         # Get full conversation for context
         full_conversation = get_conversation_context(session_id)
         
+        write_start = time.perf_counter()
         # Insert the new consultation request
         cursor.execute("""
             INSERT INTO consultant (
@@ -1370,6 +1788,7 @@ def save_consultation_to_database(session_id: str):
         ))
         
         conn.commit()
+        sqlite_write_metric.labels("consultant").observe(time.perf_counter() - write_start)
         conn.close()
         
         # Clean up consultation data after successful save
@@ -1384,8 +1803,136 @@ def save_consultation_to_database(session_id: str):
         print(f"❌ Error saving consultation to database: {e}")
         return False, f"❌ Error saving consultation: {str(e)}"
 
-def process_user_message(user_input: str, crew, session_id: str):
+def route_with_agent(user_message: str, intent: str, session_id: str, conversation_context: str) -> str:
+    """Route the query through query_router_agent (legacy LLM router) and return the cleaned tool output"""
+    # Create and run query routing task based on classified intent on a pooled crew
+    with checkout_crew() as crew:
+        crew.tasks = [create_query_routing_task(user_message, intent, session_id, conversation_context, crew.agents[1])]
+        result = kickoff_with_usage(crew, "route_query")
+    
+    # Extract clean response from result
+    if hasattr(result, 'raw'):
+        response = str(result.raw).strip()
+    else:
+        response = str(result).strip()
+    
+    # Clean up JSON formatting if it exists
+    if response.startswith('```json') and response.endswith('```'):
+        # Extract content between json markers
+        import json
+        try:
+            json_content = response[7:-3].strip()  # Remove ```json and ```
+            parsed = json.loads(json_content)
+            if 'Final Answer' in parsed:
+                response = parsed['Final Answer']
+            elif 'final_answer' in parsed:
+                response = parsed['final_answer']
+            elif 'answer' in parsed:
+                response = parsed['answer']
+            else:
+                # Take the last value in the JSON
+                response = list(parsed.values())[-1]
+        except:
+            # If JSON parsing fails, try to extract manually
+            lines = response.split('\n')
+            for line in lines:
+                if '"Final Answer"' in line or '"final_answer"' in line:
+                    response = line.split(':', 1)[1].strip().strip('"').strip(',')
+                    break
+    
+    # Remove any remaining JSON formatting
+    if response.startswith('{') and response.endswith('}'):
+        try:
+            import json
+            parsed = json.loads(response)
+            if 'Final Answer' in parsed:
+                response = parsed['Final Answer']
+            elif 'final_answer' in parsed:
+                response = parsed['final_answer']
+            else:
+                response = list(parsed.values())[-1]
+        except:
+            pass
+    
+    # Clean up any remaining quotes or formatting
+    response = response.strip('"').strip("'").strip()
+    
+    return response
+
+def tool_steps(tool_obj, **kwargs):
+    """Steps that invoke a tool directly, bypassing the agent"""
+    with span(f"tool.{tool_obj.__name__}"):
+        response = yield from steps_of(tool_obj.steps, **kwargs)
+    return response
+
+def dispatch_tool_steps(user_message: str, intent: str, session_id: str, conversation_context: str):
+    """Deterministically call the tool named by the routing table for this intent and session state"""
+    if intent == "business_interest":
+        lead_data = get_lead_data(session_id)
+        if lead_data["in_qualification"]:
+            response = yield from tool_steps(continue_lead_qualification, user_message=user_message, session_id=session_id, conversation_context=conversation_context)
+        else:
+            response = yield from tool_steps(start_lead_qualification, user_message=user_message, session_id=session_id)
+    elif intent == "consultation_request":
+        consultation_data = get_consultation_data(session_id)
+        if consultation_data["in_consultation"]:
+            response = yield from tool_steps(continue_consultation_request, user_message=user_message, session_id=session_id, conversation_context=conversation_context)
+        else:
+            response = yield from tool_steps(start_consultation_request, user_message=user_message, session_id=session_id)
+    elif intent == "greeting_feedback":
+        response = yield from tool_steps(handle_greeting_feedbacks, user_message=user_message)
+    elif intent == "job_opportunity":
+        response = yield from tool_steps(looking_job_opportunity)
+    elif intent == "company_contact_info":
+        response = yield from tool_steps(company_contact_info)
+    elif intent == "portfolio_request":
+        response = yield from tool_steps(company_portfolio, user_message=user_message)
+    elif intent == "clients_reviews":
+        response = yield from tool_steps(clients_reviews, user_message=user_message)
+    elif intent == "irrelevant":
+        response = yield from tool_steps(handle_irrelevant_queries, user_message=user_message)
+    else:
+        response = yield from tool_steps(search_company_info, question=user_message)
+    
+    return str(response).strip()
+
+def record_router_latency(mode: str, elapsed: float):
+    """Record the latency of one routing step for the given router mode"""
+    with router_latency_lock:
+        stats = router_latency_stats.setdefault(mode, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["count"] += 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+    print(f"⏱️  Routing ({mode}) took {elapsed * 1000:.1f} ms")
+
+def get_router_latency_stats():
+    """Average and max routing latency per router mode"""
+    with router_latency_lock:
+        return {
+            mode: {
+                "count": stats["count"],
+                "avg_ms": round(stats["total_seconds"] / stats["count"] * 1000, 2) if stats["count"] else 0.0,
+                "max_ms": round(stats["max_seconds"] * 1000, 2)
+            }
+            for mode, stats in router_latency_stats.items()
+        }
+
+def process_user_message(user_input: str, session_id: str):
     """Process user message using LLM-based intent classification with intelligent lead qualification and consultation requests"""
+    # One turn at a time per conversation; other sessions are unaffected
+    with span("process_user_message"), session_store.turn(session_id):
+        return run_steps(process_user_message_steps(user_input, session_id))
+
+async def aprocess_user_message(user_input: str, session_id: str):
+    """Async process_user_message for the ASGI app: LLM calls are awaited, blocking work runs on the executor"""
+    with span("process_user_message"):
+        async with session_store.aturn(session_id):
+            return await arun_steps(process_user_message_steps(user_input, session_id))
+
+def process_user_message_steps(user_input: str, session_id: str):
+    """Steps shared by process_user_message and aprocess_user_message"""
+    turn_start = time.perf_counter()
+    intent = None
     try:
         # Skip processing for session initialization
         if user_input == '_init_session_':
@@ -1396,68 +1943,23 @@ def process_user_message(user_input: str, crew, session_id: str):
         
         # Get conversation context
         conversation_context = get_conversation_context(session_id)
+        record_context_size(session_id, user_input)
         
         # Add user message to conversation history
         add_message_to_conversation(session_id, "user", user_input)
             
         # Step 1: Classify user intent using LLM with conversation context
-        intent = classify_query_intent(user_input, crew, conversation_context, session_id)
-        
-        # Step 2: Create and run query routing task based on classified intent
-        routing_task = create_query_routing_task(user_input, intent, session_id, conversation_context)
-        
-        # Set the task to the crew
-        crew.tasks = [routing_task]
-        
-        # Run the crew
-        result = crew.kickoff()
-        
-        # Extract clean response from result
-        if hasattr(result, 'raw'):
-            response = str(result.raw).strip()
+        with span("classify_query_intent"):
+            intent = yield from classify_query_intent_steps(user_input, conversation_context, session_id)
+        annotate(intent=intent)
+        
+        # Step 2: Run the tool for the classified intent (direct dispatch or agent router)
+        route_start = time.perf_counter()
+        if ROUTER_MODE == 'agent':
+            response = yield BlockingCall(route_with_agent, (user_input, intent, session_id, conversation_context))
         else:
-            response = str(result).strip()
-        
-        # Clean up JSON formatting if it exists
-        if response.startswith('```json') and response.endswith('```'):
-            # Extract content between json markers
-            import json
-            try:
-                json_content = response[7:-3].strip()  # Remove ```json and ```
-                parsed = json.loads(json_content)
-                if 'Final Answer' in parsed:
-                    response = parsed['Final Answer']
-                elif 'final_answer' in parsed:
-                    response = parsed['final_answer']
-                elif 'answer' in parsed:
-                    response = parsed['answer']
-                else:
-                    # Take the last value in the JSON
-                    response = list(parsed.values())[-1]
-            except:
-                # If JSON parsing fails, try to extract manually
-                lines = response.split('\n')
-                for line in lines:
-                    if '"Final Answer"' in line or '"final_answer"' in line:
-                        response = line.split(':', 1)[1].strip().strip('"').strip(',')
-                        break
-        
-        # Remove any remaining JSON formatting
-        if response.startswith('{') and response.endswith('}'):
-            try:
-                import json
-                parsed = json.loads(response)
-                if 'Final Answer' in parsed:
-                    response = parsed['Final Answer']
-                elif 'final_answer' in parsed:
-                    response = parsed['final_answer']
-                else:
-                    response = list(parsed.values())[-1]
-            except:
-                pass
-        
-        # Clean up any remaining quotes or formatting
-        response = response.strip('"').strip("'").strip()
+            response = yield from dispatch_tool_steps(user_input, intent, session_id, conversation_context)
+        record_router_latency(ROUTER_MODE, time.perf_counter() - route_start)
         
         # Add logging
         print(f"🔧 Tool called for intent '{intent}' returned: {response}")
@@ -1465,7 +1967,8 @@ def process_user_message(user_input: str, crew, session_id: str):
         # Check if we need to save lead data
         if response == "SAVE_LEAD_DATA":
             # Save the lead data to database
-            success, message = save_lead_to_database(session_id)
+            with span("save_lead_to_database"):
+                success, message = yield BlockingCall(save_lead_to_database, (session_id,))
             
             if success:
                 final_response = "Perfect! I have all the information I need about your project. Our team will contact you shortly with a detailed proposal."
@@ -1489,7 +1992,8 @@ def process_user_message(user_input: str, crew, session_id: str):
         # Check if we need to save consultation data
         elif response == "SAVE_CONSULTATION_DATA":
             # Save the consultation data to database
-            success, message = save_consultation_to_database(session_id)
+            with span("save_consultation_to_database"):
+                success, message = yield BlockingCall(save_consultation_to_database, (session_id,))
             
             if success:
                 final_response = """Perfect! Our team will reach out to you shortly for the consultation. 
@@ -1539,8 +2043,27 @@ For direct consultation, you can also contact our COO Shamim Rajani:
             "response": "I apologize for the technical issue. Please try asking your question again, or contact our team directly for assistance.",
             "collect_lead": False
         }
+    finally:
+        if intent is not None:
+            record_turn(intent, time.perf_counter() - turn_start)
 
 # ============ FLASK ROUTES ============
+@app.before_request
+def start_request_timer():
+    request.environ["chatbot.request_start"] = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the request; streamed responses are recorded when closed, so they count until their last event"""
+    start = request.environ.get("chatbot.request_start", time.perf_counter())
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    method, status = request.method, response.status_code
+    if response.is_streamed:
+        response.call_on_close(lambda: record_request(route, method, status, time.perf_counter() - start))
+    else:
+        record_request(route, method, status, time.perf_counter() - start)
+    return response
+
 @app.route('/')
 def index():
     """Serve the frontend HTML"""
@@ -1564,18 +2087,69 @@ def chat():
         # Get or create session ID
         session_id = get_or_create_session_id()
         
-        # Get or create crew for this session
-        crew = get_or_create_crew(session_id)
+        touch_session(session_id)
         
-        # Process the message with the crew
-        result = process_user_message(user_message, crew, session_id)
+        # Process the message; a pooled crew is checked out only if the turn needs the LLM classifier or agent router
+        with trace_request("POST /chat", session_id=session_id) as turn_trace:
+            result = process_user_message(user_message, session_id)
         
-        return jsonify(result)
+        response = jsonify(result)
+        if turn_trace is not None:
+            # Stage breakdown for the browser devtools Timing tab
+            response.headers["Server-Timing"] = turn_trace.server_timing()
+        return response
     
     except Exception as e:
         print(f"Error in /chat endpoint: {str(e)}")
         return jsonify({"error": "An error occurred while processing your request"}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Process a chat message and stream the bot response as server-sent events"""
+    data = request.json or {}
+    user_message = data.get('message', '')
+    
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+    
+    session_id = get_or_create_session_id()
+    touch_session(session_id)
+    request_start = time.perf_counter()
+    events = queue.Queue()
+    
+    def run_turn():
+        # Tokens from the answering tool's LLM call go straight onto the event queue
+        token_sink.set(lambda token: events.put(("token", {"token": token})))
+        try:
+            # Headers are already sent when the turn ends, so streamed turns are traced but carry no Server-Timing
+            with trace_request("POST /chat/stream", session_id=session_id):
+                result = process_user_message(user_message, session_id)
+            events.put(("final", result))
+        except Exception as e:
+            print(f"Error in /chat/stream endpoint: {str(e)}")
+            events.put(("error", {"error": "An error occurred while processing your request"}))
+    
+    threading.Thread(target=run_turn, daemon=True).start()
+    
+    def generate():
+        yield format_sse("thinking", {"status": "thinking"})
+        first_token_at = None
+        tokens = 0
+        while True:
+            event, payload = events.get()
+            if event == "token":
+                tokens += 1
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+            yield format_sse(event, payload)
+            if event != "token":
+                break
+        # Template and cached answers arrive whole in the final event, which is their first token
+        done_at = time.perf_counter()
+        record_stream_latency((first_token_at or done_at) - request_start, done_at - request_start, tokens)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/save_lead', methods=['POST'])
 def save_lead():
     """Legacy endpoint - now handled automatically in chat flow"""
@@ -1669,13 +2243,176 @@ def view_consultations():
         print(f"Error in /consultations endpoint: {str(e)}")
         return jsonify({"success": False, "message": "Error retrieving consultations"}), 500
 
+@app.route('/intent_stats', methods=['GET'])
+def view_intent_stats():
+    """View local intent fast-path hit counters (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "enabled": INTENT_FASTPATH_ENABLED,
+        "stats": fast_intent_classifier.get_stats()
+    })
+
+@app.route('/router_stats', methods=['GET'])
+def view_router_stats():
+    """View routing latency per router mode (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "mode": ROUTER_MODE,
+        "latency": get_router_latency_stats(),
+        "templates": get_template_stats()
+    })
+
+@app.route('/stream_stats', methods=['GET'])
+def view_stream_stats():
+    """View time-to-first-token for /chat/stream (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "stream": get_stream_latency_stats()
+    })
+
+@app.route('/crew_pool_stats', methods=['GET'])
+def view_crew_pool_stats():
+    """View crew pool size, checkout wait times and memory per session (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "pool": crew_pool.get_stats() if crew_pool is not None else None,
+        "sessions": get_session_memory_stats()
+    })
+
+@app.route('/session_stats', methods=['GET'])
+def view_session_stats():
+    """View live sessions, expiry and LRU eviction counts and session memory (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "backend": SESSION_BACKEND,
+        "store": session_store.get_stats(),
+        "context": get_context_size_stats(),
+        "memory": get_session_memory_stats()
+    })
+
+@app.route('/prompt_stats', methods=['GET'])
+def view_prompt_stats():
+    """View each prompt's static prefix, cached vs uncached prompt tokens and cache misses (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "prompts": prompts.get_stats(),
+        "usage": prompts.get_usage(),
+        "cache_report": prompts.cache_report()
+    })
+
+@app.route('/cache_stats', methods=['GET'])
+def view_cache_stats():
+    """View semantic answer and embedding cache hit rates (for admin purposes)"""
+    return jsonify({
+        "success": True,
+        "enabled": SEMANTIC_CACHE_ENABLED,
+        "semantic_cache": semantic_cache.get_stats(),
+        "embedding_cache": embeddings.get_stats() if embeddings is not None else None
+    })
+
+def collect_cache_lookups():
+    """Lookups per cache and result, read from each cache's own counters"""
+    lookups = {}
+    semantic = semantic_cache.get_stats()
+    lookups[("semantic_answer", "hit")] = semantic["hits"]
+    lookups[("semantic_answer", "miss")] = semantic["misses"]
+    if embeddings is not None:
+        embedding = embeddings.get_stats()
+        lookups[("embedding", "memory_hit")] = embedding["memory_hits"]
+        lookups[("embedding", "disk_hit")] = embedding["disk_hits"]
+        lookups[("embedding", "miss")] = embedding["misses"]
+    intent_counts = fast_intent_classifier.get_stats()["counts"]
+    lookups[("intent_fastpath", "rule_hit")] = intent_counts["rule"]
+    lookups[("intent_fastpath", "exemplar_hit")] = intent_counts["exemplar"]
+    lookups[("intent_fastpath", "miss")] = intent_counts["llm"]
+    for key, count in get_template_stats().items():
+        tool_name, outcome = key.rsplit(".", 1)
+        lookups[(f"template:{tool_name}", "hit" if outcome == "template" else "miss")] = count
+    return lookups
+
+def collect_cache_hit_ratios():
+    """Lifetime hit ratio per cache (the same counts as chatbot_cache_lookups_total)"""
+    totals = {}
+    for (cache, result), count in collect_cache_lookups().items():
+        hits, total = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (count if result.endswith("hit") else 0), total + count)
+    return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+metrics.counter_callback("cache_lookups_total", "Cache lookups by cache and result", collect_cache_lookups, ["cache", "result"])
+metrics.gauge_callback("cache_hit_ratio", "Lifetime hit ratio by cache", collect_cache_hit_ratios, ["cache"])
+metrics.gauge_callback("active_sessions", "Sessions held by this process", lambda: len(session_store))
+metrics.gauge_callback("session_store_bytes", "Approximate memory of per-session state in this process",
+                       lambda: get_session_memory_stats()["total_bytes"])
+metrics.counter_callback("sessions_total", "Sessions created, expired and evicted by this process",
+                         lambda: {event: count for event, count in session_store.get_stats().items()
+                                  if event in ("created", "expired", "evicted")}, ["event"])
+metrics.gauge_callback("crew_pool_in_use", "Pooled crews checked out",
+                       lambda: crew_pool.get_stats()["in_use"] if crew_pool is not None else None)
+
+@app.route('/metrics', methods=['GET'])
+def view_metrics():
+    """Prometheus text exposition of request, intent, LLM, retrieval, cache, session and SQLite metrics"""
+    return Response(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/admin/traces', methods=['GET'])
+def view_traces():
+    """View recent chat turn traces and the time per stage (for admin purposes)"""
+    limit = request.args.get('limit', default=20, type=int)
+    min_ms = request.args.get('min_ms', default=0.0, type=float)
+    return jsonify({
+        "success": True,
+        "enabled": TRACING_ENABLED,
+        "exporter": trace_exporter.get_stats(),
+        "stages": trace_exporter.span_summary(),
+        "traces": trace_exporter.recent(limit, request.args.get('trace_id'), min_ms)
+    })
+
+@app.route('/admin/reload_vectorstore', methods=['POST'])
+def trigger_vectorstore_reload():
+    """Reload the knowledge base in the background without restarting (for admin purposes)"""
+    if rag_reload_lock.locked():
+        return jsonify({"success": False, "message": "Reload already in progress", "status": rag_reload_status}), 409
+    
+    thread = threading.Thread(target=reload_vectorstore, daemon=True)
+    thread.start()
+    return jsonify({"success": True, "message": "Vectorstore reload started"}), 202
+
+@app.route('/admin/vectorstore_status', methods=['GET'])
+def view_vectorstore_status():
+    """View the loaded vectorstore and the last reload (for admin purposes)"""
+    from Knowledge_Base import read_index_meta
+    state = rag_state
+    return jsonify({
+        "success": True,
+        "initialized": rag_initialized,
+        "vectors": state.vectorstore.index.ntotal if state else 0,
+        "loaded_at": datetime.fromtimestamp(state.loaded_at).strftime('%Y-%m-%d %H:%M:%S') if state else None,
+        "index": read_index_meta(VECTORSTORE_PATH),
+        "reload": rag_reload_status
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Report per-component startup state; 200 once every component is ready, 503 before"""
+    ready = startup.is_ready()
+    return jsonify({
+        "ready": ready,
+        "mode": STARTUP_MODE,
+        "components": startup.status()
+    }), 200 if ready else 503
+
+# ============ STARTUP ============
+# The app can serve as soon as this module is imported; each request waits only on the components it uses
+startup.register("database", load_database)
+startup.register("llm", load_llm)
+startup.register("embeddings", load_embeddings)
+startup.register("vectorstore", load_rag, depends_on=["embeddings"])
+startup.register("agents", load_agents, depends_on=["llm"])
+startup.start(parallel=STARTUP_MODE != 'serial')
+
 # ============ RUN THE APP ============
 if __name__ == "__main__":
-    # Check RAG initialization status
-    if rag_initialized:
-        print("✅ Custom RAG system ready")
-    else:
-        print("⚠️  Warning: Custom RAG system not fully initialized. Some features may be limited.")
+    print(f"🚀 Loading components in {STARTUP_MODE} mode; check /ready for progress")
     
     # Check if vectorstore exists
     vectorstore_path = os.path.join("data", "vectorStores", "store")
@@ -1689,6 +2426,9 @@ if __name__ == "__main__":
     # Start the cleanup thread
     start_cleanup_thread()
     
+    # Reload the knowledge base when its files change on disk
+    start_vectorstore_watch_thread()
+    
     print("🧠 Using UPDATED INTELLIGENT lead qualification and consultation request system")
     print("🔄 Lead Flow: Project Description → Timeline → Project Type → Company Name (if company) → Contact Info (Name + Email)")
     print("📞 Consultation Flow: Name → Email")
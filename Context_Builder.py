@@ -0,0 +1,132 @@
+"""Token-budgeted context assembly for RAG prompts.
+
+Retrieved chunks are scraped web pages with heavy overlap (navigation, footers, repeated
+sections). Before they go into the prompt the builder:
+1. drops near-duplicate chunks (word-shingle Jaccard similarity)
+2. ranks the remaining sentences by query-term overlap plus the chunk's retrieval rank
+3. selects sentences extractively
+4. fills a token budget counted with a cached tiktoken encoder
+"""
+import re
+from functools import lru_cache
+
+from Hybrid_Retriever import tokenize
+
+DEFAULT_TOKEN_BUDGET = 600
+DUPLICATE_THRESHOLD = 0.8  # Shingle Jaccard above which two chunks count as duplicates
+MIN_SENTENCE_CHARS = 25
+MAX_CACHED_TEXT_CHARS = 2048  # Fits a retrieved chunk (2000 characters)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception as e:
+        print(f"⚠️  tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def _count_tokens(text):
+    encoder = _encoder()
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text))
+
+
+# Short texts (chunks, history lines) repeat across turns; long ones (pasted documents,
+# whole templates) are counted directly so the cache stays within ~40 MB
+_cached_count_tokens = lru_cache(maxsize=20000)(_count_tokens)
+
+
+def count_tokens(text):
+    """Token count for text, cached per string up to MAX_CACHED_TEXT_CHARS"""
+    if len(text) > MAX_CACHED_TEXT_CHARS:
+        return _count_tokens(text)
+    return _cached_count_tokens(text)
+
+
+def _shingles(text, size=3):
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def deduplicate(chunks, threshold=DUPLICATE_THRESHOLD):
+    """Keep the first of every group of near-identical chunks (input order = rank order)"""
+    kept, kept_shingles = [], []
+    for chunk in chunks:
+        shingles = _shingles(chunk)
+        duplicate = False
+        for other in kept_shingles:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def split_sentences(chunk):
+    """Split a chunk into cleaned sentences, dropping navigation fragments"""
+    sentences = []
+    for piece in _SENTENCE_SPLIT.split(chunk):
+        sentence = _WHITESPACE.sub(" ", piece).strip()
+        if len(sentence) >= MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def build_context(question, chunks, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Assemble a prompt context from ranked chunks within token_budget. Returns (context, stats)"""
+    original_tokens = count_tokens("\n\n".join(chunks)) if chunks else 0
+    unique_chunks = deduplicate(chunks)
+    query_terms = set(tokenize(question))
+
+    candidates = []  # (score, chunk rank, sentence position, sentence)
+    seen = set()
+    for rank, chunk in enumerate(unique_chunks):
+        rank_prior = 1.0 / (rank + 1)
+        for position, sentence in enumerate(split_sentences(chunk)):
+            key = sentence.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            overlap = len(query_terms & set(tokenize(sentence)))
+            candidates.append((overlap + rank_prior, rank, position, sentence))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    selected, used_tokens = [], 0
+    for score, rank, position, sentence in candidates:
+        tokens = count_tokens(sentence)
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append((rank, position, sentence))
+        used_tokens += tokens
+
+    # Restore reading order so related sentences stay together
+    selected.sort()
+    parts, current_rank = [], None
+    for rank, position, sentence in selected:
+        if rank != current_rank:
+            parts.append([])
+            current_rank = rank
+        parts[-1].append(sentence)
+    context = "\n\n".join(" ".join(part) for part in parts)
+
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_after_dedup": len(unique_chunks),
+        "sentences_selected": len(selected),
+        "original_tokens": original_tokens,
+        "context_tokens": used_tokens,
+        "tokens_saved": max(0, original_tokens - used_tokens),
+    }
+    return context, stats
@@ -0,0 +1,339 @@
+"""Per-session conversation history as a ring buffer with a cached context string.
+
+The history used to be a list of dicts with a formatted timestamp per message, re-sliced
+when it grew past the limit, and the "User: ... / Assistant: ..." context was rebuilt from
+it on every get_conversation_context call (several per turn). ConversationWindow keeps the
+rendered context as one string and, per message, only a small slot (role, rendered line
+length, epoch timestamp) in a bounded deque. Appending concatenates one line; evicting the
+oldest message slices its line off the front, so reading the context is free. Message text
+is stored once, inside the context string.
+
+The window is bounded by a token budget as well as a message count, so one pasted project
+spec cannot inflate every later prompt. Messages pushed out of the window are kept as
+pending lines until SummaryWorker folds them, on a background thread, into a short rolling
+summary that leads the context ("Summary of earlier conversation: ...").
+With a session backend, the worker reloads the session before reading and again before
+applying, so a fold never overwrites turns another worker process served meanwhile; if the
+lines it summarized are no longer at the head of the pending list, the fold is dropped.
+
+Run `python Conversation_Window.py` to measure memory per session and context read time
+against the old list-of-dicts history.
+"""
+import sys
+import time
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from Context_Builder import count_tokens
+
+SUMMARY_MAX_CHARS = 1200  # Rolling summaries are trimmed to this length
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+
+
+def role_label(role):
+    return "User" if role == "user" else "Assistant"
+
+
+def fold_extractively(previous_summary, lines, max_chars=SUMMARY_MAX_CHARS):
+    """Fallback summary without an LLM: previous summary plus the start of each line, newest kept"""
+    parts = [previous_summary] if previous_summary else []
+    parts.extend(line if len(line) <= 160 else line[:157] + "..." for line in lines)
+    summary = " | ".join(parts)
+    return summary[-max_chars:]
+
+
+class ConversationWindow:
+    """The last messages of a conversation within max_messages and max_tokens, and their rendered context"""
+    __slots__ = ("max_messages", "max_tokens", "keep_evicted", "summary", "pending",
+                 "_context", "_slots", "_tokens", "_evicted_tokens", "_rendered")
+
+    def __init__(self, max_messages=10, max_tokens=0, keep_evicted=False):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens  # 0 = bounded by message count only
+        self.keep_evicted = keep_evicted  # Collect evicted lines in pending for the summary worker
+        self.summary = ""  # Rolling summary of messages that left the window
+        self.pending = []  # Evicted lines not yet folded into the summary
+        self._context = ""
+        self._slots = deque()  # (role, line length, timestamp, tokens) per message, oldest first
+        self._tokens = 0  # Tokens in the buffered lines
+        self._evicted_tokens = None  # Token counts of recently evicted messages, created on first eviction
+        self._rendered = None  # Summary + lines, rebuilt once after a change
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def context(self):
+        """The rolling summary (if any) followed by "User: ..." / "Assistant: ..." lines"""
+        if not self.summary:
+            return self._context
+        if self._rendered is None:
+            self._rendered = f"{SUMMARY_PREFIX}{self.summary}\n{self._context}" if self._context else f"{SUMMARY_PREFIX}{self.summary}"
+        return self._rendered
+
+    def append(self, role, message, timestamp=None):
+        """Add a message and evict the oldest ones beyond the window; returns the evicted messages"""
+        line = f"{role_label(role)}: {message}"
+        tokens = count_tokens(line)
+        self._context = f"{self._context}\n{line}" if self._slots else line
+        self._slots.append((role, len(line), timestamp if timestamp is not None else time.time(), tokens))
+        self._tokens += tokens
+        evicted = []
+        # The newest message always stays, even when it alone is over the budget
+        while len(self._slots) > self.max_messages or (
+                self.max_tokens and self._tokens > self.max_tokens and len(self._slots) > 1):
+            evicted.append(self.pop_oldest())
+        self._rendered = None
+        return evicted
+
+    def pop_oldest(self):
+        """Remove the oldest message and return it as (role, message, timestamp)"""
+        role, length, timestamp, tokens = self._slots.popleft()
+        line = self._context[:length]
+        self._context = self._context[length + 1:]
+        self._tokens -= tokens
+        if self._evicted_tokens is None:
+            self._evicted_tokens = []
+        self._evicted_tokens.append(tokens)
+        if len(self._evicted_tokens) > self.max_messages:
+            del self._evicted_tokens[0]
+        if self.keep_evicted:
+            self.pending.append(line)
+        self._rendered = None
+        return role, line[len(role_label(role)) + 2:], timestamp
+
+    def apply_summary(self, summary, consumed):
+        """Install a new rolling summary covering the first `consumed` pending lines"""
+        self.summary = summary
+        del self.pending[:consumed]
+        self._rendered = None
+
+    def restore_summary(self, summary, pending):
+        """Set the summary and pending lines from a saved state"""
+        self.summary = summary
+        self.pending = list(pending)
+        self._rendered = None
+
+    def messages(self):
+        """The buffered messages as (role, message, timestamp), oldest first"""
+        start = 0
+        for role, length, timestamp, _ in self._slots:
+            yield role, self._context[start + len(role_label(role)) + 2:start + length], timestamp
+            start += length + 1
+
+    def tokens(self):
+        """Tokens in the rendered context"""
+        return self._tokens + (count_tokens(SUMMARY_PREFIX + self.summary) if self.summary else 0)
+
+    def fixed_window_tokens(self):
+        """Tokens a context of the last max_messages messages would have, with no budget or summary"""
+        missing = self.max_messages - len(self._slots)
+        recent = self._evicted_tokens[-missing:] if missing > 0 and self._evicted_tokens else []
+        return self._tokens + sum(recent)
+
+    def clear(self):
+        self.summary = ""
+        self.pending = []
+        self._context = ""
+        self._slots.clear()
+        self._tokens = 0
+        self._evicted_tokens = None
+        self._rendered = None
+
+    def memory_bytes(self):
+        """Approximate memory footprint of the buffer, its slots, the context and the summary"""
+        size = (sys.getsizeof(self) + sys.getsizeof(self._slots) + sys.getsizeof(self._context)
+                + sys.getsizeof(self.summary) + sys.getsizeof(self.pending))
+        if self._evicted_tokens is not None:
+            size += sys.getsizeof(self._evicted_tokens)
+        size += sum(sys.getsizeof(line) for line in self.pending)
+        for slot in self._slots:
+            size += sys.getsizeof(slot) + sys.getsizeof(slot[1]) + sys.getsizeof(slot[2]) + sys.getsizeof(slot[3])
+        return size
+
+
+class SummaryWorker:
+    """Folds each session's evicted messages into its rolling summary on a background thread"""
+
+    def __init__(self, store, summarize, max_chars=SUMMARY_MAX_CHARS):
+        self.store = store
+        self.summarize = summarize  # summarize(previous_summary, lines) -> str; may call the LLM
+        self.max_chars = max_chars
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {"summaries": 0, "failures": 0, "lines_folded": 0, "stale": 0, "total_seconds": 0.0}
+
+    def submit(self, session_id):
+        """Queue a session for folding; cheap and non-blocking, safe to call on the request path"""
+        with self._lock:
+            if session_id in self._queued:
+                return
+            self._queued.add(session_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="conversation-summary")
+                self._thread.start()
+        self._queue.put(session_id)
+
+    def _run(self):
+        while True:
+            session_id = self._queue.get()
+            with self._lock:
+                self._queued.discard(session_id)
+            try:
+                self.fold(session_id)
+            except Exception as e:
+                print(f"⚠️ Conversation summary failed for session {session_id}: {e}")
+
+    @contextmanager
+    def _locked(self, state):
+        """The session's turn lock and backend lease, with its state freshly loaded"""
+        with state.turn_lock:
+            token = self.store.acquire_lease(state.session_id)
+            try:
+                self.store.load(state)  # Another worker process may have served turns since
+                yield state.conversation
+            finally:
+                self.store.release_lease(state.session_id, token)
+
+    def fold(self, session_id):
+        """Summarize the session's pending lines; the session is locked only to read and apply, not during the LLM call"""
+        state = self.store.get(session_id)
+        if state is None:
+            return
+        with self._locked(state) as window:
+            lines, previous = list(window.pending), window.summary
+        if not lines:
+            return
+
+        start = time.perf_counter()
+        failed = False
+        try:
+            summary = self.summarize(previous, lines).strip()
+        except Exception as e:
+            print(f"⚠️ LLM summary unavailable, folding extractively: {e}")
+            summary, failed = fold_extractively(previous, lines, self.max_chars), True
+        elapsed = time.perf_counter() - start
+
+        with self._locked(state) as window:
+            stale = window.summary != previous or window.pending[:len(lines)] != lines
+            if not stale:
+                window.apply_summary(summary[-self.max_chars:], len(lines))
+                self.store.save(state)
+        if stale:
+            # Folded (or cleared) elsewhere while the summary was being written
+            with self._lock:
+                self.stats["stale"] += 1
+            return
+        with self._lock:
+            self.stats["summaries"] += 1
+            self.stats["failures"] += failed
+            self.stats["lines_folded"] += len(lines)
+            self.stats["total_seconds"] += elapsed
+
+    def get_stats(self):
+        with self._lock:
+            summaries = self.stats["summaries"]
+            return {
+                "summaries": summaries,
+                "failures": self.stats["failures"],
+                "lines_folded": self.stats["lines_folded"],
+                "stale": self.stats["stale"],
+                "queued": len(self._queued),
+                "avg_summary_ms": round(self.stats["total_seconds"] / summaries * 1000, 1) if summaries else 0.0,
+            }
+
+
+# ============ MEMORY COMPARISON ============
+def compare_memory(sessions=1000, max_messages=10, reads_per_turn=3):
+    """Memory per session and context read cost: list of dicts (before) vs ConversationWindow (after)"""
+    import tracemalloc
+    from datetime import datetime
+
+    turns = [
+        ("user", "Do you build mobile apps for startups? We need iOS and Android."),
+        ("bot", "Yes! We build native and cross-platform apps for iOS and Android. Would you like to discuss your project?"),
+        ("user", "Sure, it's a food delivery marketplace with a rider app and an admin dashboard."),
+        ("bot", "Great project! What timeline do you have in mind for the first release?"),
+    ]
+    messages = [turns[index % len(turns)] for index in range(max_messages * 2)]
+
+    def old_append(history, role, message):
+        history.append({"role": role, "message": message, "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+        if len(history) > max_messages:
+            history = history[-max_messages:]
+        return history
+
+    def old_context(history):
+        return "\n".join(f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['message']}" for msg in history)
+
+    def build_old():
+        history = []
+        for role, message in messages:
+            # Fresh string objects per session, as with real traffic
+            history = old_append(history, role, "".join(message))
+        return history
+
+    def build_new():
+        window = ConversationWindow(max_messages)
+        for role, message in messages:
+            window.append(role, "".join(message))
+        return window
+
+    def allocated_bytes(build):
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        objects = [build() for _ in range(sessions)]
+        size = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+        tracemalloc.stop()
+        del objects
+        return size / sessions
+
+    def turn_seconds(append, read):
+        """Time for one turn: two appends and reads_per_turn context reads"""
+        history = build_old() if read is old_context else build_new()
+        rounds = 2000
+        start = time.perf_counter()
+        for index in range(rounds):
+            history = append(history, *messages[index % len(messages)])
+            history = append(history, *messages[(index + 1) % len(messages)])
+            for _ in range(reads_per_turn):
+                read(history)
+        return (time.perf_counter() - start) / rounds
+
+    def new_append(window, role, message):
+        window.append(role, message)
+        return window
+
+    assert old_context(build_old()) == build_new().context
+    results = {
+        "sessions": sessions,
+        "max_messages": max_messages,
+        "before_bytes_per_session": round(allocated_bytes(build_old)),
+        "after_bytes_per_session": round(allocated_bytes(build_new)),
+        "before_turn_us": round(turn_seconds(old_append, old_context) * 1e6, 2),
+        "after_turn_us": round(turn_seconds(new_append, lambda window: window.context) * 1e6, 2),
+    }
+    print(f"List of dicts:       {results['before_bytes_per_session'] / 1024:.2f} KiB per session, "
+          f"{results['before_turn_us']} µs per turn")
+    print(f"ConversationWindow:  {results['after_bytes_per_session'] / 1024:.2f} KiB per session, "
+          f"{results['after_turn_us']} µs per turn")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare conversation history memory: list of dicts vs ring buffer")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--max-messages", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    memory_results = compare_memory(args.sessions, args.max_messages)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(memory_results, f, indent=2)
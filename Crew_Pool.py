@@ -0,0 +1,171 @@
+"""Bounded pool of reusable CrewAI executors.
+
+Previously every visitor got their own Crew, kept until session cleanup, and requests
+in the same session shared (and raced on) its `tasks` list. Crews hold no conversation
+state here (context is passed in the task description), so a few of them can serve every
+session: a request checks one out, assigns its task, runs kickoff and returns it. Each
+pooled crew owns its own agents, so concurrent kickoffs never share agent executors.
+
+Run `python Crew_Pool.py` to compare memory per session for per-session crews vs the pool.
+"""
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class CrewPoolTimeout(RuntimeError):
+    """Raised when no crew becomes free within the checkout timeout"""
+
+
+class CrewPool:
+    """Up to max_size crews built on demand by factory(), checked out one request at a time"""
+
+    def __init__(self, factory, max_size=8):
+        self.factory = factory
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()  # LIFO keeps recently used crews warm
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def prewarm(self, count=1):
+        """Build crews ahead of the first request"""
+        for _ in range(min(count, self.max_size)):
+            with self._lock:
+                if self._created >= self.max_size:
+                    return
+                self._created += 1
+            self._idle.put(self._build())
+
+    def _build(self):
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait(), False
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            grow = self._created < self.max_size
+            if grow:
+                self._created += 1
+        if grow:
+            return self._build(), False
+
+        try:
+            return self._idle.get(timeout=timeout), True
+        except queue.Empty:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise CrewPoolTimeout(f"no crew free after {timeout}s ({self.max_size} in use)")
+
+    @contextmanager
+    def checkout(self, timeout=30):
+        """Borrow a crew for one kickoff; it goes back to the pool with its tasks cleared"""
+        start = time.perf_counter()
+        crew, waited = self._acquire(timeout)
+        wait = time.perf_counter() - start
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["total_wait_seconds"] += wait
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], wait)
+            if waited:
+                self.stats["waits"] += 1
+        try:
+            yield crew
+        finally:
+            crew.tasks = []
+            self._idle.put(crew)
+
+    def get_stats(self):
+        """Pool size, utilisation and checkout wait times"""
+        with self._lock:
+            checkouts = self.stats["checkouts"]
+            idle = self._idle.qsize()
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "idle": idle,
+                "in_use": self._created - idle,
+                "checkouts": checkouts,
+                "waits": self.stats["waits"],
+                "timeouts": self.stats["timeouts"],
+                "avg_wait_ms": round(self.stats["total_wait_seconds"] / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(self.stats["max_wait_seconds"] * 1000, 3),
+            }
+
+
+# ============ MEMORY COMPARISON ============
+def compare_memory(sessions=100):
+    """Memory per session with one crew per session (before) vs a shared pool (after)"""
+    import os
+    import tracemalloc
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-memory-benchmark")  # Clients are built, never called
+    os.environ["VECTORSTORE_WATCH_INTERVAL"] = "0"
+    import Chatbot
+
+    Chatbot.startup.wait("agents")
+
+    # Per-session state (conversation, lead and consultation data) exists in both designs
+    for index in range(sessions):
+        session_id = f"memory-{index}"
+        for turn in range(Chatbot.MAX_CONVERSATION_LENGTH // 2):
+            Chatbot.add_message_to_conversation(session_id, "user", "Do you build mobile apps for startups?")
+            Chatbot.add_message_to_conversation(session_id, "bot", "Yes! We build iOS and Android apps. Would you like to discuss your project?")
+        Chatbot.init_lead_data(session_id)
+        Chatbot.init_consultation_data(session_id)
+    state_bytes = Chatbot.get_session_memory_stats()["avg_bytes_per_session"]
+
+    def allocated_bytes(build, count):
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        objects = [build() for _ in range(count)]
+        size = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+        tracemalloc.stop()
+        del objects
+        return size / count
+
+    # Before: the old get_or_create_crew built one Crew per session around a shared agent pair
+    from crewai import Crew, Process
+    shared_agents = list(Chatbot.build_agents())
+    session_crew_bytes = allocated_bytes(
+        lambda: Crew(agents=shared_agents, tasks=[], process=Process.sequential, memory=False, verbose=False),
+        min(sessions, 20))
+    # After: CREW_POOL_SIZE crews in total, each with its own agents
+    pool_bytes = allocated_bytes(Chatbot.build_crew, 3) * Chatbot.CREW_POOL_SIZE
+
+    results = {
+        "sessions": sessions,
+        "session_state_bytes": round(state_bytes),
+        "session_crew_bytes": round(session_crew_bytes),
+        "pool_bytes": round(pool_bytes),
+        "before_bytes_per_session": round(state_bytes + session_crew_bytes),
+        "after_bytes_per_session": round(state_bytes + pool_bytes / sessions),
+        "pool_size": Chatbot.CREW_POOL_SIZE,
+    }
+    print(f"Per-session crews: {results['before_bytes_per_session'] / 1024:.1f} KiB per session")
+    print(f"Crew pool ({Chatbot.CREW_POOL_SIZE} crews, {sessions} sessions): "
+          f"{results['after_bytes_per_session'] / 1024:.1f} KiB per session")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare memory per session: per-session crews vs the crew pool")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    memory_results = compare_memory(args.sessions)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(memory_results, f, indent=2)
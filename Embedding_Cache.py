@@ -0,0 +1,177 @@
+"""Caching wrapper around an embeddings model.
+
+Lookups go through an in-memory LRU first, then an on-disk SQLite table keyed by
+(model name, hash of the normalized text). Only texts missing from both are sent to
+the wrapped model, in one batched call. The SQLite file runs in WAL mode so several
+worker processes can share it, and cached vectors survive restarts.
+"""
+import array
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+SQLITE_BATCH_SIZE = 500  # Max host parameters per IN (...) lookup
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies share one cache entry"""
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings with an in-memory LRU backed by a persistent SQLite cache"""
+
+    def __init__(self, underlying, db_path, memory_size=4096, model_name=None):
+        self.underlying = underlying
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.model_name = model_name or getattr(underlying, "model", None) or type(underlying).__name__
+        self._memory = OrderedDict()  # key -> list[float]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "api_calls": 0}
+        self._init_db()
+
+    # ============ STORAGE ============
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            PRIMARY KEY (model, text_hash)
+        )
+        """)
+        conn.commit()
+
+    def _key(self, normalized):
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _pack(vector):
+        return array.array("f", vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob):
+        vector = array.array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+            batch = keys[start:start + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch],
+            ).fetchall()
+            for text_hash, blob in rows:
+                found[text_hash] = self._unpack(blob)
+        return found
+
+    def _save_to_disk(self, items):
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embedding_cache (model, text_hash, vector) VALUES (?, ?, ?)",
+            [(self.model_name, key, self._pack(vector)) for key, vector in items],
+        )
+        conn.commit()
+
+    # ============ EMBEDDINGS API ============
+    def embed_documents(self, texts):
+        """Embed texts, calling the wrapped model only for texts missing from both caches"""
+        normalized = [normalize_text(text) for text in texts]
+        keys = [self._key(text) for text in normalized]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+            self.stats["memory_hits"] += len(vectors)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            from_disk = self._load_from_disk(missing)
+            with self._lock:
+                self.stats["disk_hits"] += len(from_disk)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+            vectors.update(from_disk)
+
+        to_embed = {}
+        for key, text in zip(keys, normalized):
+            if key not in vectors and key not in to_embed:
+                to_embed[key] = text
+        if to_embed:
+            new_vectors = self.underlying.embed_documents(list(to_embed.values()))
+            computed = list(zip(to_embed.keys(), new_vectors))
+            self._save_to_disk(computed)
+            with self._lock:
+                self.stats["misses"] += len(computed)
+                self.stats["api_calls"] += 1
+                for key, vector in computed:
+                    self._remember(key, vector)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        """Embed a single query through the same caches"""
+        normalized = normalize_text(text)
+        key = self._key(normalized)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+        from_disk = self._load_from_disk([key])
+        if key in from_disk:
+            with self._lock:
+                self.stats["disk_hits"] += 1
+                self._remember(key, from_disk[key])
+            return from_disk[key]
+
+        vector = self.underlying.embed_query(normalized)
+        self._save_to_disk([(key, vector)])
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["api_calls"] += 1
+            self._remember(key, vector)
+        return vector
+
+    def get_stats(self):
+        """Hit counters per cache tier"""
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,119 @@
+"""Hybrid BM25 + FAISS retrieval for the company knowledge base.
+
+Dense retrieval misses exact-term queries ("LMS", "Shopify", product names). A local
+BM25 inverted index built from the vectorstore's docstore catches those, and the two
+ranked lists are fused with reciprocal rank fusion (RRF). Better precision lets
+search_company_info send far fewer chunks to the LLM.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+BM25_STOPWORDS = frozenset("""
+a an the is are was were be been am do does did i me my we us our you your it its this that
+to of in on at for with and or so can could would will what which who how there here about
+as by from have has had not no yes any some all more than then them they their
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords dropped and a light plural strip"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in BM25_STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index over (doc_id, text) pairs"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list)  # term -> [(doc index, term frequency)]
+        for doc_id, text in documents:
+            doc_index = len(self.doc_ids)
+            tokens = tokenize(text)
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((doc_index, frequency))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        total = len(self.doc_ids)
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query, k=20):
+        """Return [(doc_id, score)] for the top-k documents"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, frequency in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / self.avg_length
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[doc_index], score) for doc_index, score in top]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """Fuse several ranked id lists into one, scoring each id by sum(1 / (rrf_k + rank))"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (rrf_k + rank)
+    return [doc_id for doc_id, _ in sorted(fused.items(), key=lambda item: item[1], reverse=True)]
+
+
+class HybridRetriever:
+    """Drop-in replacement for vectorstore.similarity_search fusing BM25 and FAISS results"""
+
+    def __init__(self, vectorstore, dense_k=20, sparse_k=20, rrf_k=60):
+        self.vectorstore = vectorstore
+        self.dense_k = dense_k
+        self.sparse_k = sparse_k
+        self.rrf_k = rrf_k
+        if hasattr(vectorstore.docstore, "iter_documents"):
+            # Lazy docstores stream their chunks instead of materializing every Document
+            documents = vectorstore.docstore.iter_documents()
+        else:
+            documents = (
+                (doc_id, getattr(vectorstore.docstore.search(doc_id), "page_content", ""))
+                for doc_id in vectorstore.index_to_docstore_id.values()
+            )
+        self.bm25 = BM25Index(documents)
+
+    @staticmethod
+    def _doc_key(doc):
+        return getattr(doc, "id", None) or hash(doc.page_content)
+
+    def _fuse(self, query, dense_docs, k):
+        docs_by_key = {self._doc_key(doc): doc for doc in dense_docs}
+        dense_ranking = list(docs_by_key.keys())
+        sparse_ranking = [doc_id for doc_id, _ in self.bm25.search(query, self.sparse_k)]
+
+        results = []
+        for doc_id in reciprocal_rank_fusion([dense_ranking, sparse_ranking], self.rrf_k)[:k]:
+            doc = docs_by_key.get(doc_id)
+            if doc is None:
+                doc = self.vectorstore.docstore.search(doc_id)
+            results.append(doc)
+        return results
+
+    def similarity_search(self, query, k=4):
+        """Hybrid search embedding the query through the vectorstore"""
+        return self._fuse(query, self.vectorstore.similarity_search(query, k=self.dense_k), k)
+
+    def similarity_search_by_vector(self, query, query_vector, k=4):
+        """Hybrid search with a precomputed query embedding (the raw text still feeds BM25)"""
+        return self._fuse(query, self.vectorstore.similarity_search_by_vector(query_vector, k=self.dense_k), k)
@@ -0,0 +1,342 @@
+"""Local fast-path intent classifier used in front of the LLM intent classifier.
+
+Two tiers run before any LLM call:
+1. Rules   - anchored keyword/regex rules on the normalized message
+2. Exemplar - nearest-exemplar match (token + bigram overlap) over labelled examples
+
+Only messages that neither tier is confident about are handed to the LLM.
+
+Run `python Intent_Classifier.py` to evaluate the local tiers against the labelled
+set in data/intent_eval.jsonl, or `python Intent_Classifier.py --with-llm` to also
+score the LLM path (requires OPENAI_API_KEY) and compare the two.
+"""
+import os
+import re
+import json
+import math
+import time
+import threading
+from collections import Counter, defaultdict
+
+INTENT_LABELS = (
+    "greeting_feedback",
+    "business_interest",
+    "consultation_request",
+    "company_info",
+    "job_opportunity",
+    "company_contact_info",
+    "portfolio_request",
+    "clients_reviews",
+    "irrelevant",
+)
+
+DEFAULT_THRESHOLD = 0.75  # Minimum exemplar similarity to trust the local answer
+DEFAULT_MARGIN = 0.15  # Required gap between the best and the best competing intent
+EVAL_SET_PATH = os.path.join("data", "intent_eval.jsonl")
+
+# ============ NORMALIZATION ============
+_CONTRACTIONS = {
+    "what's": "what is", "i'm": "i am", "i'd": "i would", "you're": "you are",
+    "can't": "cannot", "don't": "do not", "it's": "it is", "that's": "that is",
+    "we're": "we are", "i've": "i have", "we'd": "we would", "let's": "let us",
+}
+_PUNCTUATION = re.compile(r"[^a-z0-9\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did i me my we us our it its this that
+to of in on at for with and or so please just some any can could would will there
+here about kindly hey pls plz also too very really
+""".split())
+
+
+def normalize(text):
+    """Lowercase, expand common contractions and strip punctuation"""
+    text = text.lower().replace("’", "'")
+    for short, full in _CONTRACTIONS.items():
+        if short in text:
+            text = text.replace(short, full)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def features(normalized_text):
+    """Content-word unigrams plus bigrams used for exemplar matching"""
+    tokens = [t for t in normalized_text.split() if t not in STOPWORDS]
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+# ============ RULE TIER ============
+# Each rule is (intent, pattern). Patterns run on the normalized message and are
+# deliberately narrow: a message only resolves here if rules of exactly one intent match.
+_GREETING_WORDS = r"(hi|hello|hey|hiya|howdy|yo|greetings|salam|assalam o alaikum|good (morning|afternoon|evening|day))"
+_THANKS_WORDS = (
+    r"(thanks?|thank you|thx|ty|many thanks|much appreciated|appreciate it|great|awesome|cool|perfect|nice|"
+    r"ok|okay|ok thanks|okay thanks|got it|bye|goodbye|see you|that (was|is) (very |really |so )?(helpful|great|useful|nice))"
+)
+# Verb-only rules ("I want to...", "do you provide...") also need one of these terms, so
+# "hire a plumber" or "provide free food" is left to the exemplar tier and the LLM
+_SOFTWARE_TERMS = (r"(website|site|web app|mobile app|app|application|platform|online store|store|shop|ecommerce|lms|crm|erp|"
+                   r"software|system|portal|dashboard|chatbot|game|saas|mvp)s?")
+_SERVICE_TERMS = (rf"({_SOFTWARE_TERMS}|services?|development|design|seo|marketing|testing|qa|security|cybersecurity|"
+                  r"maintenance|support|hosting|cloud|devops|ai|machine learning|automation|integrations?|consulting|"
+                  r"ui|ux|shopify|wordpress|react|flutter)")
+
+RULES = [
+    ("greeting_feedback", rf"^{_GREETING_WORDS}( there| team| genetech)?$"),
+    ("greeting_feedback", rf"^{_THANKS_WORDS}( (so|very) much| a lot| again| for (the|your) (help|info|information))?$"),
+    ("greeting_feedback", r"^how are you( doing)?( today)?$"),
+    ("job_opportunity", r"\b(are you hiring|you hiring|careers?|vacanc(y|ies)|internships?|job (openings?|opportunit(y|ies)|vacanc(y|ies)|positions?))\b"),
+    ("job_opportunity", r"\b(looking for (a )?job|apply for (a )?(job|position|role)|work (for|at) (you|genetech)|join (your|the) team|hiring process)\b"),
+    ("job_opportunity", r"\b(about|regarding) (a |an |the )?(job|position|role|internship)s?\b"),
+    ("portfolio_request", r"\bportfolios?\b"),
+    ("portfolio_request", r"\b(examples|samples) of (your )?(work|websites|apps|projects)\b"),
+    ("portfolio_request", r"\bprojects (have )?you (have )?(done|completed|delivered|built)\b"),
+    ("clients_reviews", r"\b(testimonials?|reviews|(client|customer) reviews?|client list|(clients|customers) say|customer feedback)\b"),
+    ("clients_reviews", r"\b(who are|(show|list|name)( me)?( some of)?) your (clients|customers)\b"),
+    ("company_contact_info", r"\b(your|company|genetech)( s)? (contact (info|information|details|number)|phone( number)?|email( address)?|office (address|number))\b"),
+    ("company_contact_info", r"^(contact (info|information|details)|phone number|email address)$"),
+    ("consultation_request", r"\b(consultation|consult with|speak (to|with) (someone|your team|an expert|a consultant)|talk (to|with) (someone|your team|an expert|a human|a person))\b"),
+    ("consultation_request", r"\b(book|schedule|arrange) (a |an )?(call|meeting|appointment)\b"),
+    ("consultation_request", r"^how (do|can) i (contact|reach) you$"),
+    ("business_interest", rf"\b(can|could|will) you (build|develop|create|make|design) (me |us )?(a|an|my|our)( \w+){{0,2}} {_SOFTWARE_TERMS}\b"),
+    ("business_interest", rf"\b(i|we) (want|need|would like) (to (build|develop|create|make|launch) )?(a|an|my|our) (\w+ ){{0,3}}?{_SOFTWARE_TERMS}\b"),
+    ("business_interest", r"\b(hire you|(i|we) (want|need|would like) to hire (your (team|company|developers)|(a |an )?(developers?|development team|dev team|programmers?)))\b"),
+    ("business_interest", rf"\b(quote|estimate) for (\w+ ){{0,4}}?{_SOFTWARE_TERMS}\b"),
+    ("company_info", rf"^(do|does) (you|genetech)( guys)? (provide|offer|handle|support|specialize in|work with) (\w+ ){{0,3}}?{_SERVICE_TERMS}\b"),
+    ("company_info", rf"^(do|does|can) (you|genetech)( guys)? (do|handle) (\w+ ){{0,3}}?{_SERVICE_TERMS}\b"),
+    ("company_info", r"^what (services|technologies|industries) do you\b"),
+]
+
+
+# ============ EXEMPLAR TIER ============
+EXEMPLARS = {
+    "greeting_feedback": [
+        "hi", "hello there", "good morning", "thank you so much", "thanks a lot",
+        "that was helpful", "great thanks", "nice to meet you", "have a nice day",
+        "you have been very helpful", "appreciate your help",
+    ],
+    "business_interest": [
+        "can you develop a website for me", "i want to build a mobile app",
+        "we need an ecommerce store for our business", "i have a project idea",
+        "i need a developer for my startup", "can you build an lms for my school",
+        "we are looking for a team to build our platform", "i want to hire your team for a project",
+        "how much would it cost to build my app", "i need a custom software solution for my company",
+        "can you redesign my website",
+    ],
+    "consultation_request": [
+        "can i get a quick consultation", "i want to talk to someone from your team",
+        "how do i contact you", "can i speak with an expert", "i would like a free consultation",
+        "can someone call me", "i want to discuss my idea with your team",
+        "can we set up a meeting",
+    ],
+    "company_info": [
+        "do you provide cybersecurity services", "what services do you offer",
+        "what technologies do you work with", "do you do ai development",
+        "how long have you been in business", "what is your development process",
+        "what industries do you serve", "do you offer seo services", "what is your pricing",
+        "do you work with shopify", "tell me about genetech solutions", "where are you located",
+        "do you offer maintenance after launch", "cyber security services",
+    ],
+    "job_opportunity": [
+        "are you hiring", "i am looking for a job", "any job openings",
+        "how can i apply for a job", "do you offer internships", "career opportunities at genetech",
+        "i want to work at genetech", "what is your hiring process",
+    ],
+    "company_contact_info": [
+        "what is your contact information", "what is your company email",
+        "what is your company phone number", "can i get your contact information",
+        "how can i contact your company", "give me contact info of genetech",
+        "what is your office address", "what is your phone number",
+    ],
+    "portfolio_request": [
+        "can you show me your portfolio", "what projects have you done",
+        "show me your web development portfolio", "what type of apps can you make",
+        "can you show me some examples of websites developed", "show me your mobile app work",
+        "do you have examples of lms projects", "show me online shops you built",
+    ],
+    "clients_reviews": [
+        "who are your clients", "show me your clients", "what do your clients say",
+        "can i see reviews", "show me testimonials", "customer feedback",
+        "do you have any reviews", "which companies have you worked with",
+    ],
+    "irrelevant": [
+        "what is the capital of france", "how do i cook pasta", "who won the world cup",
+        "what is the weather today", "tell me a joke", "what are ways to make life better",
+        "how do i lose weight", "what is the meaning of life",
+    ],
+}
+
+
+class FastIntentClassifier:
+    """Rule + nearest-exemplar classifier that resolves confident intents without an LLM call"""
+
+    def __init__(self, rules=None, exemplars=None, threshold=DEFAULT_THRESHOLD, margin=DEFAULT_MARGIN):
+        self.threshold = threshold
+        self.margin = margin
+        self._rules = [(intent, re.compile(pattern)) for intent, pattern in (rules or RULES)]
+        self._exemplars = []  # [(intent, feature_set)]
+        self._index = defaultdict(list)  # feature -> [exemplar ids]
+        for intent, phrases in (exemplars or EXEMPLARS).items():
+            for phrase in phrases:
+                self.add_exemplar(intent, phrase)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def add_exemplar(self, intent, phrase):
+        """Register a labelled example phrase"""
+        grams = features(normalize(phrase))
+        if not grams:
+            return
+        exemplar_id = len(self._exemplars)
+        self._exemplars.append((intent, grams))
+        for gram in grams:
+            self._index[gram].append(exemplar_id)
+
+    def match_rules(self, normalized_text):
+        """Return the single intent matched by the rules, or None on no match/conflict"""
+        matched = {intent for intent, pattern in self._rules if pattern.search(normalized_text)}
+        if len(matched) == 1:
+            return matched.pop()
+        return None
+
+    def match_exemplars(self, normalized_text):
+        """Return (intent, score, runner_up_score) for the nearest exemplar"""
+        grams = features(normalized_text)
+        if not grams:
+            return None, 0.0, 0.0
+
+        overlaps = Counter()
+        for gram in grams:
+            for exemplar_id in self._index.get(gram, ()):
+                overlaps[exemplar_id] += 1
+
+        best_by_intent = {}
+        for exemplar_id, overlap in overlaps.items():
+            intent, exemplar_grams = self._exemplars[exemplar_id]
+            score = overlap / math.sqrt(len(grams) * len(exemplar_grams))
+            if score > best_by_intent.get(intent, 0.0):
+                best_by_intent[intent] = score
+
+        if not best_by_intent:
+            return None, 0.0, 0.0
+        ranked = sorted(best_by_intent.items(), key=lambda item: item[1], reverse=True)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1], runner_up
+
+    def classify(self, user_message):
+        """Classify locally. Returns (intent, confidence, tier) or None if the LLM should decide"""
+        normalized_text = normalize(user_message)
+        if not normalized_text:
+            return None
+
+        intent = self.match_rules(normalized_text)
+        if intent:
+            self._count("rule")
+            return intent, 1.0, "rule"
+
+        intent, score, runner_up = self.match_exemplars(normalized_text)
+        if intent and score >= self.threshold and score - runner_up >= self.margin:
+            self._count("exemplar")
+            return intent, round(score, 3), "exemplar"
+
+        self._count("llm")
+        return None
+
+    def _count(self, tier):
+        with self._lock:
+            self.stats[tier] += 1
+
+    def get_stats(self):
+        """Per-tier hit counters and the share of messages resolved locally"""
+        with self._lock:
+            counts = {tier: self.stats.get(tier, 0) for tier in ("rule", "exemplar", "llm")}
+        total = sum(counts.values())
+        local = counts["rule"] + counts["exemplar"]
+        return {
+            "counts": counts,
+            "total": total,
+            "local_hit_rate": round(local / total, 4) if total else 0.0,
+            "threshold": self.threshold,
+            "margin": self.margin,
+        }
+
+
+# ============ EVALUATION ============
+def load_eval_set(path=EVAL_SET_PATH):
+    """Load the labelled evaluation set as a list of (message, intent) pairs"""
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                samples.append((row["message"], row["intent"]))
+    return samples
+
+
+def evaluate(classifier, samples, llm_classify=None):
+    """Score the local tiers (and optionally the LLM path) on a labelled set"""
+    local_correct = local_answered = 0
+    local_latencies = []
+    llm_correct = llm_answered = 0
+    combined_correct = 0
+    mistakes = []
+
+    for message, expected in samples:
+        start = time.perf_counter()
+        result = classifier.classify(message)
+        local_latencies.append((time.perf_counter() - start) * 1000)
+
+        llm_intent = None
+        if llm_classify is not None:
+            llm_intent = llm_classify(message)
+            llm_answered += 1
+            llm_correct += llm_intent == expected
+
+        if result:
+            local_answered += 1
+            local_correct += result[0] == expected
+            combined_correct += result[0] == expected
+            if result[0] != expected:
+                mistakes.append({"message": message, "expected": expected, "got": result[0], "tier": result[2]})
+        elif llm_intent is not None:
+            combined_correct += llm_intent == expected
+
+    local_latencies.sort()
+    report = {
+        "samples": len(samples),
+        "local_coverage": round(local_answered / len(samples), 4) if samples else 0.0,
+        "local_precision": round(local_correct / local_answered, 4) if local_answered else 0.0,
+        "local_latency_ms_p50": round(local_latencies[len(local_latencies) // 2], 4) if local_latencies else 0.0,
+        "local_latency_ms_max": round(local_latencies[-1], 4) if local_latencies else 0.0,
+        "local_mistakes": mistakes,
+    }
+    if llm_classify is not None:
+        report["llm_accuracy"] = round(llm_correct / llm_answered, 4) if llm_answered else 0.0
+        report["combined_accuracy"] = round(combined_correct / len(samples), 4) if samples else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate the local intent fast path")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN)
+    parser.add_argument("--eval-set", default=EVAL_SET_PATH)
+    parser.add_argument("--with-llm", action="store_true", help="Also score the LLM classifier (costs API calls)")
+    args = parser.parse_args()
+
+    llm_classify = None
+    if args.with_llm:
+        import Chatbot
+
+        def llm_classify(message):
+            session_id = f"eval-{time.time_ns()}"
+            return Chatbot.classify_query_intent(message, "", session_id, use_fast_path=False)
+
+    fast_classifier = FastIntentClassifier(threshold=args.threshold, margin=args.margin)
+    print(json.dumps(evaluate(fast_classifier, load_eval_set(args.eval_set), llm_classify), indent=2))
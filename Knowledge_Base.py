@@ -0,0 +1,927 @@
+"""Knowledge-base maintenance tools for data/vectorStores/store.
+
+Index modes
+-----------
+The store ships as a flat (exact) FAISS index. `rebuild` converts it to an
+approximate index that scales to large corpora:
+
+    flat      exact search, memory = n * d * 4 bytes
+    ivf_flat  inverted lists, searches `nprobe` of `nlist` clusters
+    hnsw      graph index, tuned with `M` / `ef_construction` / `ef_search`
+    ivf_pq    inverted lists with product-quantized vectors (`pq_m` sub-quantizers)
+
+Search parameters (nprobe, efSearch) are serialized inside index.faiss, so
+`FAISS.load_local` callers pick the new index up without code changes. The choice
+is also recorded in index_meta.json next to the index.
+
+Docstore
+--------
+index.pkl unpickles every chunk into memory at startup. `convert-docstore` writes the
+same documents and id map to docstore.db (SQLite), and `load_vectorstore` then only
+fetches the chunks a search returns. The id map is read into memory at load, so a loaded
+store keeps resolving its own index's positions while an ingest rewrites docstore.db.
+docstore.db also records the SHA-256 of the index.faiss its id map belongs to (the index
+generation), written in the same transaction as the id map; `load_vectorstore` refuses
+an index.faiss with any other digest instead of resolving its positions to wrong chunks.
+`compare-startup` measures load time and RSS of both formats in fresh processes.
+
+Usage:
+    python Knowledge_Base.py rebuild --mode hnsw --hnsw-m 32 --ef-search 64
+    python Knowledge_Base.py bench --sizes 10000 100000 1000000 --dim 1536
+    python Knowledge_Base.py convert-docstore
+    python Knowledge_Base.py compare-startup
+    python Knowledge_Base.py ingest docs/ --delete-missing
+
+Ingestion
+---------
+`ingest` streams markdown, HTML, PDF and text files through chunking and hashes each
+chunk. Only new or changed chunks are embedded (rate-limited batches on a thread
+pool); the FAISS index and the SQLite docstore are updated in place, including
+removal of chunks that disappeared from a file. Removed chunks stay in docstore.db for
+RETIRED_DOC_GRACE_SECONDS, so a store loaded before the ingest can still serve them
+until the app swaps in the new one.
+
+Chunks that came from index.pkl carry no source file, so ingest cannot tell which file
+they belong to. Until they are replaced, `ingest` refuses to run; pass --replace-legacy
+with the full document set once to swap them for tracked chunks.
+"""
+import os
+import sys
+import json
+import time
+import math
+import pickle
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+import subprocess
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore, AddableMixin
+from langchain_community.vectorstores import FAISS
+
+VECTORSTORE_PATH = os.path.join("data", "vectorStores", "store")
+INDEX_FILE = "index.faiss"
+PICKLE_FILE = "index.pkl"
+DOCSTORE_FILE = "docstore.db"
+META_FILE = "index_meta.json"
+INDEX_MODES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+RETIRED_DOC_GRACE_SECONDS = 3600  # Removed chunks outlive the stores that may still reference them
+LEGACY_SOURCE = "<index.pkl>"  # chunks table source of converted chunks whose metadata names no file
+
+
+# ============ INDEX CONSTRUCTION ============
+def default_nlist(n_vectors):
+    """Rule-of-thumb cluster count: ~4*sqrt(n), with at least 39 training points per cluster"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39 or 1))
+
+
+def build_index(vectors, mode="flat", metric=faiss.METRIC_L2, nlist=None, nprobe=8, hnsw_m=32,
+                ef_construction=200, ef_search=64, pq_m=None, pq_bits=8):
+    """Build and fill a FAISS index of the given mode. Returns (index, params used)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+
+    if mode == "flat":
+        index = faiss.IndexFlat(dim, metric)
+        params = {}
+    elif mode in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n_vectors)
+        quantizer = faiss.IndexFlat(dim, metric)
+        if mode == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+            params = {"nlist": nlist}
+        else:
+            pq_m = pq_m or _default_pq_m(dim)
+            # PQ codebooks want ~39 training points per centroid; shrink them on small corpora
+            pq_bits = min(pq_bits, max(1, int(math.log2(max(2, n_vectors / 39)))))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits, metric)
+            params = {"nlist": nlist, "pq_m": pq_m, "pq_bits": pq_bits}
+        index.train(vectors)
+        index.nprobe = min(nprobe, nlist)
+        params["nprobe"] = index.nprobe
+    elif mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        params = {"M": hnsw_m, "ef_construction": ef_construction, "ef_search": ef_search}
+    else:
+        raise ValueError(f"Unknown index mode '{mode}'. Choose one of: {', '.join(INDEX_MODES)}")
+
+    index.add(vectors)
+    return index, params
+
+
+def _default_pq_m(dim):
+    """Largest sub-quantizer count <= dim/16 that divides dim"""
+    for m in range(max(1, dim // 16), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def extract_vectors(index):
+    """Recover the stored vectors (in insertion order) from an existing index"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def describe_index(index):
+    """Mode name for an index read from disk"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def read_index_meta(store_path=VECTORSTORE_PATH):
+    """Index metadata written by `rebuild`, or a description of the index on disk"""
+    meta_path = os.path.join(store_path, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"mode": "flat"}
+
+
+def write_index_meta(store_path, meta):
+    with open(os.path.join(store_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def write_index_tmp(index, store_path):
+    """Write the index to index.faiss.tmp; returns the temp path and the index generation (its SHA-256)"""
+    data = faiss.serialize_index(index)
+    tmp_path = os.path.join(store_path, INDEX_FILE + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data.tobytes())
+    return tmp_path, hashlib.sha256(data).hexdigest()
+
+
+def read_index_file(store_path):
+    """Read index.faiss once, returning the index and its generation, so both describe the same file"""
+    with open(os.path.join(store_path, INDEX_FILE), "rb") as f:
+        data = f.read()
+    return faiss.deserialize_index(np.frombuffer(data, dtype=np.uint8)), hashlib.sha256(data).hexdigest()
+
+
+def check_index_generation(conn, generation):
+    """Raise if docstore.db maps a different index.faiss; stores converted before generations were recorded pass"""
+    row = conn.execute("SELECT generation FROM index_generation").fetchone()
+    if row is not None and row[0] != generation:
+        raise RuntimeError(f"{INDEX_FILE} is not the index {DOCSTORE_FILE} maps (generation {generation[:12]}, "
+                           f"expected {row[0][:12]}); an ingest is still writing or was interrupted")
+
+
+def set_index_generation(conn, generation):
+    """Record the index.faiss the id map belongs to; committed by the caller together with the id map"""
+    conn.execute("INSERT OR REPLACE INTO index_generation (id, generation) VALUES (0, ?)", (generation,))
+
+
+def rebuild_vectorstore(store_path=VECTORSTORE_PATH, mode="hnsw", output_path=None, **params):
+    """Rebuild index.faiss in another mode; index.pkl (docstore + id map) is reused unchanged"""
+    output_path = output_path or store_path
+    source, source_generation = read_index_file(store_path)
+    db_path = os.path.join(store_path, DOCSTORE_FILE)
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            init_docstore_db(conn)
+            check_index_generation(conn, source_generation)
+        finally:
+            conn.close()
+    source_mode = describe_index(source)
+    if source_mode == "ivf_pq":
+        print("⚠️  Source index is product-quantized; rebuilt vectors are approximations")
+
+    vectors = extract_vectors(source)
+    start = time.perf_counter()
+    index, used_params = build_index(vectors, mode, source.metric_type, **params)
+    build_seconds = time.perf_counter() - start
+
+    os.makedirs(output_path, exist_ok=True)
+    if output_path != store_path:
+        for name in os.listdir(store_path):
+            if name not in (INDEX_FILE, META_FILE):
+                shutil.copy2(os.path.join(store_path, name), os.path.join(output_path, name))
+
+    # Write to a temp file first so readers never see a half-written index
+    tmp_path, generation = write_index_tmp(index, output_path)
+    os.replace(tmp_path, os.path.join(output_path, INDEX_FILE))
+    output_db_path = os.path.join(output_path, DOCSTORE_FILE)
+    if os.path.exists(output_db_path):
+        # Same id map, new index file: only the generation changes
+        conn = sqlite3.connect(output_db_path, timeout=30)
+        try:
+            init_docstore_db(conn)
+            set_index_generation(conn, generation)
+            conn.commit()
+        finally:
+            conn.close()
+
+    meta = {
+        "mode": mode,
+        "params": used_params,
+        "dimension": int(vectors.shape[1]),
+        "vectors": int(index.ntotal),
+        "metric": "inner_product" if source.metric_type == faiss.METRIC_INNER_PRODUCT else "l2",
+        "built_from": source_mode,
+        "build_seconds": round(build_seconds, 3),
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    write_index_meta(output_path, meta)
+    print(f"✅ Rebuilt {index.ntotal} vectors as {mode} {used_params} in {build_seconds:.2f}s → {output_path}")
+    return meta
+
+
+# ============ DOCSTORE ============
+class SQLiteConnections:
+    """Per-thread connections to one SQLite file (WAL mode, shared by readers and the ingester)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._opened = []  # Every connection handed out, so close() reaches other threads' too
+        self._lock = threading.Lock()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each connection is still used by one thread; check_same_thread=False only lets close() run elsewhere
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def close(self):
+        """Close every thread's connection; a later get() opens a fresh one"""
+        with self._lock:
+            opened, self._opened = self._opened, []
+            self._local = threading.local()
+        for conn in opened:
+            conn.close()
+
+
+def init_docstore_db(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS docs (
+        doc_id TEXT PRIMARY KEY,
+        page_content TEXT NOT NULL,
+        metadata TEXT NOT NULL DEFAULT '{}'
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS id_map (
+        position INTEGER PRIMARY KEY,
+        doc_id TEXT NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS retired_docs (
+        doc_id TEXT PRIMARY KEY,
+        retired_at REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS index_generation (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        generation TEXT NOT NULL
+    )
+    """)
+    conn.commit()
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """Docstore that reads chunks from SQLite on demand, with a small LRU of recent hits"""
+
+    def __init__(self, connections, cache_size=256, doc_ids=None):
+        self._connections = connections
+        self._doc_ids = doc_ids  # The loaded index's chunks; iter_documents skips rows added or retired since
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def search(self, search):
+        with self._lock:
+            if search in self._cache:
+                self._cache.move_to_end(search)
+                return self._cache[search]
+
+        row = self._connections.get().execute(
+            "SELECT page_content, metadata FROM docs WHERE doc_id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        doc = Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+        with self._lock:
+            self._cache[search] = doc
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return doc
+
+    def add(self, texts):
+        conn = self._connections.get()
+        conn.executemany(
+            "INSERT OR REPLACE INTO docs (doc_id, page_content, metadata) VALUES (?, ?, ?)",
+            [(doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in texts.items()],
+        )
+        conn.commit()
+        with self._lock:
+            for doc_id in texts:
+                self._cache.pop(doc_id, None)
+
+    def delete(self, ids):
+        conn = self._connections.get()
+        conn.executemany("DELETE FROM docs WHERE doc_id = ?", [(doc_id,) for doc_id in ids])
+        conn.commit()
+        with self._lock:
+            for doc_id in ids:
+                self._cache.pop(doc_id, None)
+
+    def iter_documents(self, batch_size=1000):
+        """Stream (doc_id, page_content) pairs without holding the corpus in memory"""
+        cursor = self._connections.get().execute("SELECT doc_id, page_content FROM docs")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if self._doc_ids is None:
+                yield from rows
+            else:
+                yield from (row for row in rows if row[0] in self._doc_ids)
+
+    def close(self):
+        self._connections.close()
+
+
+def convert_pickle_docstore(store_path=VECTORSTORE_PATH):
+    """Write the documents and id map from index.pkl into docstore.db"""
+    with open(os.path.join(store_path, PICKLE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    db_path = os.path.join(store_path, DOCSTORE_FILE)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    init_docstore_db(conn)
+    rows = []
+    for doc_id in index_to_docstore_id.values():
+        doc = docstore.search(doc_id)
+        rows.append((doc_id, doc.page_content, json.dumps(doc.metadata)))
+    conn.executemany("INSERT OR REPLACE INTO docs (doc_id, page_content, metadata) VALUES (?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO id_map (position, doc_id) VALUES (?, ?)",
+        [(int(position), doc_id) for position, doc_id in index_to_docstore_id.items()],
+    )
+    set_index_generation(conn, read_index_file(store_path)[1])
+    conn.commit()
+    init_chunks_table(conn)
+    seed_legacy_chunks(conn)
+    conn.close()
+    os.replace(tmp_path, db_path)
+    print(f"✅ Converted {len(rows)} documents from {PICKLE_FILE} to {DOCSTORE_FILE}")
+    return len(rows)
+
+
+def load_vectorstore(store_path, embeddings):
+    """Load the FAISS vectorstore, preferring the lazy SQLite docstore over index.pkl"""
+    db_path = os.path.join(store_path, DOCSTORE_FILE)
+    if not os.path.exists(db_path):
+        return FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
+
+    connections = SQLiteConnections(db_path)
+    conn = connections.get()
+    init_docstore_db(conn)
+    index, generation = read_index_file(store_path)
+    # Snapshot the id map: ingest renumbers it in place, and this index must keep its own positions.
+    # One read transaction, so the generation checked is the one this id map was committed with
+    conn.execute("BEGIN")
+    try:
+        check_index_generation(conn, generation)
+        id_map = dict(conn.execute("SELECT position, doc_id FROM id_map"))
+    except RuntimeError:
+        conn.rollback()
+        connections.close()
+        raise
+    conn.rollback()
+    if len(id_map) != index.ntotal:
+        connections.close()
+        raise RuntimeError(f"{INDEX_FILE} has {index.ntotal} vectors but {DOCSTORE_FILE} maps {len(id_map)}; "
+                           f"an ingest is still writing or was interrupted")
+    return FAISS(embeddings, index, SQLiteDocstore(connections, doc_ids=set(id_map.values())), id_map)
+
+
+def _load_probe(store_path, docstore_format):
+    """Load the store in this (fresh) process and report load time and RSS"""
+    from langchain_community.embeddings import FakeEmbeddings
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    if docstore_format == "pickle":
+        store = FAISS.load_local(store_path, FakeEmbeddings(size=8), allow_dangerous_deserialization=True)
+    else:
+        store = load_vectorstore(store_path, FakeEmbeddings(size=8))
+    load_seconds = time.perf_counter() - start
+
+    # Fetch a few chunks the way a search would
+    fetch_start = time.perf_counter()
+    for position in range(min(4, store.index.ntotal)):
+        store.docstore.search(store.index_to_docstore_id[position])
+    fetch_ms = (time.perf_counter() - fetch_start) * 1000
+
+    print(json.dumps({
+        "format": docstore_format,
+        "load_seconds": round(load_seconds, 4),
+        "fetch_4_docs_ms": round(fetch_ms, 3),
+        "rss_after_load_bytes": current_rss_bytes(),
+        "rss_delta_bytes": current_rss_bytes() - rss_before,
+    }))
+
+
+def compare_startup(store_path=VECTORSTORE_PATH, repeats=3):
+    """Run the load probe for both docstore formats in fresh processes"""
+    if not os.path.exists(os.path.join(store_path, DOCSTORE_FILE)):
+        convert_pickle_docstore(store_path)
+    results = []
+    for docstore_format in ("pickle", "sqlite"):
+        for _ in range(repeats):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "load-probe", "--store", store_path, "--format", docstore_format],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    for docstore_format in ("pickle", "sqlite"):
+        rows = [row for row in results if row["format"] == docstore_format]
+        print(f"{docstore_format:>6}: load {min(r['load_seconds'] for r in rows):.3f}s, "
+              f"RSS delta {min(r['rss_delta_bytes'] for r in rows) / 1e6:.1f} MB, "
+              f"fetch 4 docs {min(r['fetch_4_docs_ms'] for r in rows):.2f} ms")
+    return results
+
+
+# ============ INGESTION ============
+SUPPORTED_EXTENSIONS = (".md", ".markdown", ".txt", ".html", ".htm", ".pdf")
+CHUNK_SIZE = 2000  # Matches the chunking of the original store
+CHUNK_OVERLAP = 200
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text from an HTML page"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip and data.strip():
+            self.parts.append(data.strip())
+
+
+def read_document(path):
+    """Plain text of a supported document"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return "\n\n".join(page.extract_text() or "" for page in pdf.pages)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if extension in (".html", ".htm"):
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        return "\n".join(extractor.parts)
+    return text
+
+
+def iter_source_files(paths):
+    """Yield supported files under the given files/directories in a stable order"""
+    for path in paths:
+        if os.path.isfile(path):
+            if path.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.normpath(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield os.path.normpath(os.path.join(root, name))
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+    """Spaces calls evenly to stay under a requests-per-minute limit"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self.interval
+        if delay:
+            time.sleep(delay)
+
+
+def init_chunks_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS chunks (
+        doc_id TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        chunk_hash TEXT NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)")
+    conn.commit()
+
+
+def seed_legacy_chunks(conn):
+    """Record indexed chunks missing from the chunks table (converted from index.pkl) so ingest can replace them"""
+    rows = []
+    for doc_id, page_content, metadata in conn.execute("""
+        SELECT d.doc_id, d.page_content, d.metadata FROM id_map m JOIN docs d ON d.doc_id = m.doc_id
+        WHERE m.doc_id NOT IN (SELECT doc_id FROM chunks)
+    """):
+        source = json.loads(metadata).get("source")
+        rows.append((doc_id, os.path.normpath(source) if source else LEGACY_SOURCE, chunk_hash(page_content)))
+    conn.executemany("INSERT OR IGNORE INTO chunks (doc_id, source, chunk_hash) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def embed_in_batches(embeddings, texts, batch_size=64, workers=4, requests_per_minute=500):
+    """Embed texts in rate-limited batches on a thread pool, preserving order"""
+    limiter = RateLimiter(requests_per_minute)
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+
+    def embed(batch):
+        limiter.wait()
+        return embeddings.embed_documents(batch)
+
+    vectors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch_vectors in pool.map(embed, batches):
+            vectors.extend(batch_vectors)
+    return vectors
+
+
+def remove_positions(index, positions, store_path):
+    """Remove vectors at the given positions, compacting the survivors to positions 0..n-1 like FAISS.delete does"""
+    if not positions:
+        return index
+    removed = np.asarray(sorted(positions), dtype=np.int64)
+    if type(index) in (faiss.IndexFlat, faiss.IndexFlatL2, faiss.IndexFlatIP):
+        # Flat indexes shift the following vectors down on removal
+        index.remove_ids(removed)
+        return index
+
+    # IVF indexes keep the original ids on removal and HNSW cannot remove at all: re-add the survivors
+    keep = np.setdiff1d(np.arange(index.ntotal), removed)
+    vectors = extract_vectors(index)[keep]
+    if faiss.try_extract_index_ivf(index) is not None:
+        # reset() empties the inverted lists but keeps the trained quantizer (and PQ codebooks)
+        index.reset()
+        index.add(vectors)
+        return index
+    meta = read_index_meta(store_path)
+    params = meta.get("params", {})
+    rebuilt, _ = build_index(
+        vectors, describe_index(index), index.metric_type,
+        nlist=params.get("nlist"), nprobe=params.get("nprobe", 8), hnsw_m=params.get("M", 32),
+        ef_construction=params.get("ef_construction", 200), ef_search=params.get("ef_search", 64),
+        pq_m=params.get("pq_m"), pq_bits=params.get("pq_bits", 8),
+    )
+    return rebuilt
+
+
+def ingest(paths, embeddings, store_path=VECTORSTORE_PATH, delete_missing=False, batch_size=64, workers=4,
+           requests_per_minute=500, replace_legacy=False):
+    """Incrementally sync documents under `paths` into the vectorstore; replace_legacy drops the untracked index.pkl chunks"""
+    started = time.perf_counter()
+    db_path = os.path.join(store_path, DOCSTORE_FILE)
+    if not os.path.exists(db_path):
+        convert_pickle_docstore(store_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    init_docstore_db(conn)
+    init_chunks_table(conn)
+    seed_legacy_chunks(conn)  # Stores converted before chunks were seeded
+    cutoff = time.time() - RETIRED_DOC_GRACE_SECONDS
+    purged = conn.execute("""
+        DELETE FROM docs WHERE doc_id IN (SELECT doc_id FROM retired_docs WHERE retired_at < ?)
+    """, (cutoff,)).rowcount
+    conn.execute("DELETE FROM retired_docs WHERE retired_at < ?", (cutoff,))
+    conn.commit()
+
+    known = {}  # source -> {doc_id: chunk hash}
+    for doc_id, source, digest in conn.execute("SELECT doc_id, source, chunk_hash FROM chunks"):
+        known.setdefault(source, {})[doc_id] = digest
+    legacy_ids = set(known.pop(LEGACY_SOURCE, {}))
+    if legacy_ids and not replace_legacy:
+        conn.close()
+        raise ValueError(
+            f"{len(legacy_ids)} chunks from {PICKLE_FILE} are not linked to a source file, so ingesting would "
+            f"duplicate them. Run ingest once with the full document set and --replace-legacy to replace them."
+        )
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    new_chunks = []  # (doc_id, source, hash, text)
+    removed_ids = set()
+    unchanged = files = 0
+    seen_sources = set()
+    for source in iter_source_files(paths):
+        files += 1
+        seen_sources.add(source)
+        current = {}
+        for text in splitter.split_text(read_document(source)):
+            digest = chunk_hash(text)
+            doc_id = chunk_hash(f"{source}\0{digest}")
+            if doc_id not in current:
+                current[doc_id] = (digest, text)
+        existing = known.get(source, {})
+        for doc_id, (digest, text) in current.items():
+            if doc_id in existing:
+                unchanged += 1
+            else:
+                new_chunks.append((doc_id, source, digest, text))
+        removed_ids.update(doc_id for doc_id in existing if doc_id not in current)
+
+    if delete_missing:
+        roots = [os.path.normpath(path) for path in paths]
+        for source, doc_ids in known.items():
+            under_roots = any(source == root or source.startswith(root + os.sep) for root in roots)
+            if under_roots and source not in seen_sources:
+                removed_ids.update(doc_ids)
+
+    removed_ids.update(legacy_ids)
+
+    summary = {"files": files, "unchanged": unchanged, "added": len(new_chunks), "removed": len(removed_ids),
+               "purged": purged}
+    if not new_chunks and not removed_ids:
+        conn.close()
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        print(f"✅ Knowledge base already up to date: {json.dumps(summary)}")
+        return summary
+
+    embed_start = time.perf_counter()
+    vectors = embed_in_batches(embeddings, [chunk[3] for chunk in new_chunks], batch_size, workers, requests_per_minute)
+    summary["embed_seconds"] = round(time.perf_counter() - embed_start, 3)
+
+    index, generation = read_index_file(store_path)
+    try:
+        check_index_generation(conn, generation)  # Never build on an index the id map does not describe
+    except RuntimeError:
+        conn.close()
+        raise
+    id_map = dict(conn.execute("SELECT position, doc_id FROM id_map"))
+    removed_positions = [position for position, doc_id in id_map.items() if doc_id in removed_ids]
+    index = remove_positions(index, removed_positions, store_path)
+    if new_chunks:
+        index.add(np.asarray(vectors, dtype=np.float32))
+
+    try:
+        if removed_positions:
+            # Positions compact after removal: renumber the survivors, then append the new chunks
+            survivors = [id_map[position] for position in sorted(id_map) if id_map[position] not in removed_ids]
+            conn.execute("DELETE FROM id_map")
+            ordered = survivors + [chunk[0] for chunk in new_chunks]
+            conn.executemany("INSERT INTO id_map (position, doc_id) VALUES (?, ?)", list(enumerate(ordered)))
+        else:
+            offset = len(id_map)
+            conn.executemany(
+                "INSERT INTO id_map (position, doc_id) VALUES (?, ?)",
+                [(offset + i, chunk[0]) for i, chunk in enumerate(new_chunks)],
+            )
+        # Retire rather than delete: stores loaded before this ingest still resolve these chunks
+        retired_at = time.time()
+        conn.executemany("INSERT OR REPLACE INTO retired_docs (doc_id, retired_at) VALUES (?, ?)",
+                         [(doc_id, retired_at) for doc_id in removed_ids])
+        conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(doc_id,) for doc_id in removed_ids])
+        conn.executemany(
+            "INSERT OR REPLACE INTO docs (doc_id, page_content, metadata) VALUES (?, ?, ?)",
+            [(doc_id, text, json.dumps({"source": source})) for doc_id, source, _, text in new_chunks],
+        )
+        conn.executemany("DELETE FROM retired_docs WHERE doc_id = ?", [(chunk[0],) for chunk in new_chunks])
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunks (doc_id, source, chunk_hash) VALUES (?, ?, ?)",
+            [(doc_id, source, digest) for doc_id, source, digest, _ in new_chunks],
+        )
+
+        # The new generation commits with the id map; a crash between the replace and the commit
+        # leaves index.faiss with a generation docstore.db does not record, which loading refuses
+        tmp_path, generation = write_index_tmp(index, store_path)
+        set_index_generation(conn, generation)
+        os.replace(tmp_path, os.path.join(store_path, INDEX_FILE))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    meta = read_index_meta(store_path)
+    meta.update({"mode": describe_index(index), "vectors": int(index.ntotal), "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+    write_index_meta(store_path, meta)
+
+    summary["vectors"] = int(index.ntotal)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    print(f"✅ Ingested: {json.dumps(summary)}")
+    print(f"ℹ️  {PICKLE_FILE} is now stale; the app reads {DOCSTORE_FILE}")
+    return summary
+
+
+# ============ BENCHMARK ============
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc, falls back to peak RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def synthetic_corpus(n_vectors, dim, n_queries, seed=0, n_clusters=256):
+    """Clustered Gaussian vectors roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    vectors = np.empty((n_vectors, dim), dtype=np.float32)
+    for start in range(0, n_vectors, 100_000):
+        stop = min(start + 100_000, n_vectors)
+        labels = rng.integers(0, n_clusters, stop - start)
+        vectors[start:stop] = centers[labels] + 0.6 * rng.standard_normal((stop - start, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    picks = rng.integers(0, n_vectors, n_queries)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+    faiss.normalize_L2(queries)
+    return vectors, queries
+
+
+def benchmark(sizes, dim=1536, k=10, n_queries=200, modes=INDEX_MODES, **params):
+    """Recall@k against the flat index, per-query latency and memory for each mode and size"""
+    results = []
+    for n_vectors in sizes:
+        vectors, queries = synthetic_corpus(n_vectors, dim, n_queries)
+        exact = faiss.IndexFlatL2(dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, k)
+        del exact
+
+        for mode in modes:
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            index, used_params = build_index(vectors, mode, **params)
+            build_seconds = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+
+            latencies = []
+            found = np.empty((n_queries, k), dtype=np.int64)
+            for i in range(n_queries):
+                query_start = time.perf_counter()
+                _, ids = index.search(queries[i:i + 1], k)
+                latencies.append((time.perf_counter() - query_start) * 1000)
+                found[i] = ids[0]
+
+            recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(n_queries)])
+            latencies.sort()
+            row = {
+                "vectors": n_vectors,
+                "dim": dim,
+                "mode": mode,
+                "params": used_params,
+                f"recall@{k}": round(float(recall), 4),
+                "latency_ms_p50": round(latencies[len(latencies) // 2], 3),
+                "latency_ms_p99": round(latencies[int(len(latencies) * 0.99) - 1], 3),
+                "build_seconds": round(build_seconds, 2),
+                "index_bytes": int(faiss.serialize_index(index).nbytes),
+                "rss_delta_bytes": max(0, rss_after - rss_before),
+            }
+            results.append(row)
+            print(json.dumps(row))
+            del index
+        del vectors, queries
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Knowledge-base maintenance tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_index_params(command):
+        command.add_argument("--nlist", type=int, default=None)
+        command.add_argument("--nprobe", type=int, default=8)
+        command.add_argument("--hnsw-m", type=int, default=32)
+        command.add_argument("--ef-construction", type=int, default=200)
+        command.add_argument("--ef-search", type=int, default=64)
+        command.add_argument("--pq-m", type=int, default=None)
+        command.add_argument("--pq-bits", type=int, default=8)
+
+    rebuild = commands.add_parser("rebuild", help="Rebuild the FAISS index in another mode")
+    rebuild.add_argument("--store", default=VECTORSTORE_PATH)
+    rebuild.add_argument("--output", default=None, help="Write to another directory instead of in place")
+    rebuild.add_argument("--mode", choices=INDEX_MODES, required=True)
+    add_index_params(rebuild)
+
+    bench = commands.add_parser("bench", help="Benchmark index modes on synthetic data")
+    bench.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    bench.add_argument("--dim", type=int, default=1536)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--modes", nargs="+", choices=INDEX_MODES, default=list(INDEX_MODES))
+    bench.add_argument("--output", default=None, help="Write results as JSON to this file")
+    add_index_params(bench)
+
+    convert = commands.add_parser("convert-docstore", help="Convert index.pkl to the lazy SQLite docstore")
+    convert.add_argument("--store", default=VECTORSTORE_PATH)
+
+    compare = commands.add_parser("compare-startup", help="Compare load time and RSS of pickle vs SQLite docstores")
+    compare.add_argument("--store", default=VECTORSTORE_PATH)
+    compare.add_argument("--repeats", type=int, default=3)
+
+    probe = commands.add_parser("load-probe", help=argparse.SUPPRESS)
+    probe.add_argument("--store", default=VECTORSTORE_PATH)
+    probe.add_argument("--format", choices=("pickle", "sqlite"), required=True)
+
+    ingest_command = commands.add_parser("ingest", help="Incrementally ingest documents into the store")
+    ingest_command.add_argument("paths", nargs="+", help="Files or directories (md, html, pdf, txt)")
+    ingest_command.add_argument("--store", default=VECTORSTORE_PATH)
+    ingest_command.add_argument("--delete-missing", action="store_true", help="Remove chunks of files no longer present under the paths")
+    ingest_command.add_argument("--batch-size", type=int, default=64)
+    ingest_command.add_argument("--workers", type=int, default=4)
+    ingest_command.add_argument("--rpm", type=int, default=500, help="Max embedding requests per minute")
+    ingest_command.add_argument("--replace-legacy", action="store_true",
+                                help=f"Remove the chunks converted from {PICKLE_FILE} that no source file is known for")
+
+    args = parser.parse_args(argv)
+    if args.command == "ingest":
+        from dotenv import load_dotenv
+        from langchain_openai import OpenAIEmbeddings
+        from Embedding_Cache import CachedEmbeddings
+
+        load_dotenv()
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(), os.path.join("data", "embedding_cache.db"))
+        try:
+            ingest(args.paths, embeddings, args.store, args.delete_missing, args.batch_size, args.workers, args.rpm,
+                   args.replace_legacy)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        return 0
+    if args.command == "convert-docstore":
+        convert_pickle_docstore(args.store)
+        return 0
+    if args.command == "compare-startup":
+        compare_startup(args.store, args.repeats)
+        return 0
+    if args.command == "load-probe":
+        _load_probe(args.store, args.format)
+        return 0
+
+    index_params = {
+        "nlist": args.nlist, "nprobe": args.nprobe, "hnsw_m": args.hnsw_m,
+        "ef_construction": args.ef_construction, "ef_search": args.ef_search,
+        "pq_m": args.pq_m, "pq_bits": args.pq_bits,
+    }
+
+    if args.command == "rebuild":
+        rebuild_vectorstore(args.store, args.mode, args.output, **index_params)
+    elif args.command == "bench":
+        results = benchmark(args.sizes, args.dim, args.k, args.queries, args.modes, **index_params)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Load test comparing the threaded Flask server with the async (ASGI) server.
+
+Each mode is served from a fresh subprocess in which the OpenAI chat model is replaced by
+a fake that waits a fixed latency before answering (time.sleep for invoke, asyncio.sleep
+for ainvoke), so the test measures how many conversations each mode can keep waiting on
+the LLM at once, without API calls. The Flask server gets a bounded thread pool, like a
+production WSGI server; the async server runs on uvicorn.
+
+Usage:
+    python Load_Test.py --concurrency 10 50 200 --llm-latency 0.5 --wsgi-threads 16
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import statistics
+
+# Greetings take the local intent fast path and then one LLM call in handle_greeting_feedbacks
+LOAD_MESSAGES = ["hi", "hello there", "thanks", "good morning"]
+
+
+# ============ SERVER SIDE ============
+def build_fake_llm(latency):
+    """Chat model that answers after a fixed delay, in both sync and async code paths"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeLatencyChatModel(BaseChatModel):
+        latency: float = 0.5
+        reply: str = "Hello! Great to have you here. What can I help you with today?"
+
+        @property
+        def _llm_type(self):
+            return "fake-latency"
+
+        def _result(self):
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latency)
+            return self._result()
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(self.latency)
+            return self._result()
+
+    return FakeLatencyChatModel(latency=latency)
+
+
+def serve(mode, port, llm_latency, wsgi_threads):
+    """Run one server mode with the fake LLM (executed in the benchmark's subprocesses)"""
+    import Chatbot
+
+    Chatbot.startup.wait("llm")
+    Chatbot.llm = build_fake_llm(llm_latency)
+
+    if mode == "asgi":
+        import uvicorn
+        import Async_Server
+        uvicorn.run(Async_Server.app, host="127.0.0.1", port=port, log_level="warning")
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    from socketserver import ThreadingMixIn
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(ThreadingMixIn, BaseWSGIServer):
+        """Werkzeug server handling requests on a fixed number of threads"""
+        request_queue_size = 1024
+        pool = ThreadPoolExecutor(max_workers=wsgi_threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+    PooledWSGIServer("127.0.0.1", port, Chatbot.app).serve_forever()
+
+
+# ============ CLIENT SIDE ============
+async def run_user(base_url, requests_per_user, latencies, errors, user_index):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as session_client:
+        for turn in range(requests_per_user):
+            message = LOAD_MESSAGES[(user_index + turn) % len(LOAD_MESSAGES)]
+            start = time.perf_counter()
+            try:
+                response = await session_client.post("/chat", json={"message": message})
+                if response.status_code != 200 or "response" not in response.json():
+                    errors.append(response.status_code)
+                    continue
+            except Exception as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+async def run_level(base_url, concurrency, requests_per_user):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_user(base_url, requests_per_user, latencies, errors, user_index)
+        for user_index in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1) if ordered else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def wait_until_ready(base_url, process, timeout=300):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError("server did not become ready")
+
+
+def run_load_test(concurrency_levels, requests_per_user=3, llm_latency=0.5, wsgi_threads=16, port=5055):
+    """Benchmark both serving modes at each concurrency level"""
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-load-test")  # The fake LLM answers; the key is never used
+    env["VECTORSTORE_WATCH_INTERVAL"] = "0"
+    results = {"llm_latency_seconds": llm_latency, "wsgi_threads": wsgi_threads, "modes": {}}
+
+    for mode in ("wsgi", "asgi"):
+        command = [sys.executable, __file__, "--serve", mode, "--port", str(port),
+                   "--llm-latency", str(llm_latency), "--wsgi-threads", str(wsgi_threads)]
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_ready(base_url, process)
+            levels = []
+            for concurrency in concurrency_levels:
+                level = asyncio.run(run_level(base_url, concurrency, requests_per_user))
+                levels.append(level)
+                print(f"{mode:>5} c={concurrency:<4} {level['throughput_rps']:>8.1f} req/s  "
+                      f"p50 {level['p50_ms']} ms  p95 {level['p95_ms']} ms  p99 {level['p99_ms']} ms  "
+                      f"errors {level['errors']}")
+            results["modes"][mode] = levels
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare threaded Flask and async serving under load")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests-per-user", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds the fake LLM takes per call")
+    parser.add_argument("--wsgi-threads", type=int, default=16, help="Thread pool size for the Flask server")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--serve", choices=["wsgi", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.llm_latency, args.wsgi_threads)
+    else:
+        load_results = run_load_test(args.concurrency, args.requests_per_user, args.llm_latency, args.wsgi_threads, args.port)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(load_results, f, indent=2)
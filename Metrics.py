@@ -0,0 +1,293 @@
+"""Prometheus-style metrics for the chat pipeline, served as text exposition format on /metrics.
+
+Counters and histograms are written on the request path, so recording must not contend:
+each labelled series keeps one small list of numbers per thread (keyed by thread id) and
+only that thread ever writes to it, so an increment is a dict lookup and a list update with
+no lock. A scrape sums the per-thread lists. Values that other components already count
+(cache hits, live sessions, session memory) are not duplicated on the hot path; callback
+metrics read them from those components' get_stats() when /metrics is scraped.
+
+The output follows the Prometheus text format (version 0.0.4), so Prometheus, the Grafana
+agent or `curl localhost:5000/metrics` can read it without a client library.
+"""
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request, LLM and retrieval latencies span a few milliseconds (templates, cache hits) to tens of seconds (CrewAI)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# SQLite and session backend writes
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{escape_label(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ============ SERIES ============
+class _Series:
+    """One labelled series: a fixed-size list of numbers per writing thread, summed on read"""
+    __slots__ = ("_cells", "_size")
+
+    def __init__(self, size):
+        self._cells = {}  # thread id -> [values]; only the owning thread writes its list
+        self._size = size
+
+    def _cell(self):
+        ident = threading.get_ident()
+        cell = self._cells.get(ident)
+        if cell is None:
+            # A thread id is reused only after its thread has exited, so a reused list still has one writer
+            cell = self._cells.setdefault(ident, [0] * self._size)
+        return cell
+
+    def totals(self):
+        totals = [0] * self._size
+        for cell in list(self._cells.values()):
+            for index, value in enumerate(cell):
+                totals[index] += value
+        return totals
+
+
+class CounterSeries(_Series):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self._cell()[0] += amount
+
+    def value(self):
+        return self.totals()[0]
+
+
+class HistogramSeries(_Series):
+    __slots__ = ("_bounds",)
+
+    def __init__(self, bounds):
+        super().__init__(len(bounds) + 2)  # One count per bucket, +Inf, then the sum
+        self._bounds = bounds
+
+    def observe(self, value):
+        cell = self._cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """(cumulative bucket counts with +Inf last, count, sum)"""
+        totals = self.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+# ============ METRICS ============
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label values -> series
+
+    def labels(self, *values):
+        """The series for these label values (created on first use); cache it on hot paths"""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            series = self._series.setdefault(tuple(str(value) for value in values), self._new_series())
+        return series
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count (requests, calls, tokens)"""
+    kind = "counter"
+
+    def _new_series(self):
+        return CounterSeries()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def render(self):
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, values)} {format_value(series.value())}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with their count and sum"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return HistogramSeries(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self):
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            cumulative, count, total = series.snapshot()
+            for bound, bucket_count in zip(self.buckets + (math.inf,), cumulative):
+                labels = format_labels(self.labelnames, values, ("le", format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_count{labels} {count}")
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose values are read at scrape time: collect() returns a number or {label values: number}"""
+
+    def __init__(self, name, documentation, collect, labelnames=(), kind="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = self.header()
+        for label_values, value in values.items():
+            if value is None:
+                continue
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{format_labels(self.labelnames, label_values)} {format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in Prometheus text format"""
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()  # Registration only; recording never takes it
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, collect, labelnames=()):
+        return self._add(CallbackMetric(self.prefix + name, documentation, collect, labelnames, kind="gauge"))
+
+    def counter_callback(self, name, documentation, collect, labelnames=()):
+        return self._add(CallbackMetric(self.prefix + name, documentation, collect, labelnames, kind="counter"))
+
+    def render(self):
+        """All metrics in text exposition format; a failing callback skips only its own metric"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"⚠️ Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# ============ MICROBENCHMARK ============
+def benchmark(iterations=200000, threads=4):
+    """Cost of one counter increment and one histogram observation, single- and multi-threaded"""
+    registry = MetricsRegistry()
+    counter = registry.counter("benchmark_total", "Benchmark counter", ["route"]).labels("/chat")
+    histogram = registry.histogram("benchmark_seconds", "Benchmark histogram", ["route"]).labels("/chat")
+
+    def run():
+        for index in range(iterations):
+            counter.inc()
+            histogram.observe((index % 100) / 1000)
+
+    start = time.perf_counter()
+    run()
+    single = (time.perf_counter() - start) / iterations
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    multi = (time.perf_counter() - start) / (iterations * threads)
+
+    assert counter.value() == iterations * (threads + 1)
+    results = {"iterations": iterations, "threads": threads,
+               "single_thread_ns": round(single * 1e9), "multi_thread_ns": round(multi * 1e9)}
+    print(f"inc + observe: {results['single_thread_ns']} ns single-threaded, "
+          f"{results['multi_thread_ns']} ns across {threads} threads (no lost updates)")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of lock-free metric recording")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    benchmark_results = benchmark(args.iterations, args.threads)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, indent=2)
@@ -0,0 +1,133 @@
+"""Sync and async drivers for the chat pipeline.
+
+Pipeline functions (tools, intent classification, process_user_message) are written once,
+as generators that yield the slow operations they need instead of performing them:
+- LLMCall: run a prompt | llm chain (optionally streaming tokens to the request's sink)
+- BlockingCall: anything that blocks a thread (embedding lookups, FAISS search, SQLite
+  writes, CrewAI kickoff)
+
+run_steps() drives a pipeline on the calling thread for the Flask app. arun_steps() drives
+the same pipeline on the event loop for the ASGI server, awaiting chain.ainvoke / astream
+and pushing blocking calls to a shared thread pool, so one process can hold many
+conversations that are waiting on the LLM.
+
+Both drivers trace each LLM call as an "llm.<prompt name>" span (see Tracing).
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import types
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from Tracing import span
+
+LLMCall = namedtuple('LLMCall', ['chain', 'inputs', 'stream'], defaults=(False,))
+BlockingCall = namedtuple('BlockingCall', ['func', 'args'], defaults=((),))
+
+# Per-request token callback, set by the streaming endpoints (None everywhere else)
+token_sink = contextvars.ContextVar('token_sink', default=None)
+
+ASYNC_EXECUTOR_WORKERS = int(os.environ.get('ASYNC_EXECUTOR_WORKERS', 32))
+_executor = None
+
+
+def get_executor():
+    """Thread pool for the blocking steps of async pipelines"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix="pipeline")
+    return _executor
+
+
+def steps_of(func, *args, **kwargs):
+    """Call a pipeline function from another pipeline: `result = yield from steps_of(func, ...)`"""
+    result = func(*args, **kwargs)
+    if isinstance(result, types.GeneratorType):
+        result = yield from result
+    return result
+
+
+def llm_span_name(call):
+    """Span name for an LLM call: llm.<run_name>, the registered prompt name for registry chains"""
+    config = getattr(call.chain, "config", None) or {}
+    return f"llm.{config.get('run_name', 'call')}"
+
+
+# ============ SYNC DRIVER ============
+def run_llm_call(call):
+    """Invoke the chain, streaming chunks to the token sink when the call allows it"""
+    on_token = token_sink.get()
+    with span(llm_span_name(call), streamed=bool(call.stream and on_token is not None)):
+        if not call.stream or on_token is None:
+            return call.chain.invoke(call.inputs)
+
+        message = None
+        for chunk in call.chain.stream(call.inputs):
+            if chunk.content:
+                on_token(chunk.content)
+            message = chunk if message is None else message + chunk
+        return message if message is not None else ""
+
+
+def run_steps(steps):
+    """Drive a pipeline generator to completion on this thread and return its result"""
+    if not isinstance(steps, types.GeneratorType):
+        return steps
+
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = run_llm_call(step) if isinstance(step, LLMCall) else step.func(*step.args)
+        except Exception as e:
+            # Raise inside the pipeline so its own try/except fallbacks apply
+            error = e
+
+
+# ============ ASYNC DRIVER ============
+async def arun_llm_call(call):
+    """Await the chain, streaming chunks to the token sink when the call allows it"""
+    on_token = token_sink.get()
+    with span(llm_span_name(call), streamed=bool(call.stream and on_token is not None)):
+        if not call.stream or on_token is None:
+            return await call.chain.ainvoke(call.inputs)
+
+        message = None
+        async for chunk in call.chain.astream(call.inputs):
+            if chunk.content:
+                on_token(chunk.content)
+            message = chunk if message is None else message + chunk
+        return message if message is not None else ""
+
+
+async def run_blocking(func, *args):
+    """Run a blocking callable on the pipeline thread pool, keeping the request's context"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), functools.partial(context.run, func, *args))
+
+
+async def arun_steps(steps):
+    """Drive a pipeline generator on the event loop and return its result"""
+    if not isinstance(steps, types.GeneratorType):
+        return steps
+
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            if isinstance(step, LLMCall):
+                value = await arun_llm_call(step)
+            else:
+                value = await run_blocking(step.func, *step.args)
+        except Exception as e:
+            error = e
@@ -0,0 +1,233 @@
+"""Prompts compiled once and reused across calls.
+
+Tools used to build a PromptTemplate from a large f-string and pipe it into the LLM on every
+call. The registry builds each template once, at import, and caches its `prompt | llm`
+runnable per LLM object (rebuilt only when the LLM is replaced, e.g. by a test fake). It
+also reports each prompt's static prefix, the text before the first variable, which is the
+part a provider-side prompt cache can reuse across calls (OpenAI caches prompts of 1024
+tokens or more, in 128-token steps, when the start of the prompt is identical). Templates
+are therefore laid out as invariant instructions first and per-call data last.
+
+Every call through a registry chain reports its prompt tokens, and how many of them the
+provider served from cache, from the response's usage metadata; cache_report() lists the
+prompts that still miss the cache and why. An optional on_call hook receives every call's
+latency and token counts as well (Chatbot feeds it into /metrics).
+
+Run `python Prompt_Registry.py` to measure the per-call overhead the registry removes.
+"""
+import time
+import string
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import PromptTemplate
+
+from Context_Builder import count_tokens
+
+MIN_CACHEABLE_PREFIX_TOKENS = 1024
+
+
+def static_prefix(template):
+    """The literal text of an f-string template before its first variable (braces unescaped)"""
+    prefix = []
+    for literal_text, field_name, _, _ in string.Formatter().parse(template):
+        prefix.append(literal_text)
+        if field_name is not None:
+            break
+    return "".join(prefix)
+
+
+def usage_from_token_usage(token_usage):
+    """(input tokens, cached input tokens, output tokens) from an OpenAI-style token_usage dict"""
+    details = token_usage.get("prompt_tokens_details") or {}
+    return token_usage.get("prompt_tokens", 0), details.get("cached_tokens", 0) or 0, token_usage.get("completion_tokens", 0)
+
+
+def usage_from_message(message):
+    """(input tokens, cached input tokens, output tokens) from a chat message, or None without usage"""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0, usage.get("output_tokens", 0)
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    return usage_from_token_usage(token_usage) if token_usage else None
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Reports each LLM response's latency and token usage to the registry under a prompt name"""
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self._started = {}  # run_id -> perf_counter at the start of the LLM call
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        started = self._started.pop(run_id, None)
+        seconds = time.perf_counter() - started if started is not None else None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = usage_from_message(message) if message is not None else None
+                if usage is None and (response.llm_output or {}).get("token_usage"):
+                    usage = usage_from_token_usage(response.llm_output["token_usage"])
+                self.registry.record_usage(self.name, *(usage or (None, None, None)), seconds=seconds)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._started.pop(run_id, None)
+
+
+class PromptRegistry:
+    """Named PromptTemplates built once, with cached prompt | llm runnables and per-prompt token usage"""
+
+    def __init__(self, on_call=None):
+        self.on_call = on_call  # on_call(name, seconds, input_tokens, cached_tokens, output_tokens) after every LLM call
+        self._prompts = {}  # name -> PromptTemplate
+        self._chains = {}  # name -> (llm, runnable)
+        self._usage = {}  # name -> call and token counters
+        self._lock = threading.Lock()
+
+    def register(self, name, template, input_variables):
+        """Compile a template under a name; returns the PromptTemplate"""
+        prompt = PromptTemplate(template=template, input_variables=input_variables)
+        with self._lock:
+            self._prompts[name] = prompt
+            self._chains.pop(name, None)
+        return prompt
+
+    def prompt(self, name):
+        return self._prompts[name]
+
+    def chain(self, name, llm):
+        """The prompt piped into llm, reused while llm is the same object"""
+        cached = self._chains.get(name)
+        if cached is not None and cached[0] is llm:
+            return cached[1]
+        runnable = (self._prompts[name] | llm).with_config(callbacks=[UsageCallback(self, name)], run_name=name)
+        with self._lock:
+            self._chains[name] = (llm, runnable)
+        return runnable
+
+    def names(self):
+        return list(self._prompts)
+
+    def prefix_stats(self, name):
+        """Static prefix length in characters and tokens, against the whole template"""
+        template = self._prompts[name].template
+        prefix = static_prefix(template)
+        prefix_tokens = count_tokens(prefix) if prefix else 0
+        return {
+            "template_chars": len(template),
+            "template_tokens": count_tokens(template),
+            "static_prefix_chars": len(prefix),
+            "static_prefix_tokens": prefix_tokens,
+            "cacheable": prefix_tokens >= MIN_CACHEABLE_PREFIX_TOKENS,
+            "input_variables": list(self._prompts[name].input_variables),
+        }
+
+    def get_stats(self):
+        """prefix_stats for every registered prompt"""
+        return {name: self.prefix_stats(name) for name in self.names()}
+
+    # ============ CACHED-TOKEN ACCOUNTING ============
+    def record_usage(self, name, input_tokens, cached_tokens, output_tokens, seconds=None):
+        """Count one LLM call for a prompt; pass None token counts when the response had no usage"""
+        if self.on_call is not None:
+            self.on_call(name, seconds, input_tokens, cached_tokens, output_tokens)
+        with self._lock:
+            usage = self._usage.setdefault(name, {"calls": 0, "calls_without_usage": 0, "calls_with_cache_hit": 0,
+                                                  "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0})
+            usage["calls"] += 1
+            if input_tokens is None:
+                usage["calls_without_usage"] += 1
+                return
+            usage["input_tokens"] += input_tokens
+            usage["cached_tokens"] += cached_tokens
+            usage["output_tokens"] += output_tokens
+            if cached_tokens:
+                usage["calls_with_cache_hit"] += 1
+
+    def get_usage(self):
+        """Per-prompt calls and prompt tokens split into cached and uncached"""
+        with self._lock:
+            usage = {name: dict(counters) for name, counters in self._usage.items()}
+        for counters in usage.values():
+            counters["uncached_tokens"] = counters["input_tokens"] - counters["cached_tokens"]
+            counters["cached_ratio"] = round(counters["cached_tokens"] / counters["input_tokens"], 3) if counters["input_tokens"] else 0.0
+        return usage
+
+    def cache_report(self):
+        """Each prompt's cache status: hit, or why it still misses the provider cache"""
+        usage = self.get_usage()
+        report = {}
+        for name in sorted(set(self.names()) | set(usage)):
+            prefix = self.prefix_stats(name) if name in self._prompts else None
+            counters = usage.get(name, {})
+            if not counters.get("calls"):
+                status = "not called yet"
+            elif counters["calls_with_cache_hit"]:
+                status = "hit"
+            elif counters["calls"] == counters["calls_without_usage"]:
+                status = "miss: the model reported no token usage"
+            elif prefix is not None and not prefix["cacheable"]:
+                status = f"miss: static prefix is {prefix['static_prefix_tokens']} tokens, below the {MIN_CACHEABLE_PREFIX_TOKENS}-token cache minimum"
+            else:
+                status = "miss: no cached tokens reported yet"
+            report[name] = {
+                "status": status,
+                "static_prefix_tokens": prefix["static_prefix_tokens"] if prefix else None,
+                "calls": counters.get("calls", 0),
+                "cached_ratio": counters.get("cached_ratio", 0.0),
+                "uncached_tokens": counters.get("uncached_tokens", 0),
+            }
+        return report
+
+
+# ============ MICROBENCHMARK ============
+def benchmark(iterations=2000):
+    """Per-call cost of building PromptTemplate | llm vs reusing the registry's runnable"""
+    import time
+    import os
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-prompt-benchmark")  # The chains are built, never invoked
+    os.environ["VECTORSTORE_WATCH_INTERVAL"] = "0"
+    import Chatbot
+
+    llm = Chatbot.get_llm()
+    results = {"iterations": iterations, "prompts": {}}
+    for name in Chatbot.prompts.names():
+        prompt = Chatbot.prompts.prompt(name)
+        template, variables = prompt.template, list(prompt.input_variables)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            PromptTemplate(template=template, input_variables=variables) | llm
+        rebuild = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            Chatbot.prompts.chain(name, llm)
+        registry = (time.perf_counter() - start) / iterations
+
+        results["prompts"][name] = {"rebuild_us": round(rebuild * 1e6, 2), "registry_us": round(registry * 1e6, 3)}
+        print(f"{name:<32} rebuild {rebuild * 1e6:8.1f} µs   registry {registry * 1e6:6.2f} µs")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-call prompt construction cost: rebuild vs registry")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    benchmark_results = benchmark(args.iterations)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, indent=2)
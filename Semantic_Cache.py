@@ -0,0 +1,138 @@
+"""Semantic answer cache for search_company_info.
+
+Answers are keyed by the query embedding. A new question whose embedding has cosine
+similarity above the threshold with a cached question reuses that answer, so
+"do you do cybersecurity?" and "cyber security services?" share one LLM generation.
+
+Entries are evicted LRU once the size cap is reached and expire after a TTL. The whole
+cache is dropped when the files of the vectorstore it was built from change.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def vectorstore_fingerprint(vectorstore_path):
+    """Size and mtime of every file in the vectorstore directory"""
+    try:
+        return tuple(sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in os.scandir(vectorstore_path)
+            # SQLite -wal/-shm files change on reads too; the main files capture real updates
+            if entry.is_file() and not entry.name.endswith(("-wal", "-shm"))
+        ))
+    except FileNotFoundError:
+        return ()
+
+
+class SemanticAnswerCache:
+    """Thread-safe LRU/TTL cache of answers looked up by embedding cosine similarity"""
+
+    def __init__(self, vectorstore_path, threshold=0.92, max_entries=1000, ttl_seconds=3600, fingerprint_check_interval=5.0):
+        self.vectorstore_path = vectorstore_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint_check_interval = fingerprint_check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (unit vector, answer, created_at, question)
+        self._matrix = None  # Stacked unit vectors, rebuilt lazily after changes
+        self._matrix_keys = []
+        self._next_key = 0
+        self._fingerprint = vectorstore_fingerprint(vectorstore_path)
+        self._last_fingerprint_check = time.monotonic()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_fingerprint(self):
+        now = time.monotonic()
+        if now - self._last_fingerprint_check < self.fingerprint_check_interval:
+            return
+        self._last_fingerprint_check = now
+        fingerprint = vectorstore_fingerprint(self.vectorstore_path)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._clear()
+            self.stats["invalidations"] += 1
+            print("🧹 Semantic cache invalidated: vectorstore changed")
+
+    def _clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._matrix_keys = []
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        # TTL counts from creation while order tracks recency, so scan; it is cheaper than the similarity product
+        expired = [key for key, entry in self._entries.items() if entry[2] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+            self.stats["expirations"] += len(expired)
+
+    def lookup(self, query_vector):
+        """Return (answer, similarity) of the closest cached question, or (None, best_similarity)"""
+        query = self._unit(query_vector)
+        with self._lock:
+            self._check_fingerprint()
+            self._expire()
+            if not self._entries:
+                self.stats["misses"] += 1
+                return None, 0.0
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.vstack([self._entries[key][0] for key in self._matrix_keys])
+
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.stats["misses"] += 1
+                return None, similarity
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._entries[key][1], similarity
+
+    def store(self, query_vector, answer, question=""):
+        """Cache an answer for the given query embedding"""
+        with self._lock:
+            self._check_fingerprint()
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (self._unit(query_vector), answer, time.time(), question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._matrix = None
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._clear()
+            self._fingerprint = vectorstore_fingerprint(self.vectorstore_path)
+            self.stats["invalidations"] += 1
+
+    def get_stats(self):
+        """Hit-rate metrics and current size"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,418 @@
+"""Out-of-process storage for serialized session state.
+
+Every backend stores opaque bytes (SessionState.to_bytes) per session id with a TTL, so
+conversation windows and half-finished leads survive restarts and any worker can serve
+any turn. Chosen with SESSION_BACKEND:
+- unset / "local": no backend, state lives only in this process (single worker)
+- "memory": serialized in-process store, same code path as the shared backends
+- "sqlite:///data/sessions.db": SQLite file in WAL mode, shared by workers on one host
+- "redis://host:6379/0": anything speaking the Redis protocol (RESP), shared across nodes
+
+Each backend also grants leases: a session's lease is held by one process at a time, for
+at most its TTL, so two workers serving turns of the same conversation run them one after
+the other instead of both saving and the last write winning (see SessionStore.turn).
+
+`python Session_Backends.py serve --port 6390` runs a small RESP server that stands in
+for Redis in development and load tests.
+"""
+import time
+import socket
+import sqlite3
+import threading
+import socketserver
+from urllib.parse import urlparse
+
+
+# Deletes a lease only if it still holds the caller's token (a lease that expired may have been re-granted)
+RELEASE_LEASE_SCRIPT = "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) else return 0 end"
+
+
+# ============ BACKENDS ============
+class MemoryBackend:
+    """Serialized session states in a dict, expiring after their TTL"""
+
+    def __init__(self):
+        self._data = {}  # session_id -> (expires_at, bytes)
+        self._leases = {}  # session_id -> (expires_at, token)
+        self._lock = threading.Lock()
+
+    def acquire_lease(self, session_id, token, ttl):
+        """Grant the session's lease to token for ttl seconds unless another live token holds it"""
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(session_id)
+            if lease is not None and lease[0] > now and lease[1] != token:
+                return False
+            self._leases[session_id] = (now + ttl, token)
+            return True
+
+    def release_lease(self, session_id, token):
+        with self._lock:
+            lease = self._leases.get(session_id)
+            if lease is not None and lease[1] == token:
+                del self._leases[session_id]
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[session_id]
+                return None
+            return entry[1]
+
+    def set(self, session_id, data, ttl):
+        with self._lock:
+            self._data[session_id] = (time.time() + ttl, data)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [session_id for session_id, (expires_at, _) in self._data.items() if expires_at <= now]
+            for session_id in expired:
+                del self._data[session_id]
+        return len(expired)
+
+    def count(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteBackend:
+    """Serialized session states in a SQLite table (WAL mode, one connection per thread)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_state (
+            session_id TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_expires ON session_state (expires_at)")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_lease (
+            session_id TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT data FROM session_state WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, session_id, data, ttl):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO session_state (session_id, data, expires_at) VALUES (?, ?, ?)",
+            (session_id, data, time.time() + ttl),
+        )
+        conn.commit()
+
+    def delete(self, session_id):
+        conn = self._connection()
+        conn.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def acquire_lease(self, session_id, token, ttl):
+        """Insert the lease row, or take it over once it has expired; one statement, so atomic across processes"""
+        now = time.time()
+        conn = self._connection()
+        granted = conn.execute("""
+            INSERT INTO session_lease (session_id, token, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at
+            WHERE session_lease.expires_at <= ? OR session_lease.token = excluded.token
+        """, (session_id, token, now + ttl, now)).rowcount
+        conn.commit()
+        return granted == 1
+
+    def release_lease(self, session_id, token):
+        conn = self._connection()
+        conn.execute("DELETE FROM session_lease WHERE session_id = ? AND token = ?", (session_id, token))
+        conn.commit()
+
+    def purge_expired(self):
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM session_state WHERE expires_at <= ?", (time.time(),)).rowcount
+        conn.execute("DELETE FROM session_lease WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        return removed
+
+    def count(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM session_state WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+class RespError(RuntimeError):
+    """Error reply from a Redis-protocol server"""
+
+
+def encode_command(*args):
+    """A command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """Read one RESP value from a binary file-like stream"""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        raise RespError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        return None if length < 0 else [read_reply(stream) for _ in range(length)]
+    raise RespError(f"unexpected reply {line!r}")
+
+
+class RedisBackend:
+    """Serialized session states in Redis (or the RESP stand-in), one connection per thread"""
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, prefix="chatbot:session:",
+                 lease_prefix="chatbot:lease:", timeout=5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.lease_prefix = lease_prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        self._local.conn = (sock, stream)
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+        return self._local.conn
+
+    def _send(self, *args):
+        sock, stream = getattr(self._local, "conn", None) or self._connect()
+        sock.sendall(encode_command(*args))
+        return read_reply(stream)
+
+    def execute(self, *args):
+        """Run one command, reconnecting once if the connection dropped"""
+        try:
+            return self._send(*args)
+        except (ConnectionError, OSError):
+            self.close()
+            return self._send(*args)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn[1].close()
+            conn[0].close()
+
+    def get(self, session_id):
+        return self.execute("GET", self.prefix + session_id)
+
+    def set(self, session_id, data, ttl):
+        self.execute("SET", self.prefix + session_id, data, "EX", max(1, int(ttl)))
+
+    def delete(self, session_id):
+        self.execute("DEL", self.prefix + session_id)
+
+    def acquire_lease(self, session_id, token, ttl):
+        return self.execute("SET", self.lease_prefix + session_id, token, "NX", "PX", max(1, int(ttl * 1000))) is not None
+
+    def release_lease(self, session_id, token):
+        self.execute("EVAL", RELEASE_LEASE_SCRIPT, 1, self.lease_prefix + session_id, token)
+
+    def purge_expired(self):
+        return 0  # Redis expires keys itself
+
+    def count(self):
+        return None  # Keys share the database with other data; not counted
+
+
+def create_backend(spec):
+    """Backend for a SESSION_BACKEND value, or None for process-local state"""
+    spec = (spec or "local").strip()
+    if spec == "local":
+        return None
+    if spec == "memory":
+        return MemoryBackend()
+    url = urlparse(spec)
+    if url.scheme == "sqlite":
+        return SQLiteBackend(url.netloc + url.path if url.netloc else url.path[1:] or "data/sessions.db")
+    if url.scheme == "redis":
+        return RedisBackend(host=url.hostname or "127.0.0.1", port=url.port or 6379,
+                            db=int(url.path.lstrip("/") or 0), password=url.password)
+    raise ValueError(f"unknown SESSION_BACKEND {spec!r} (use local, memory, sqlite:///path or redis://host:port/db)")
+
+
+# ============ RESP STAND-IN SERVER ============
+class RespHandler(socketserver.StreamRequestHandler):
+    """Serves the subset of Redis commands the session backend uses"""
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            except RespError as e:
+                self.wfile.write(b"-ERR %s\r\n" % str(e).encode("utf-8"))
+                continue
+            if not isinstance(command, list) or not command:
+                self.wfile.write(b"-ERR expected a command array\r\n")
+                continue
+            try:
+                reply = self.server.run_command(command[0].decode("utf-8").upper(), command[1:])
+            except Exception as e:
+                reply = RespError(f"ERR {e}")
+            self.wfile.write(self.encode_reply(reply))
+            if command[0].upper() == b"QUIT":
+                return
+
+    @staticmethod
+    def encode_reply(reply):
+        if isinstance(reply, RespError):
+            return b"-%s\r\n" % str(reply).encode("utf-8")
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, bool):
+            return b"+OK\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return b"+%s\r\n" % reply.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """In-memory key/value server speaking RESP: PING GET SET(EX/PX/NX) DEL EXISTS EXPIRE TTL DBSIZE FLUSHDB,
+    and EVAL of the lease release script only"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.data = {}  # key -> (expires_at or None, value)
+        self.lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def run_command(self, name, args):
+        now = time.time()
+        with self.lock:
+            if name == "PING":
+                return args[0] if args else "PONG"
+            if name in ("SELECT", "AUTH", "QUIT"):
+                return True
+            if name == "GET":
+                entry = self._live(args[0], now)
+                return entry[1] if entry else None
+            if name == "SET":
+                key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                expires_at = None
+                if b"EX" in options:
+                    expires_at = now + int(args[2 + options.index(b"EX") + 1])
+                elif b"PX" in options:
+                    expires_at = now + int(args[2 + options.index(b"PX") + 1]) / 1000
+                if b"NX" in options and self._live(key, now) is not None:
+                    return None
+                self.data[key] = (expires_at, value)
+                return True
+            if name == "EVAL":
+                if args[0].decode("utf-8") != RELEASE_LEASE_SCRIPT:
+                    return RespError("ERR only the session lease release script is supported")
+                key, token = args[2], args[3]
+                entry = self._live(key, now)
+                if entry is None or entry[1] != token:
+                    return 0
+                del self.data[key]
+                return 1
+            if name == "DEL":
+                return sum(1 for key in args if self._live(key, now) is not None and self.data.pop(key))
+            if name == "EXISTS":
+                return sum(1 for key in args if self._live(key, now) is not None)
+            if name == "EXPIRE":
+                entry = self._live(args[0], now)
+                if entry is None:
+                    return 0
+                self.data[args[0]] = (now + int(args[1]), entry[1])
+                return 1
+            if name == "TTL":
+                entry = self._live(args[0], now)
+                if entry is None:
+                    return -2
+                return -1 if entry[0] is None else int(entry[0] - now)
+            if name == "DBSIZE":
+                for key in list(self.data):
+                    self._live(key, now)
+                return len(self.data)
+            if name == "FLUSHDB":
+                self.data.clear()
+                return True
+        return RespError(f"ERR unknown command '{name}'")
+
+
+def serve_resp(host="127.0.0.1", port=6390):
+    """Run the RESP stand-in until interrupted"""
+    with RespServer((host, port)) as server:
+        print(f"🗄️ RESP session store listening on {host}:{port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Session backends: run the Redis-protocol stand-in server")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subcommands.add_parser("serve", help="Serve an in-memory RESP store for SESSION_BACKEND=redis://")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    serve_resp(args.host, args.port)
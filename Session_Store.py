@@ -0,0 +1,392 @@
+"""Thread-safe, sharded session store.
+
+All per-visitor state (conversation history, lead qualification data, consultation data,
+last activity) lives in one SessionState record per session. Records are spread over
+shards, each guarded by its own lock (lock striping), so requests for different sessions
+rarely contend and a lock is only ever held for a dict operation. Each session also has a
+turn lock that serializes turns within one conversation, so two tabs posting at once
+cannot interleave lead-qualification updates. Async turns of one session first queue on a
+per-session asyncio lock, so at most one of them waits on the turn lock, and that wait runs
+on a dedicated thread pool: waiters can never take the executor threads that the lock
+holder needs to save its state and release.
+
+Expiry uses a min-heap of deadlines per shard, with one entry per session: a pass pops only
+due entries, re-queues sessions that were active since their entry was pushed and removes
+the rest, so it costs O(expired) rather than a scan, and can run every second. Each shard
+also keeps its sessions in least-recently-active order; with max_sessions set, creating a
+session beyond the shard's share of the cap evicts its least recently active idle session.
+Sessions that are mid-turn are never expired or evicted, and never waited on.
+
+With a backend (see Session_Backends), the records here are a per-process cache: each turn
+loads the session's serialized state from the backend after taking the turn lock and saves
+it back when the turn ends, so any worker process can serve any turn of a conversation.
+The turn lock only excludes turns in this process, so a turn also holds the backend's
+lease on the session from before the load until after the save; a worker serving the same
+conversation at the same moment waits for it instead of overwriting its state. A lease
+expires after lease_ttl seconds, so a crashed worker cannot block a session for longer.
+An optional on_save hook receives the duration of every backend write.
+"""
+import json
+import zlib
+import time
+import uuid
+import heapq
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+
+from Conversation_Window import ConversationWindow
+
+DEFAULT_SHARDS = 16
+
+STATE_FORMAT_VERSION = 2  # 2 added the rolling summary and pending lines; version 1 still loads
+COMPRESS_THRESHOLD = 1024  # Serialized states larger than this are zlib-compressed
+BACKEND_PURGE_INTERVAL = 60  # Seconds between backend purges (local expiry runs every pass)
+DEFAULT_LEASE_TTL = 120  # Seconds; longer than a slow turn (CrewAI kickoff plus LLM calls)
+LOCK_WAIT_WORKERS = 8  # Threads for async turns waiting on a turn lock held by a sync turn or expiry pass
+_lock_wait_executor = None
+
+
+def get_lock_wait_executor():
+    """Thread pool for turn-lock waits, separate from the executor backend loads and saves run on"""
+    global _lock_wait_executor
+    if _lock_wait_executor is None:
+        _lock_wait_executor = ThreadPoolExecutor(max_workers=LOCK_WAIT_WORKERS, thread_name_prefix="session-lock")
+    return _lock_wait_executor
+
+
+class SessionState:
+    """Everything the chatbot keeps for one visitor"""
+    __slots__ = ("session_id", "last_activity", "expires_at", "conversation", "lead_data", "consultation_data",
+                 "turn_lock", "_async_lock")
+
+    def __init__(self, session_id, window_factory=ConversationWindow):
+        self.session_id = session_id
+        self.last_activity = time.time()
+        self.expires_at = None  # Deadline of this session's entry in its shard's expiry heap
+        self.conversation = window_factory()
+        self.lead_data = None
+        self.consultation_data = None
+        self.turn_lock = threading.Lock()
+        self._async_lock = None  # (event loop, asyncio.Lock) serializing async turns
+
+    def async_lock(self, loop):
+        """The asyncio lock that queues this session's async turns on the given event loop"""
+        if self._async_lock is None or self._async_lock[0] is not loop:
+            self._async_lock = (loop, asyncio.Lock())
+        return self._async_lock[1]
+
+    def to_bytes(self):
+        """Compact serialized form: positional JSON, zlib-compressed when large"""
+        payload = [
+            STATE_FORMAT_VERSION,
+            round(self.last_activity, 3),
+            [[role, message, round(timestamp, 3)] for role, message, timestamp in self.conversation.messages()],
+            self.lead_data,
+            self.consultation_data,
+            self.conversation.summary,
+            self.conversation.pending,
+        ]
+        data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(data) > COMPRESS_THRESHOLD:
+            return b"z" + zlib.compress(data)
+        return b"j" + data
+
+    def load_bytes(self, data):
+        """Replace this state's contents with a serialized state (None resets it)"""
+        self.conversation.clear()
+        if data is None:
+            self.lead_data = None
+            self.consultation_data = None
+            return
+        body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        payload = json.loads(body)
+        version, last_activity, conversation, lead_data, consultation_data = payload[:5]
+        if version not in (1, STATE_FORMAT_VERSION):
+            raise ValueError(f"unsupported session state version {version}")
+        self.last_activity = max(self.last_activity, last_activity)
+        for role, message, timestamp in conversation:
+            self.conversation.append(role, message, timestamp)
+        if version >= 2:
+            # Set after the replay, which may have re-evicted lines already in the saved pending list
+            self.conversation.restore_summary(payload[5], payload[6])
+        self.lead_data = lead_data
+        self.consultation_data = consultation_data
+
+
+class _Shard:
+    __slots__ = ("sessions", "lock", "expiry")
+
+    def __init__(self):
+        self.sessions = OrderedDict()  # session_id -> SessionState, least recently active first
+        self.lock = threading.Lock()
+        self.expiry = []  # Min-heap of (deadline, session_id)
+
+
+class SessionStore:
+    """Session records in lock-striped shards, with a per-session turn lock, expiry heap and LRU cap"""
+
+    def __init__(self, shards=DEFAULT_SHARDS, backend=None, ttl=1800, max_sessions=0, window_factory=ConversationWindow,
+                 on_save=None, lease_ttl=DEFAULT_LEASE_TTL):
+        self._shards = [_Shard() for _ in range(shards)]
+        self.window_factory = window_factory
+        self.backend = backend
+        self.on_save = on_save  # on_save(seconds) after each backend write
+        self.ttl = ttl
+        self.lease_ttl = lease_ttl
+        self.max_sessions = max_sessions
+        self._shard_capacity = -(-max_sessions // shards) if max_sessions else 0
+        self._next_purge = 0.0
+        self.stats = {"created": 0, "expired": 0, "evicted": 0}
+        self._stats_lock = threading.Lock()
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def get(self, session_id):
+        """The session's state, or None if it does not exist"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.get(session_id)
+
+    def get_or_create(self, session_id, touch=False):
+        """The session's state, created if missing; touch=True also marks it active"""
+        shard = self._shard(session_id)
+        created, evicted = False, 0
+        with shard.lock:
+            state = shard.sessions.get(session_id)
+            if state is None:
+                created = True
+                state = shard.sessions[session_id] = SessionState(session_id, self.window_factory)
+                self._schedule(shard, state, state.last_activity + self.ttl)
+                if self._shard_capacity and len(shard.sessions) > self._shard_capacity:
+                    evicted = self._evict_lru(shard, keep=state)
+            elif touch:
+                # Under the shard lock so expiry sees the new activity time
+                state.last_activity = time.time()
+                shard.sessions.move_to_end(session_id)
+        if created:
+            self._count("created")
+        if evicted:
+            self._count("evicted", evicted)
+        return state
+
+    @staticmethod
+    def _schedule(shard, state, deadline):
+        state.expires_at = deadline
+        heapq.heappush(shard.expiry, (deadline, state.session_id))
+
+    def _evict_lru(self, shard, keep):
+        """Drop least recently active idle sessions until the shard is back under its cap (shard lock held)"""
+        excess = len(shard.sessions) - self._shard_capacity
+        victims = []
+        # Walk from the least recently active end only until enough idle sessions are found; the dict
+        # cannot change under the iterator, so victims are deleted afterwards (turn locks held until then)
+        for state in shard.sessions.values():
+            if len(victims) >= excess:
+                break
+            if state is not keep and state.turn_lock.acquire(blocking=False):
+                victims.append(state)
+        for state in victims:
+            try:
+                del shard.sessions[state.session_id]  # Its heap entry goes stale and is dropped when due
+            finally:
+                state.turn_lock.release()
+        return len(victims)
+
+    def touch(self, session_id):
+        """Mark the session active now"""
+        return self.get_or_create(session_id, touch=True)
+
+    def remove(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.pop(session_id, None)
+
+    def snapshot(self):
+        """All session states, copied one shard at a time"""
+        states = []
+        for shard in self._shards:
+            with shard.lock:
+                states.extend(shard.sessions.values())
+        return states
+
+    def load(self, state):
+        """Refresh a state from the backend (call with its turn lock held)"""
+        if self.backend is None:
+            return
+        try:
+            state.load_bytes(self.backend.get(state.session_id))
+        except Exception as e:
+            print(f"⚠️ Could not load session {state.session_id} from the session backend: {e}")
+
+    def save(self, state):
+        """Write a state to the backend (call with its turn lock held)"""
+        if self.backend is None:
+            return
+        start = time.perf_counter()
+        try:
+            self.backend.set(state.session_id, state.to_bytes(), self.ttl)
+        except Exception as e:
+            print(f"⚠️ Could not save session {state.session_id} to the session backend: {e}")
+            return
+        if self.on_save is not None:
+            self.on_save(time.perf_counter() - start)
+
+    def _try_lease(self, session_id, token):
+        try:
+            return self.backend.acquire_lease(session_id, token, self.lease_ttl)
+        except Exception as e:
+            print(f"⚠️ Could not take the lease on session {session_id}, continuing without it: {e}")
+            return None
+
+    def acquire_lease(self, session_id):
+        """Wait for the backend's lease on a session (call with its turn lock held); returns the token or None"""
+        if self.backend is None:
+            return None
+        token, delay = uuid.uuid4().hex, 0.005
+        deadline = time.monotonic() + self.lease_ttl  # By then the holder's lease has expired
+        while True:
+            granted = self._try_lease(session_id, token)
+            if granted is None:
+                return None
+            if granted:
+                return token
+            if time.monotonic() >= deadline:
+                print(f"⚠️ Session {session_id} stayed leased for {self.lease_ttl}s, continuing without the lease")
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    async def aacquire_lease(self, session_id):
+        """acquire_lease without blocking the event loop while another process holds the lease"""
+        if self.backend is None:
+            return None
+        loop = asyncio.get_running_loop()
+        token, delay = uuid.uuid4().hex, 0.005
+        deadline = time.monotonic() + self.lease_ttl
+        while True:
+            attempt = loop.run_in_executor(None, self._try_lease, session_id, token)
+            try:
+                granted = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # The attempt may still succeed; give the lease back rather than leave it until it expires
+                attempt.add_done_callback(lambda _: self.release_lease(session_id, token))
+                raise
+            if granted is None:
+                return None
+            if granted:
+                return token
+            if time.monotonic() >= deadline:
+                print(f"⚠️ Session {session_id} stayed leased for {self.lease_ttl}s, continuing without the lease")
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def release_lease(self, session_id, token):
+        if token is None:
+            return
+        try:
+            self.backend.release_lease(session_id, token)
+        except Exception as e:
+            print(f"⚠️ Could not release the lease on session {session_id} (it expires on its own): {e}")
+
+    @contextmanager
+    def turn(self, session_id):
+        """Hold the session's turn lock and backend lease for one request (blocking), loading and saving its state"""
+        state = self.touch(session_id)
+        with state.turn_lock:
+            token = self.acquire_lease(session_id)
+            try:
+                self.load(state)
+                try:
+                    yield state
+                finally:
+                    self.save(state)
+            finally:
+                self.release_lease(session_id, token)
+
+    @asynccontextmanager
+    async def aturn(self, session_id):
+        """Hold the session's turn lock for one request without blocking the event loop"""
+        state = self.touch(session_id)
+        loop = asyncio.get_running_loop()
+        async with state.async_lock(loop):
+            if not state.turn_lock.acquire(blocking=False):
+                # Held by a thread (a sync turn, expiry or eviction), not by another async turn
+                acquire = loop.run_in_executor(get_lock_wait_executor(), state.turn_lock.acquire)
+                try:
+                    await asyncio.shield(acquire)
+                except asyncio.CancelledError:
+                    # The executor thread still takes the lock; hand it straight back
+                    acquire.add_done_callback(lambda _: state.turn_lock.release())
+                    raise
+            try:
+                token = await self.aacquire_lease(session_id)
+                try:
+                    if self.backend is not None:
+                        await loop.run_in_executor(None, self.load, state)
+                    try:
+                        yield state
+                    finally:
+                        if self.backend is not None:
+                            await loop.run_in_executor(None, self.save, state)
+                finally:
+                    if token is not None:
+                        await loop.run_in_executor(None, self.release_lease, session_id, token)
+            finally:
+                state.turn_lock.release()
+
+    def cleanup(self, now=None):
+        """Remove sessions idle for more than ttl seconds and return their ids"""
+        now = now or time.time()
+        removed = []
+        for shard in self._shards:
+            with shard.lock:
+                while shard.expiry and shard.expiry[0][0] <= now:
+                    deadline, session_id = heapq.heappop(shard.expiry)
+                    state = shard.sessions.get(session_id)
+                    if state is None or state.expires_at != deadline:
+                        continue  # Removed, evicted or rescheduled since this entry was pushed
+                    if state.last_activity + self.ttl > now:
+                        self._schedule(shard, state, state.last_activity + self.ttl)
+                    elif not state.turn_lock.acquire(blocking=False):
+                        self._schedule(shard, state, now + 1)  # Mid-turn: look again next pass
+                    else:
+                        try:
+                            del shard.sessions[session_id]
+                            removed.append(session_id)
+                        finally:
+                            state.turn_lock.release()
+        if removed:
+            self._count("expired", len(removed))
+
+        if self.backend is not None and now >= self._next_purge:
+            # Expiry above drops only this process's cache; the backend purges its own copies
+            self._next_purge = now + BACKEND_PURGE_INTERVAL
+            try:
+                self.backend.purge_expired()
+            except Exception as e:
+                print(f"⚠️ Session backend purge failed: {e}")
+        return removed
+
+    def get_stats(self):
+        """Live sessions, cap, expiry index size and lifetime created/expired/evicted counts"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            "sessions": len(self),
+            "max_sessions": self.max_sessions,
+            "expiry_index_size": sum(len(shard.expiry) for shard in self._shards),
+            "shards": len(self._shards),
+        })
+        return stats
@@ -0,0 +1,163 @@
+"""Staged, parallel startup for the chatbot.
+
+Each heavy component (database, LLM client, embeddings, vectorstore, CrewAI agents) is
+registered with a loader and its dependencies. `start()` runs the loaders on background
+threads as soon as their dependencies are ready, so the Flask app can serve while they
+load. Request handlers call `wait(...)` only for the components they actually use, and
+`status()` backs the /ready endpoint.
+
+Run `python Startup.py` to benchmark cold start of Chatbot.py in fresh processes,
+comparing the parallel staged startup with STARTUP_MODE=serial.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+
+class ComponentNotReady(RuntimeError):
+    """Raised when a component failed to load or did not load in time"""
+
+
+class _Component:
+    def __init__(self, name, loader, depends_on):
+        self.name = name
+        self.loader = loader
+        self.depends_on = tuple(depends_on)
+        self.state = "pending"
+        self.started_at = None
+        self.seconds = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class StartupComponents:
+    """Registry of lazily loaded components with dependency-aware parallel loading"""
+
+    def __init__(self):
+        self._components = {}
+        self._created_at = time.perf_counter()
+        self._started = False
+
+    def register(self, name, loader, depends_on=()):
+        """Register a loader; it runs after every component in depends_on is ready"""
+        self._components[name] = _Component(name, loader, depends_on)
+
+    def _load(self, component):
+        for dependency in component.depends_on:
+            self._components[dependency].done.wait()
+            if self._components[dependency].state != "ready":
+                component.state = "failed"
+                component.error = f"dependency '{dependency}' failed"
+                component.done.set()
+                return
+
+        component.state = "loading"
+        component.started_at = time.perf_counter()
+        try:
+            component.loader()
+            component.state = "ready"
+        except Exception as e:
+            component.state = "failed"
+            component.error = str(e)
+            print(f"❌ Startup component '{component.name}' failed: {e}")
+        finally:
+            component.seconds = time.perf_counter() - component.started_at
+            component.done.set()
+            if component.state == "ready":
+                print(f"✅ Startup component '{component.name}' ready in {component.seconds:.2f}s")
+
+    def start(self, parallel=True):
+        """Load every component, on background threads unless parallel is False"""
+        if self._started:
+            return
+        self._started = True
+        for component in self._components.values():
+            if parallel:
+                threading.Thread(target=self._load, args=(component,), name=f"startup-{component.name}", daemon=True).start()
+            else:
+                self._load(component)
+
+    def wait(self, *names, timeout=120):
+        """Block until the named components are ready; raise ComponentNotReady otherwise"""
+        deadline = time.monotonic() + timeout
+        for name in names:
+            component = self._components[name]
+            if not component.done.wait(max(0.0, deadline - time.monotonic())):
+                raise ComponentNotReady(f"'{name}' is still {component.state}")
+            if component.state != "ready":
+                raise ComponentNotReady(f"'{name}' failed to load: {component.error}")
+
+    def is_ready(self, *names):
+        names = names or tuple(self._components)
+        return all(self._components[name].state == "ready" for name in names)
+
+    def status(self):
+        """Per-component state and load time for the /ready endpoint"""
+        return {
+            name: {
+                "state": component.state,
+                "depends_on": list(component.depends_on),
+                "load_seconds": round(component.seconds, 3) if component.seconds is not None else None,
+                "ready_after_seconds": round(component.started_at + component.seconds - self._created_at, 3)
+                if component.seconds is not None else None,
+                "error": component.error,
+            }
+            for name, component in self._components.items()
+        }
+
+
+# ============ STARTUP BENCHMARK ============
+_PROBE = """
+import time, json
+start = time.perf_counter()
+import Chatbot
+imported = time.perf_counter() - start
+ready = {}
+for name in Chatbot.startup.status():
+    try:
+        Chatbot.startup.wait(name, timeout=600)
+    except Exception:
+        pass
+    ready[name] = round(time.perf_counter() - start, 3)
+print(json.dumps({"import_seconds": round(imported, 3), "ready_seconds": ready,
+                  "all_ready_seconds": round(time.perf_counter() - start, 3)}))
+"""
+
+
+def benchmark_startup(repeats=3):
+    """Cold-start Chatbot.py in fresh processes for each startup mode"""
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-startup-benchmark")  # Clients are built, never called
+    env["VECTORSTORE_WATCH_INTERVAL"] = "0"
+    results = {}
+    for mode in ("serial", "parallel"):
+        env["STARTUP_MODE"] = mode
+        runs = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, env=env, check=True).stdout
+            # Loader threads log to stdout too and can interleave with the probe's JSON line
+            runs.append(json.loads(output[output.rindex('{"import_seconds"'):].splitlines()[0]))
+        results[mode] = {
+            "import_seconds": min(run["import_seconds"] for run in runs),
+            "all_ready_seconds": min(run["all_ready_seconds"] for run in runs),
+            "runs": runs,
+        }
+        print(f"{mode:>8}: app importable after {results[mode]['import_seconds']:.2f}s, "
+              f"all components ready after {results[mode]['all_ready_seconds']:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark chatbot cold start")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    benchmark_results = benchmark_startup(args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, indent=2)
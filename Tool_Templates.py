@@ -0,0 +1,138 @@
+"""Zero-LLM rendering for the fixed-content tools.
+
+company_contact_info, company_portfolio and clients_reviews only ever answer with a
+handful of approved texts. A local keyword/synonym index picks the right one and the
+exact approved text is rendered without an LLM call. `render_*` functions return None
+when nothing in the message matches, so the caller can fall back to the LLM prompt.
+"""
+import threading
+from collections import Counter
+
+from Intent_Classifier import normalize
+
+COMPANY_NAME = "Genetech Solutions"
+
+# ============ APPROVED TEXTS ============
+CONTACT_INFO_TEXT = f"""Here are the ways to contact {COMPANY_NAME}:
+
+• Pakistan Office: +92 21 3455 8425
+• USA Office: +1 734-519-1414
+• General Email: info@genetech.co
+• Direct Consultation with COO Shamim Rajani:
+  • Email: shamim@genetech.io
+  • LinkedIn: linkedin.com/in/shamimrajani
+
+Feel free to reach out through any of these channels - our team is ready to help with your project needs!"""
+
+CLIENTS_TEXT = "We have diverse clients across the world, you can check it out:\nOur Clients - https://www.genetechsolutions.com/clients"
+REVIEWS_TEXT = "We have so many excellent reviews and love from all over the world, you can see more about reviews in detail in below link:\nhttps://www.genetechsolutions.com/testimonials"
+
+GENERAL_PORTFOLIO_TEXT = "Sure, here's the link to our portfolio:\nhttps://www.genetechsolutions.com/portfolio"
+
+# (category label, link, synonyms). Synonyms are matched as normalized words or phrases.
+PORTFOLIO_CATEGORIES = [
+    ("Web Development", "https://genetechsolutions.com/portfolio/web-development.html",
+     ["web", "website", "websites", "web development", "web app", "web apps", "web application", "wordpress", "landing page", "site", "sites"]),
+    ("Mobile Applications", "https://www.genetechsolutions.com/portfolio/mobile-apps",
+     ["mobile", "app", "apps", "mobile app", "mobile apps", "android", "ios", "iphone", "flutter", "react native", "application", "applications"]),
+    ("Personal Branding Websites", "https://www.genetechsolutions.com/portfolio/personal-branding-websites",
+     ["personal branding", "personal brand", "branding", "personal website", "personal websites", "personal site", "influencer", "resume website"]),
+    ("LMS Development", "https://www.genetechsolutions.com/portfolio/lms",
+     ["lms", "learning management", "e learning", "elearning", "online courses", "course platform", "education", "school", "training platform"]),
+    ("E-commerce Solutions", "https://www.genetechsolutions.com/portfolio/online-shops",
+     ["ecommerce", "e commerce", "online shop", "online shops", "online store", "online stores", "shop", "shops", "store", "stores", "shopify", "woocommerce", "magento"]),
+]
+
+# Words that mean "show me your work" without naming a category
+GENERAL_PORTFOLIO_TERMS = ["portfolio", "portfolios", "work", "projects", "examples", "samples", "case studies", "case study", "done"]
+
+CLIENTS_TERMS = ["client", "clients", "customer", "customers", "client list", "worked with", "companies", "brands"]
+REVIEWS_TERMS = ["review", "reviews", "testimonial", "testimonials", "feedback", "rating", "ratings", "opinion", "opinions", "say", "said", "recommend"]
+
+
+class KeywordIndex:
+    """Maps normalized words and two/three-word phrases to weighted keys"""
+
+    def __init__(self):
+        self._terms = {}
+
+    def add(self, key, terms, weight=1.0):
+        for term in terms:
+            normalized_term = normalize(term)
+            # Multi-word phrases are more specific than single words
+            self._terms[normalized_term] = (key, weight * len(normalized_term.split()))
+
+    def score(self, normalized_text):
+        """Return {key: score} for every indexed term found in the message"""
+        tokens = normalized_text.split()
+        scores = Counter()
+        for size in (1, 2, 3):
+            for i in range(len(tokens) - size + 1):
+                hit = self._terms.get(" ".join(tokens[i:i + size]))
+                if hit:
+                    scores[hit[0]] += hit[1]
+        return scores
+
+
+_portfolio_index = KeywordIndex()
+for _label, _link, _synonyms in PORTFOLIO_CATEGORIES:
+    _portfolio_index.add(_label, _synonyms)
+_portfolio_index.add("general", GENERAL_PORTFOLIO_TERMS, weight=0.5)
+_portfolio_links = {label: link for label, link, _ in PORTFOLIO_CATEGORIES}
+
+_clients_reviews_index = KeywordIndex()
+_clients_reviews_index.add("clients", CLIENTS_TERMS)
+_clients_reviews_index.add("reviews", REVIEWS_TERMS)
+
+_stats_lock = threading.Lock()
+template_stats = Counter()
+
+
+def _record(tool_name, outcome):
+    with _stats_lock:
+        template_stats[f"{tool_name}.{outcome}"] += 1
+
+
+def render_contact_info():
+    """Approved contact information text"""
+    _record("company_contact_info", "template")
+    return CONTACT_INFO_TEXT
+
+
+def render_portfolio(user_message):
+    """Approved portfolio link for the category named in the message, or None"""
+    scores = _portfolio_index.score(normalize(user_message))
+    general_score = scores.pop("general", 0)
+    if not scores and not general_score:
+        _record("company_portfolio", "fallback")
+        return None
+
+    _record("company_portfolio", "template")
+    ranked = scores.most_common(2)
+    if not ranked or (len(ranked) > 1 and ranked[0][1] == ranked[1][1]):
+        # Generic request or an even split between categories
+        return GENERAL_PORTFOLIO_TEXT
+    label = ranked[0][0]
+    return f"Sure, here's the link to our {label} portfolio:\n{_portfolio_links[label]}"
+
+
+def render_clients_reviews(user_message):
+    """Approved clients or reviews text for the message, or None"""
+    scores = _clients_reviews_index.score(normalize(user_message))
+    if not scores:
+        _record("clients_reviews", "fallback")
+        return None
+
+    _record("clients_reviews", "template")
+    if scores["reviews"] > scores["clients"]:
+        return REVIEWS_TEXT
+    if scores["clients"] > scores["reviews"]:
+        return CLIENTS_TEXT
+    # "What do your clients say" mentions both; the question is about their opinions
+    return REVIEWS_TEXT
+
+
+def get_template_stats():
+    """Template hits and LLM fallbacks per tool"""
+    with _stats_lock:
+        return dict(template_stats)
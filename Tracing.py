@@ -0,0 +1,203 @@
+"""Span tracing for chat turns.
+
+A trace covers one request: a root span plus child spans for the stages of the turn (intent
+classification, CrewAI kickoff, the tool, embedding and vectorstore search, the tool's LLM
+call, the SQLite save). The active span lives in a ContextVar, so spans opened inside
+pipeline generators, on executor threads (Pipeline_Steps.run_blocking copies the context)
+and inside CrewAI tools nest under the request that caused them without passing anything
+around. Outside a trace, span() costs one ContextVar read and records nothing, so background
+work (conversation summaries, warm-up) is never traced.
+
+Finished traces go to a local exporter: an in-memory ring buffer of recent traces (served by
+/admin/traces) and, optionally, one JSON line per trace appended to a file.
+Trace.server_timing() renders the stages as a Server-Timing header, which browser devtools
+show in the request's Timing tab.
+"""
+import re
+import json
+import time
+import random
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+MAX_SERVER_TIMING_ENTRIES = 30  # Keep the header well under common proxy header limits
+
+
+def server_timing_token(name):
+    """A span name as a Server-Timing metric name (an HTTP token: no spaces, colons or quotes)"""
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]", "_", name)
+
+
+class Span:
+    """One timed stage of a trace"""
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace, span_id, parent_id, name, attributes):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.root.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """The spans of one request, rooted at a span named after the request"""
+
+    def __init__(self, name, attributes=None):
+        self.trace_id = f"{random.getrandbits(64):016x}"
+        self.started_at = time.time()
+        self.spans = []  # In start order; appended from any thread the request reaches
+        self._span_ids = itertools.count(1)
+        self.root = self.open(name, None, attributes or {})
+
+    def open(self, name, parent_id, attributes):
+        span = Span(self, next(self._span_ids), parent_id, name, attributes)
+        self.spans.append(span)
+        return span
+
+    def server_timing(self):
+        """Server-Timing header value: one entry per finished stage, then the total"""
+        entries = [f"{server_timing_token(span.name)};dur={span.duration * 1000:.1f}"
+                   for span in self.spans[1:MAX_SERVER_TIMING_ENTRIES] if span.end is not None]
+        entries.append(f"total;dur={self.root.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "attributes": self.root.attributes,
+            "error": self.root.error,
+            "spans": [span.to_dict() for span in self.spans[1:]],
+        }
+
+
+def _reset(token, previous):
+    try:
+        current_span.reset(token)
+    except ValueError:
+        # A generator closed from another context (e.g. on interpreter exit); restore by value instead
+        current_span.set(previous)
+
+
+@contextmanager
+def start_trace(name, exporter=None, **attributes):
+    """Open a trace for one request and make its root span current; exported when the block exits"""
+    trace = Trace(name, attributes)
+    previous = current_span.get()
+    token = current_span.set(trace.root)
+    try:
+        yield trace
+    except Exception as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.root.finish()
+        _reset(token, previous)
+        if exporter is not None:
+            exporter.export(trace)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a stage as a child of the current span; yields the Span, or None outside a trace"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.trace.open(name, parent.span_id, attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.finish()
+        _reset(token, parent)
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if any"""
+    current = current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+class TraceExporter:
+    """Keeps recently finished traces in a ring buffer and optionally appends them to a JSONL file"""
+
+    def __init__(self, capacity=200, path=None):
+        self.path = path
+        self._recent = deque(maxlen=capacity)
+        self._file_lock = threading.Lock()
+        self.exported = 0
+
+    def export(self, trace):
+        record = trace.to_dict()
+        self._recent.append(record)
+        self.exported += 1
+        if self.path:
+            line = json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+            try:
+                with self._file_lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"⚠️ Could not write trace to {self.path}: {e}")
+
+    def recent(self, limit=20, trace_id=None, min_duration_ms=0.0):
+        """Newest traces first, optionally one trace by id or only those slower than min_duration_ms"""
+        traces = [record for record in reversed(list(self._recent))
+                  if (trace_id is None or record["trace_id"] == trace_id) and record["duration_ms"] >= min_duration_ms]
+        return traces[:limit]
+
+    def span_summary(self):
+        """Count, average and max duration per span name over the buffered traces"""
+        summary = {}
+        for record in list(self._recent):
+            for item in [{"name": record["name"], "duration_ms": record["duration_ms"]}, *record["spans"]]:
+                stats = summary.setdefault(item["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                stats["count"] += 1
+                stats["total_ms"] += item["duration_ms"]
+                stats["max_ms"] = max(stats["max_ms"], item["duration_ms"])
+        return {
+            name: {"count": stats["count"], "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                   "max_ms": round(stats["max_ms"], 3)}
+            for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total_ms"])
+        }
+
+    def get_stats(self):
+        return {"exported": self.exported, "buffered": len(self._recent), "capacity": self._recent.maxlen,
+                "path": self.path}
@@ -0,0 +1,91 @@
+"""Two SessionStores on one backend stand in for two worker processes serving one conversation"""
+import time
+import threading
+
+from Session_Backends import MemoryBackend
+from Session_Store import SessionStore
+
+
+def test_concurrent_turns_across_stores_are_not_lost():
+    backend = MemoryBackend()
+    stores = [SessionStore(backend=backend), SessionStore(backend=backend)]
+
+    def worker(store):
+        for _ in range(20):
+            with store.turn("s") as state:
+                step = (state.lead_data or {"step": 0})["step"]
+                time.sleep(0.001)  # Widen the load-modify-save window
+                state.lead_data = {"step": step + 1}
+
+    threads = [threading.Thread(target=worker, args=(stores[i % 2],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with stores[0].turn("s") as state:
+        assert state.lead_data == {"step": 80}
+
+
+def test_lease_is_exclusive_and_released_by_its_holder_only():
+    backend = MemoryBackend()
+    assert backend.acquire_lease("s", "a", 60)
+    assert not backend.acquire_lease("s", "b", 60)
+    backend.release_lease("s", "b")
+    assert not backend.acquire_lease("s", "b", 60)
+    backend.release_lease("s", "a")
+    assert backend.acquire_lease("s", "b", 60)
+
+
+def _store(backend):
+    from functools import partial
+    from Conversation_Window import ConversationWindow
+    return SessionStore(backend=backend, window_factory=partial(ConversationWindow, max_messages=2, keep_evicted=True))
+
+
+def test_summary_fold_keeps_turns_served_by_another_store():
+    from Conversation_Window import SummaryWorker
+
+    backend = MemoryBackend()
+    store_a, store_b = _store(backend), _store(backend)
+    with store_a.turn("s") as state:
+        for message in ("m1", "m2", "m3"):
+            state.conversation.append("user", message)
+        state.lead_data = {"step": 1}
+
+    def summarize(previous, lines):
+        # While the summary is being written, store B serves a turn
+        with store_b.turn("s") as other:
+            other.conversation.append("user", "m4")
+            other.lead_data = {"step": 2}
+        return "summary of m1"
+
+    SummaryWorker(store_a, summarize).fold("s")
+
+    with store_b.turn("s") as state:
+        assert state.lead_data == {"step": 2}
+        assert [message for _, message, _ in state.conversation.messages()] == ["m3", "m4"]
+        assert state.conversation.summary == "summary of m1"
+        assert state.conversation.pending == ["User: m2"]
+
+
+def test_summary_fold_is_dropped_when_its_lines_were_folded_elsewhere():
+    from Conversation_Window import SummaryWorker
+
+    backend = MemoryBackend()
+    store_a, store_b = _store(backend), _store(backend)
+    with store_a.turn("s") as state:
+        for message in ("m1", "m2", "m3"):
+            state.conversation.append("user", message)
+
+    def summarize(previous, lines):
+        with store_b.turn("s") as other:
+            other.conversation.apply_summary("folded by B", 1)
+        return "folded by A"
+
+    worker = SummaryWorker(store_a, summarize)
+    worker.fold("s")
+
+    with store_b.turn("s") as state:
+        assert state.conversation.summary == "folded by B"
+    assert worker.get_stats()["stale"] == 1